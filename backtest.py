@@ -0,0 +1,202 @@
+# Backtest Engines
+#
+# Loop and vectorized backtests plus the metrics computed from their equity
+# curves. NumPy only: `data` can be a pandas DataFrame or any mapping of
+# equal-length column arrays ('timestamp', 'close', ...).
+
+import numpy as np
+from strategies import BUY, SELL
+from trade_log import TradeLog, TRADE_LOG_DTYPE
+
+def column(data, name, dtype=None):
+    """One column of a DataFrame or column mapping as a NumPy array"""
+    return np.asarray(data[name], dtype=dtype)
+
+def row_count(data):
+    """Number of bars in a DataFrame or column mapping"""
+    return len(data['close'])
+
+def slice_rows(data, start, end):
+    """Rows [start, end) of a DataFrame or column mapping, without copying"""
+    if hasattr(data, 'iloc'):
+        return data.iloc[start:end]
+    return {name: values[start:end] for name, values in data.items()}
+
+def run_signal_loop(strategy, data):
+    """Per-bar engine: ask the strategy for a signal on every row
+    
+    Returns the mark-to-market equity after each bar and whether the
+    strategy held a position at the end of it.
+    """
+    close = column(data, 'close', float)
+    timestamps = column(data, 'timestamp', 'datetime64[ns]')
+    
+    equity = np.empty(len(close))
+    in_position = np.empty(len(close), dtype=bool)
+    
+    for i in range(len(close)):
+        signal = strategy.generate_signal(data, i)
+        strategy.execute_trade(signal, close[i], timestamps[i])
+        
+        equity[i] = strategy.get_portfolio_value(close[i])
+        in_position[i] = strategy.position > 0
+    
+    return equity, in_position
+
+def run_vectorized(strategy, data):
+    """Array engine: compute all signals at once and derive fills from them
+    
+    Replicates execute_trade exactly: a buy only fills when flat, a sell only
+    when long, each buy invests 95% of the balance and each sell closes the
+    whole position. Returns the same equity/in-position arrays as the loop.
+    """
+    close = column(data, 'close', float)
+    signals = strategy.generate_signals(close)
+    
+    # Only signals that flip the position fill; start flat (as if after a sell)
+    active = np.flatnonzero(signals)
+    codes = signals[active]
+    previous = np.concatenate(([SELL], codes[:-1]))
+    fills = active[codes != previous]
+    
+    buy_idx = fills[0::2]
+    sell_idx = fills[1::2]
+    buy_prices = close[buy_idx]
+    sell_prices = close[sell_idx]
+    n_closed = len(sell_idx)
+    
+    # Balance before each entry compounds the previous round trips
+    growth = 0.05 + 0.95 * sell_prices / buy_prices[:n_closed]
+    entry_balances = strategy.balance * np.concatenate(([1.0], np.cumprod(growth)))[:len(buy_idx)]
+    amounts = entry_balances * 0.95 / buy_prices
+    balances_after_buy = entry_balances - amounts * buy_prices
+    balances_after_sell = balances_after_buy[:n_closed] + amounts[:n_closed] * sell_prices
+    profit_loss = (sell_prices - buy_prices[:n_closed]) * amounts[:n_closed]
+    
+    # Mark to market: each bar takes the state left by the last fill at or before it
+    last_fill = np.searchsorted(fills, np.arange(len(close)), side='right') - 1
+    in_position = (last_fill >= 0) & (last_fill % 2 == 0)
+    trip = np.maximum(last_fill, 0) // 2
+    equity = np.full(len(close), float(strategy.balance))
+    if len(buy_idx):
+        held = np.flatnonzero(in_position)
+        equity[held] = balances_after_buy[trip[held]] + amounts[trip[held]] * close[held]
+    if n_closed:
+        closed = np.flatnonzero((last_fill >= 0) & ~in_position)
+        equity[closed] = balances_after_sell[trip[closed]]
+    
+    # Fills alternate buy, sell, buy, ...
+    timestamps = column(data, 'timestamp', 'datetime64[ns]')
+    trades = np.empty(len(buy_idx) + n_closed, dtype=TRADE_LOG_DTYPE)
+    trades['timestamp'] = timestamps[fills[:len(trades)]]
+    trades['side'][0::2] = BUY
+    trades['side'][1::2] = SELL
+    trades['price'] = close[fills[:len(trades)]]
+    trades['amount'][0::2] = amounts
+    trades['amount'][1::2] = amounts[:n_closed]
+    trades['balance'][0::2] = balances_after_buy
+    trades['balance'][1::2] = balances_after_sell
+    trades['pnl'][0::2] = np.nan
+    trades['pnl'][1::2] = profit_loss
+    strategy.trades.extend(trades)
+    
+    # Leave the strategy in the same end state the loop engine would
+    if len(buy_idx) > n_closed:
+        strategy.balance = balances_after_buy[-1]
+        strategy.position = amounts[-1]
+        strategy.entry_price = buy_prices[-1]
+    elif n_closed:
+        strategy.balance = balances_after_sell[-1]
+    
+    return equity, in_position
+
+def periods_per_year(timestamps):
+    """Bars per year implied by the median bar spacing (markets trade 24/7)"""
+    values = np.asarray(timestamps, dtype='datetime64[ns]').astype(np.int64)
+    if len(values) < 2:
+        return 365 * 24
+    spacing = np.median(np.diff(values))
+    return 365 * 24 * 3600 * 1e9 / spacing if spacing > 0 else 365 * 24
+
+def calculate_performance_metrics(equity, initial_balance, bars_per_year, in_position=None):
+    """Risk/return metrics from a per-bar equity curve in one vectorized pass"""
+    curve = np.concatenate(([initial_balance], equity))
+    # A wiped-out account stays flat rather than producing 0/0 returns
+    returns = np.divide(curve[1:], curve[:-1], out=np.ones(len(equity)), where=curve[:-1] != 0) - 1
+    
+    volatility = np.std(returns) if len(returns) else 0
+    sharpe_ratio = np.mean(returns) / volatility * np.sqrt(bars_per_year) if volatility > 0 else 0
+    
+    downside = np.sqrt(np.mean(np.minimum(returns, 0) ** 2)) if len(returns) else 0
+    sortino_ratio = np.mean(returns) / downside * np.sqrt(bars_per_year) if downside > 0 else 0
+    
+    peak = np.maximum.accumulate(curve)
+    max_drawdown = np.min((curve - peak) / peak) * 100
+    
+    years = len(returns) / bars_per_year
+    annualized_return = ((curve[-1] / curve[0]) ** (1 / years) - 1) * 100 if years > 0 and curve[-1] > 0 else 0
+    calmar_ratio = annualized_return / abs(max_drawdown) if max_drawdown < 0 else 0
+    
+    exposure = np.mean(in_position) * 100 if in_position is not None and len(in_position) else 0
+    
+    return {
+        'sharpe_ratio': sharpe_ratio,
+        'sortino_ratio': sortino_ratio,
+        'max_drawdown': max_drawdown,
+        'annualized_return': annualized_return,
+        'calmar_ratio': calmar_ratio,
+        'exposure': exposure
+    }
+
+def backtest_strategy(strategy, data, engine='auto'):
+    """Backtest a trading strategy
+    
+    engine: 'loop' (per-bar generate_signal), 'vectorized' (generate_signals)
+    or 'auto' (vectorized when the strategy supports it).
+    """
+    print(f"Backtesting {strategy.name}...")
+    
+    if engine == 'auto':
+        engine = 'vectorized' if strategy.supports_vectorized else 'loop'
+    
+    if engine == 'vectorized':
+        equity, in_position = run_vectorized(strategy, data)
+    elif engine == 'loop':
+        equity, in_position = run_signal_loop(strategy, data)
+    else:
+        raise ValueError(f"Unknown backtest engine: {engine}")
+    
+    # Calculate performance metrics
+    final_value = equity[-1] if len(equity) else strategy.balance
+    total_return = (final_value - strategy.initial_balance) / strategy.initial_balance * 100
+    
+    metrics = calculate_performance_metrics(equity, strategy.initial_balance,
+                                            periods_per_year(data['timestamp']), in_position)
+    
+    results = {
+        'strategy_name': strategy.name,
+        'parameters': strategy.parameters,
+        'total_trades': len(strategy.trades),
+        'final_value': final_value,
+        'total_return': total_return,
+        **metrics,
+        **strategy.trades.stats()
+    }
+    
+    return results
+
+def calculate_win_rate(trades):
+    """Calculate win rate from trades (a TradeLog or a list of trade dicts)"""
+    if isinstance(trades, TradeLog):
+        return trades.win_rate()
+    
+    profitable_trades = 0
+    total_trades = 0
+    
+    for trade in trades:
+        if 'profit_loss' in trade:
+            total_trades += 1
+            if trade['profit_loss'] > 0:
+                profitable_trades += 1
+    
+    return (profitable_trades / total_trades * 100) if total_trades > 0 else 0
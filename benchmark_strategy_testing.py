@@ -0,0 +1,231 @@
+# Strategy Testing Benchmarks
+#
+# Reproducible timings for the backtesting pipeline: mock data generation,
+# single-strategy backtests (per engine) and parameter sweeps, on seeded
+# datasets from one month of hourly bars up to five years of minute bars.
+# Results are written as JSON so runs can be compared over time:
+#
+#     python benchmark_strategy_testing.py --sizes 1mo_1h 1y_1h --output bench.json
+#
+# Cold import times of the modules pool workers load are measured in fresh
+# interpreters; --check-imports fails if one loads pandas or plotting
+# libraries or exceeds IMPORT_BUDGET:
+#
+#     python benchmark_strategy_testing.py --imports-only --check-imports
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from trading_bot_strategy_testing import (
+    SMAStrategy, RSIStrategy, TrailingStopStrategy, generate_mock_price_data, backtest_strategy,
+    optimize_strategy_parameters, SMA_PARAMETER_SPACE, sma_periods_ordered
+)
+from strategy_optimizers import GridSearch
+from indicator_cache import indicator_cache
+
+SEED = 42
+
+# name -> (days, bar frequency)
+DATASETS = {
+    '1mo_1h': (30, '1h'),
+    '1y_1h': (365, '1h'),
+    '1y_1m': (365, '1min'),
+    '5y_1m': (5 * 365, '1min')
+}
+
+STRATEGIES = {
+    'sma_10_30': lambda: SMAStrategy(short_period=10, long_period=30),
+    'rsi_14': lambda: RSIStrategy(period=14, oversold=30, overbought=70),
+    'rsi_14_wilder': lambda: RSIStrategy(period=14, oversold=30, overbought=70, smoothing='wilder'),
+    'trailing_stop_20_5': lambda: TrailingStopStrategy(lookback=20, trail_percent=5)
+}
+
+# The per-bar loop engine is only timed up to this many bars
+LOOP_ENGINE_MAX_BARS = 20000
+# Grid sweeps are only timed up to this many bars
+SWEEP_MAX_BARS = 600000
+
+# Modules a sweep worker or live bot imports; none may pull in these
+WORKER_MODULES = ['strategies', 'backtest', 'trading_bot_strategy_testing', 'parameter_sweep']
+HEAVY_MODULES = ['pandas', 'matplotlib', 'seaborn']
+# Cold import budget per worker module in seconds (NumPy alone takes ~0.1-0.2 s)
+IMPORT_BUDGET = 0.5
+
+IMPORT_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{'wall_time': elapsed, 'loaded': [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+def measure(func, repeat=1):
+    """Best wall time over `repeat` runs, then peak traced memory of one more run
+
+    An untimed warm-up run comes first, so one-off costs such as numba JIT
+    compilation are not timed. The indicator cache is cleared before every
+    timed run so each one starts cold.
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        func()
+
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        indicator_cache.clear()
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            result = func()
+            best = min(best, time.perf_counter() - start)
+
+    indicator_cache.clear()
+    tracemalloc.start()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return result, best, peak
+
+def record(name, dataset, bars, wall_time, peak_memory, **extra):
+    return {
+        'benchmark': name,
+        'dataset': dataset,
+        'bars': bars,
+        'wall_time': wall_time,
+        'bars_per_sec': bars / wall_time if wall_time > 0 else None,
+        'peak_memory_bytes': peak_memory,
+        **extra
+    }
+
+def bench_dataset(name, repeat=1, max_workers=None):
+    days, freq = DATASETS[name]
+    records = []
+
+    data, wall_time, peak = measure(lambda: generate_mock_price_data(days=days, freq=freq, seed=SEED), repeat)
+    bars = len(data)
+    records.append(record('generate_mock_price_data', name, bars, wall_time, peak))
+
+    for strategy_name, make_strategy in STRATEGIES.items():
+        engines = ['vectorized'] + (['loop'] if bars <= LOOP_ENGINE_MAX_BARS else [])
+        for engine in engines:
+            result, wall_time, peak = measure(lambda: backtest_strategy(make_strategy(), data, engine=engine), repeat)
+            records.append(record('backtest_strategy', name, bars, wall_time, peak,
+                                  strategy=strategy_name, engine=engine,
+                                  total_trades=result['total_trades']))
+
+    if bars <= SWEEP_MAX_BARS:
+        for workers in sorted({1, max_workers or os.cpu_count() or 1}):
+            optimizer = GridSearch(SMAStrategy, SMA_PARAMETER_SPACE, constraint=sma_periods_ordered,
+                                   max_workers=workers)
+            _, wall_time, peak = measure(lambda: optimizer.optimize(data), repeat)
+            records.append(record('sma_grid_sweep', name, bars * optimizer.completed, wall_time, peak,
+                                  configurations=optimizer.completed, max_workers=workers))
+
+    return records
+
+def bench_imports(repeat=1):
+    """Best cold import time of each worker module, each run in a fresh interpreter"""
+    records = []
+    root = os.path.dirname(os.path.abspath(__file__))
+    for module in WORKER_MODULES:
+        probe = IMPORT_PROBE.format(module=module, heavy=HEAVY_MODULES)
+        runs = [json.loads(subprocess.run([sys.executable, '-c', probe], cwd=root, check=True,
+                                          capture_output=True, text=True).stdout)
+                for _ in range(repeat)]
+        records.append({
+            'benchmark': 'cold_import',
+            'module': module,
+            'wall_time': min(run['wall_time'] for run in runs),
+            'heavy_modules_loaded': runs[0]['loaded']
+        })
+    return records
+
+def import_violations(records):
+    """Messages for cold imports that load heavy modules or exceed the budget"""
+    violations = []
+    for record in records:
+        if record['benchmark'] != 'cold_import':
+            continue
+        if record['heavy_modules_loaded']:
+            violations.append(f"{record['module']} imports {', '.join(record['heavy_modules_loaded'])}")
+        if record['wall_time'] > IMPORT_BUDGET:
+            violations.append(f"{record['module']} took {record['wall_time']:.3f}s to import "
+                              f"(budget {IMPORT_BUDGET}s)")
+    return violations
+
+def environment():
+    return {
+        'timestamp': datetime.now().isoformat(),
+        'python': sys.version.split()[0],
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'seed': SEED
+    }
+
+def run_benchmarks(sizes=None, repeat=1, max_workers=None, include_optimizer=True,
+                   include_imports=True):
+    """Run the suite and return {'environment': ..., 'results': [...]}"""
+    records = []
+    if include_imports:
+        print("Benchmarking cold imports...", file=sys.stderr)
+        records.extend(bench_imports(repeat))
+
+    for name in sizes or DATASETS:
+        print(f"Benchmarking {name}...", file=sys.stderr)
+        records.extend(bench_dataset(name, repeat, max_workers))
+
+    if include_optimizer:
+        data = generate_mock_price_data(days=180, seed=SEED)
+        _, wall_time, peak = measure(lambda: optimize_strategy_parameters(max_workers=max_workers, data=data), repeat)
+        records.append(record('optimize_strategy_parameters', '180d_1h', len(data), wall_time, peak))
+
+    return {'environment': environment(), 'results': records}
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the strategy testing pipeline")
+    parser.add_argument('--sizes', nargs='+', choices=list(DATASETS), default=list(DATASETS))
+    parser.add_argument('--repeat', type=int, default=1, help="timed runs per benchmark (best is kept)")
+    parser.add_argument('--workers', type=int, default=None, help="parallel sweep workers (default: CPUs)")
+    parser.add_argument('--skip-optimizer', action='store_true', help="skip optimize_strategy_parameters")
+    parser.add_argument('--imports-only', action='store_true', help="only time cold imports")
+    parser.add_argument('--check-imports', action='store_true',
+                        help="exit with an error if a worker module import is too slow or too heavy")
+    parser.add_argument('--output', help="write JSON here instead of stdout")
+    args = parser.parse_args()
+
+    if args.imports_only:
+        report = {'environment': environment(), 'results': bench_imports(args.repeat)}
+    else:
+        report = run_benchmarks(args.sizes, args.repeat, args.workers, not args.skip_optimizer)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    if args.check_imports:
+        violations = import_violations(report['results'])
+        for violation in violations:
+            print(f"Import check failed: {violation}", file=sys.stderr)
+        if violations:
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+# Bot Registry
+#
+# Durable record of every user's bots in the app's SQLAlchemy database.
+# Rows carry the bot's config, whether it should be running and its running
+# totals, indexed by (user_id, status) so the bot list and dashboard
+# figures are each a single indexed query. On startup every bot still
+# marked running is handed back to the bot runtime.
+#
+# The totals are the fills and PnL the bot workers report (record_stats).
+# trades_today belongs to the UTC day in trades_date: the first fill of a
+# new day starts it over, and reads count an older day's figure as 0.
+
+from datetime import datetime
+from sqlalchemy import case, func
+from src.models.user import db
+
+RUNNING = 'running'
+STOPPED = 'stopped'
+
+class Bot(db.Model):
+    __tablename__ = 'bots'
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'name', name='uq_bots_user_name'),
+        db.Index('ix_bots_user_status', 'user_id', 'status'),
+        db.Index('ix_bots_status', 'status'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.String(80), nullable=False)
+    name = db.Column(db.String(120), nullable=False)
+    strategy = db.Column(db.String(80), nullable=False)
+    symbol = db.Column(db.String(20), nullable=False, default='BTC/USDT')
+    config = db.Column(db.JSON, nullable=False, default=dict)
+    status = db.Column(db.String(20), nullable=False, default=STOPPED)
+    profit_loss = db.Column(db.Float, nullable=False, default=0.0)
+    trades_today = db.Column(db.Integer, nullable=False, default=0)
+    trades_date = db.Column(db.Date)  # UTC day trades_today counts
+    winning_trades = db.Column(db.Integer, nullable=False, default=0)
+    total_trades = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def runtime_config(self):
+        """Config handed to the bot runtime"""
+        return {**self.config, 'name': self.name, 'strategy': self.strategy, 'symbol': self.symbol}
+
+    def to_dict(self):
+        return {
+            'id': str(self.id),
+            'name': self.name,
+            'strategy': self.strategy,
+            'symbol': self.symbol,
+            'status': self.status,
+            'profit_loss': format_money(self.profit_loss, signed=True),
+            'trades_today': self.trades_today if self.trades_date == utc_today() else 0,
+            'created_at': self.created_at.strftime('%Y-%m-%d')
+        }
+
+def utc_today():
+    return datetime.utcnow().date()
+
+def format_money(value, signed=False):
+    sign = ('+' if value >= 0 else '-') if signed else ('-' if value < 0 else '')
+    return f"{sign}${abs(value):,.2f}"
+
+def create_bot(user_id, bot_config):
+    """Insert a stopped bot; raises sqlalchemy.exc.IntegrityError if the user already has that name"""
+    config = {key: value for key, value in bot_config.items() if key not in ('name', 'strategy', 'symbol')}
+    bot = Bot(user_id=user_id, name=bot_config['name'], strategy=bot_config['strategy'],
+              symbol=bot_config.get('symbol') or 'BTC/USDT', config=config)
+    db.session.add(bot)
+    try:
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return bot
+
+def get_bot(user_id, bot_id):
+    return Bot.query.filter_by(id=bot_id, user_id=user_id).first()
+
+def set_status(bot, status):
+    bot.status = status
+    db.session.commit()
+
+def user_bots(user_id):
+    """Every bot of a user, oldest first (one query on the user index)"""
+    return Bot.query.filter_by(user_id=user_id).order_by(Bot.created_at, Bot.id).all()
+
+def record_stats(user_id, bot_name, stats):
+    """Add a bot's reported fills and PnL to its totals (one UPDATE, so concurrent reports add up)"""
+    today = utc_today()
+    Bot.query.filter_by(user_id=user_id, name=bot_name).update({
+        Bot.profit_loss: Bot.profit_loss + stats.get('profit_loss', 0.0),
+        Bot.trades_today: case((Bot.trades_date == today, Bot.trades_today), else_=0) + stats.get('fills', 0),
+        Bot.trades_date: today,
+        Bot.winning_trades: Bot.winning_trades + stats.get('winning', 0),
+        Bot.total_trades: Bot.total_trades + stats.get('closed', 0)
+    }, synchronize_session=False)
+    db.session.commit()
+
+def dashboard_totals(user_id):
+    """Bot count, running bots, PnL and trade totals of a user in one aggregate query
+
+    success_rate is the share of closed trades that made money.
+    """
+    row = db.session.query(
+        func.count(Bot.id),
+        func.coalesce(func.sum(case((Bot.status == RUNNING, 1), else_=0)), 0),
+        func.coalesce(func.sum(Bot.profit_loss), 0.0),
+        func.coalesce(func.sum(case((Bot.trades_date == utc_today(), Bot.trades_today), else_=0)), 0),
+        func.coalesce(func.sum(Bot.winning_trades), 0),
+        func.coalesce(func.sum(Bot.total_trades), 0)
+    ).filter(Bot.user_id == user_id).one()
+    bots, active, profit_loss, trades_today, winning, total = row
+    return {
+        'bots': bots,
+        'active_bots': int(active),
+        'profit_loss': float(profit_loss),
+        'trades_today': int(trades_today),
+        'success_rate': winning / total * 100 if total else 0.0
+    }
+
+def restore_running_bots(bot_manager):
+    """Restart every bot still marked running (e.g. after a process restart)"""
+    restored = 0
+    for bot in Bot.query.filter_by(status=RUNNING).all():
+        if bot_manager.start_bot(bot.user_id, bot.runtime_config()):
+            restored += 1
+    if restored:
+        print(f"Restored {restored} running bots")
+    return restored
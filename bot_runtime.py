@@ -0,0 +1,393 @@
+# Sharded Bot Runtime
+#
+# Strategy evaluation is CPU-bound Python, so running every bot inside the
+# Flask process makes them share one GIL with the web server. Instead, bots
+# run in N worker processes. Each worker has its own BotScheduler, market
+# data hub and BotManager, and a bot lives on the worker that owns its
+# bot_id on a consistent hash ring.
+#
+# The Flask side (ShardedBotRuntime) only records which bots should run and
+# sends commands down each worker's control queue, so starting or stopping
+# a bot from the API never waits for a worker. Replies come back on one
+# shared queue, read by a listener thread.
+#
+# Each bot trades a paper position on its signals (a buy opens `amount` of
+# quote currency, a sell closes it). Every fill is reported back as a
+# ('stats', bot_id, delta) reply, which the runtime hands to its on_stats
+# callback (the Flask app adds it to the bot's row).
+#
+# Adding or removing a worker moves only the bots whose owner changed on
+# the ring. Each one is migrated live: the old worker stops it and sends
+# back its pickled strategy, and the new worker resumes it with its
+# indicator state intact. Steps and pickling take the bot's lock, so the
+# state sent is never caught halfway through an update.
+
+import hashlib
+import itertools
+import multiprocessing
+import os
+import pickle
+import threading
+from bisect import bisect
+from bot_scheduler import BotScheduler
+from market_hub import MarketDataHub
+from strategies import SMAStrategy, RSIStrategy
+
+DEFAULT_REPLICAS = 64
+STATUS_TIMEOUT = 2
+DEFAULT_TRADE_AMOUNT = 100  # Quote currency per paper trade when the bot config has no amount
+
+def build_strategy(bot_config):
+    """Create the streaming strategy a live bot evaluates on every tick"""
+    params = bot_config.get('parameters', {})
+    strategy = bot_config.get('strategy')
+
+    if strategy in ('simple_moving_average', 'sma_crossover'):
+        return SMAStrategy(short_period=params.get('short_period', 10),
+                           long_period=params.get('long_period', 30))
+    if strategy == 'rsi_oversold':
+        return RSIStrategy(period=params.get('rsi_period', 14),
+                           oversold=params.get('oversold_threshold', 30),
+                           overbought=params.get('overbought_threshold', 70),
+                           # Same default as the backtests and optimizers, so tuned thresholds carry over
+                           smoothing=params.get('smoothing', 'simple'))
+    return None
+
+class PaperPosition:
+    """A bot's simulated position: a buy signal opens `amount` of quote currency, a sell closes it"""
+
+    def __init__(self, amount):
+        self.amount = amount
+        self.quantity = 0.0
+        self.entry_price = None
+
+    def fill(self, signal, price):
+        """Trade on a signal; returns the stats delta of the fill, or None if nothing traded"""
+        if signal == 'buy' and self.quantity == 0:
+            self.quantity = self.amount / price
+            self.entry_price = price
+            return {'fills': 1}
+        if signal == 'sell' and self.quantity > 0:
+            profit_loss = (price - self.entry_price) * self.quantity
+            self.quantity = 0.0
+            self.entry_price = None
+            return {'fills': 1, 'closed': 1, 'winning': int(profit_loss > 0), 'profit_loss': profit_loss}
+        return None
+
+class BotManager:
+    """The bots of one process, run on its scheduler from its market data hub
+
+    report(bot_id, delta), if given, is called with the stats delta of every
+    paper fill.
+    """
+
+    def __init__(self, scheduler, market_hub, report=None):
+        self.running_bots = {}
+        self.strategies = {}
+        self.positions = {}
+        self.report = report
+        self.locks = {}  # bot_id -> lock held while its strategy is updated or pickled
+        # All bots share one event loop instead of a sleeping thread each
+        self.scheduler = scheduler
+        # and one market data fetch per symbol instead of one per bot
+        self.market_hub = market_hub
+
+    def start(self, bot_id, bot_config, strategy=None, position=None):
+        """Run a bot, resuming `strategy` and `position` (e.g. migrated from another worker) if given"""
+        if bot_id in self.running_bots:
+            return False
+        self.running_bots[bot_id] = bot_config
+        self.strategies[bot_id] = strategy if strategy is not None else build_strategy(bot_config)
+        self.positions[bot_id] = position if position is not None else \
+            PaperPosition(float(bot_config.get('amount') or DEFAULT_TRADE_AMOUNT))
+        self.locks[bot_id] = threading.Lock()
+        print(f"Starting bot {bot_id} with config: {bot_config}")
+        self.market_hub.subscribe(bot_config.get('symbol', 'BTC/USDT'), bot_id)
+        self.scheduler.add(bot_id, self._bot_step(bot_id, bot_config),
+                           interval=bot_config.get('interval', 30),  # Check every 30 seconds
+                           jitter=bot_config.get('jitter', 0.1))
+        return True
+
+    def stop(self, bot_id):
+        """Stop a bot and return its strategy (None if it wasn't running)
+
+        Waits for a step in progress (see BotScheduler.remove).
+        """
+        if bot_id not in self.running_bots:
+            return None
+        bot_config = self.running_bots.pop(bot_id)
+        self.scheduler.remove(bot_id)
+        self.market_hub.unsubscribe(bot_config.get('symbol', 'BTC/USDT'), bot_id)
+        print(f"Bot {bot_id} stopped")
+        self.locks.pop(bot_id)
+        self.positions.pop(bot_id)
+        return self.strategies.pop(bot_id)
+
+    def export(self, bot_id):
+        """Stop a bot and return its pickled (strategy, position), for resuming on another worker"""
+        lock = self.locks.get(bot_id)
+        position = self.positions.get(bot_id)
+        strategy = self.stop(bot_id)
+        if lock is None:
+            return pickle.dumps((None, None))
+        # A step that outlived stop()'s wait gets no further than this lock
+        with lock:
+            return pickle.dumps((strategy, position))
+
+    def status(self, bot_id):
+        if bot_id not in self.running_bots:
+            return None
+        strategy = self.strategies[bot_id]
+        return {
+            **self.scheduler.stats(bot_id),
+            'last_signal': strategy.last_signal if strategy is not None else None,
+            'position': self.positions[bot_id].quantity
+        }
+
+    def _bot_step(self, bot_id, bot_config):
+        """One scheduled check of a bot, run every interval by the scheduler"""
+        # Indicators update in O(1) per tick, so the bot never re-reads history
+        strategy = self.strategies[bot_id]
+        lock = self.locks[bot_id]
+        position = self.positions[bot_id]
+        symbol = bot_config.get('symbol', 'BTC/USDT')
+        last_sequence = None
+
+        def step():
+            # Simulate trading logic
+            # In a real implementation, this would:
+            # 1. Read the shared market data
+            # 2. Apply trading strategy
+            # 3. Execute trades if conditions are met
+            # 4. Update portfolio
+            nonlocal last_sequence
+
+            print(f"Bot {bot_id} checking market conditions...")
+            snapshot = self.market_hub.latest(symbol)
+            if snapshot is None or snapshot.sequence == last_sequence:
+                return  # No new market data since the last check
+            last_sequence = snapshot.sequence
+            price = snapshot.price
+
+            if strategy is not None:
+                with lock:
+                    if self.strategies.get(bot_id) is not strategy:
+                        return  # Stopped (or exported) while this step was running
+                    signal = strategy.update(price)
+                    delta = position.fill(signal, price)
+                if signal != 'hold':
+                    print(f"Bot {bot_id} {signal} signal for {symbol} at {price}")
+                if delta is not None and self.report is not None:
+                    self.report(bot_id, delta)
+
+        return step
+
+def worker_main(worker_id, commands, replies, exchange_factory):
+    """Worker process: apply control commands to this worker's BotManager until shutdown"""
+    scheduler = BotScheduler()
+    bots = BotManager(scheduler, MarketDataHub(exchange_factory(), scheduler),
+                      report=lambda bot_id, delta: replies.put(('stats', bot_id, delta)))
+
+    while True:
+        command, *args = commands.get()
+        if command == 'start':
+            bot_id, bot_config, state = args
+            bots.start(bot_id, bot_config, *(pickle.loads(state) if state is not None else ()))
+        elif command == 'stop':
+            bots.stop(args[0])
+        elif command == 'migrate':
+            bot_id = args[0]
+            replies.put(('migrated', bot_id, bots.export(bot_id)))
+        elif command == 'status':
+            request_id, bot_id = args
+            replies.put(('status', request_id, bots.status(bot_id)))
+        elif command == 'shutdown':
+            break
+
+    scheduler.shutdown()
+    print(f"Bot worker {worker_id} stopped")
+
+def ring_hash(key):
+    return int.from_bytes(hashlib.blake2b(str(key).encode(), digest_size=8).digest(), 'big')
+
+class ConsistentHashRing:
+    """Maps keys to nodes; adding or removing a node moves only that node's share of keys"""
+
+    def __init__(self, replicas=DEFAULT_REPLICAS):
+        self.replicas = replicas
+        self.points = []  # sorted hashes
+        self.owners = {}  # hash -> node
+
+    def add(self, node):
+        for replica in range(self.replicas):
+            point = ring_hash(f'{node}#{replica}')
+            self.owners[point] = node
+        self.points = sorted(self.owners)
+
+    def remove(self, node):
+        self.owners = {point: owner for point, owner in self.owners.items() if owner != node}
+        self.points = sorted(self.owners)
+
+    def node_for(self, key):
+        if not self.points:
+            raise RuntimeError("no workers on the hash ring")
+        index = bisect(self.points, ring_hash(key)) % len(self.points)
+        return self.owners[self.points[index]]
+
+class ShardedBotRuntime:
+    """Flask-side handle on the bot worker processes
+
+    Same start_bot/stop_bot/get_bot_status interface as the in-process
+    BotManager used to have. Workers are started on first use.
+    on_stats(user_id, bot_name, delta) is called (on the listener thread)
+    with every fill the workers report.
+    """
+
+    def __init__(self, n_workers=None, exchange_factory=None, replicas=DEFAULT_REPLICAS, on_stats=None):
+        self.n_workers = n_workers or os.cpu_count() or 1
+        self.exchange_factory = exchange_factory
+        self.on_stats = on_stats
+        self.context = multiprocessing.get_context('spawn')
+        self.ring = ConsistentHashRing(replicas)
+        self.workers = {}  # worker_id -> (process, command queue)
+        self.running_bots = {}  # bot_id -> config
+        self.placement = {}  # bot_id -> worker_id
+        self.owners = {}  # bot_id -> (user_id, bot name), kept after stop so late stats still land
+        self.migrating = set()  # bot_ids whose state is on its way back from the old worker
+        self.requests = {}  # status request_id -> [Event, reply]
+        self.worker_ids = itertools.count()
+        self.request_ids = itertools.count()
+        self.replies = None
+        self.lock = threading.RLock()
+
+    def start(self):
+        with self.lock:
+            if self.replies is not None:
+                return
+            self.replies = self.context.Queue()
+            threading.Thread(target=self._listen, name='bot-runtime-replies', daemon=True).start()
+            for _ in range(self.n_workers):
+                self._spawn()
+
+    def _spawn(self):
+        worker_id = next(self.worker_ids)
+        commands = self.context.Queue()
+        process = self.context.Process(target=worker_main, name=f'bot-worker-{worker_id}', daemon=True,
+                                       args=(worker_id, commands, self.replies, self.exchange_factory))
+        process.start()
+        self.workers[worker_id] = (process, commands)
+        self.ring.add(worker_id)
+        return worker_id
+
+    def _send(self, worker_id, *command):
+        self.workers[worker_id][1].put(command)
+
+    # Bot control (API side; never waits for a worker)
+
+    def start_bot(self, user_id, bot_config):
+        bot_id = f"{user_id}_{bot_config['name']}"
+        self.start()
+        with self.lock:
+            if bot_id in self.running_bots:
+                return False
+            self.running_bots[bot_id] = bot_config
+            self.owners[bot_id] = (user_id, bot_config['name'])
+            worker_id = self.placement[bot_id] = self.ring.node_for(bot_id)
+            if bot_id not in self.migrating:
+                self._send(worker_id, 'start', bot_id, bot_config, None)
+            return True
+
+    def stop_bot(self, user_id, bot_name):
+        bot_id = f"{user_id}_{bot_name}"
+        with self.lock:
+            if bot_id not in self.running_bots:
+                return False
+            del self.running_bots[bot_id]
+            worker_id = self.placement.pop(bot_id)
+            # Mid-migration the state arriving from the old worker is simply dropped
+            if bot_id not in self.migrating:
+                self._send(worker_id, 'stop', bot_id)
+            return True
+
+    def get_bot_status(self, user_id, bot_name):
+        return f"{user_id}_{bot_name}" in self.running_bots
+
+    def bot_status(self, user_id, bot_name, timeout=STATUS_TIMEOUT):
+        """Run statistics of a bot from its worker, or None if unavailable"""
+        bot_id = f"{user_id}_{bot_name}"
+        with self.lock:
+            if bot_id not in self.running_bots or bot_id in self.migrating:
+                return None
+            request_id = next(self.request_ids)
+            request = self.requests[request_id] = [threading.Event(), None]
+            self._send(self.placement[bot_id], 'status', request_id, bot_id)
+        request[0].wait(timeout)
+        with self.lock:
+            self.requests.pop(request_id, None)
+        return request[1]
+
+    # Worker pool changes, migrating only the bots whose owner changed
+
+    def add_worker(self):
+        self.start()
+        with self.lock:
+            worker_id = self._spawn()
+            self._rebalance()
+            return worker_id
+
+    def remove_worker(self, worker_id, timeout=10):
+        with self.lock:
+            if len(self.workers) == 1:
+                raise ValueError("cannot remove the last bot worker")
+            self.ring.remove(worker_id)
+            self._rebalance()
+            process, commands = self.workers.pop(worker_id)
+            # Queued after the migrations, so every bot has been handed over first
+            commands.put(('shutdown',))
+        process.join(timeout)
+
+    def _rebalance(self):
+        for bot_id, worker_id in list(self.placement.items()):
+            owner = self.ring.node_for(bot_id)
+            if owner == worker_id:
+                continue
+            self.placement[bot_id] = owner
+            if bot_id in self.migrating:
+                continue  # Already on its way; it is started wherever placement says on arrival
+            self.migrating.add(bot_id)
+            self._send(worker_id, 'migrate', bot_id)
+
+    def _listen(self):
+        while True:
+            kind, key, payload = self.replies.get()
+            if kind == 'stats':
+                self._record_stats(key, payload)
+                continue
+            with self.lock:
+                if kind == 'migrated':
+                    self.migrating.discard(key)
+                    if key in self.running_bots:
+                        self._send(self.placement[key], 'start', key, self.running_bots[key], payload)
+                elif kind == 'status':
+                    request = self.requests.get(key)
+                    if request is not None:
+                        request[1] = payload
+                        request[0].set()
+
+    def _record_stats(self, bot_id, delta):
+        owner = self.owners.get(bot_id)
+        if owner is None or self.on_stats is None:
+            return
+        try:
+            self.on_stats(*owner, delta)
+        except Exception as e:
+            print(f"Error recording stats of bot {bot_id}: {e}")
+
+    def shutdown(self, timeout=10):
+        with self.lock:
+            workers = list(self.workers.values())
+            self.workers.clear()
+            for _, commands in workers:
+                commands.put(('shutdown',))
+        for process, _ in workers:
+            process.join(timeout)
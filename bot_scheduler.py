@@ -0,0 +1,232 @@
+# Bot Scheduler
+#
+# Runs every live bot on one asyncio event loop (in a background thread, so
+# the Flask app can stay synchronous) instead of one sleeping OS thread per
+# bot. Bots are entries on a hashed timer wheel: a single ticker advances
+# the wheel every `tick` seconds and dispatches the bots whose slot came up.
+#
+# - Each bot has its own interval, plus random jitter so bots started
+#   together don't all hit the exchange on the same tick.
+# - Backpressure: at most max_concurrency bot steps run at once, and a bot
+#   whose previous step is still running when it comes due again skips
+#   that run instead of queueing a second one.
+# - Stopping removes the bot from the wheel and cancels its running step,
+#   so it never has to wait out the rest of an interval. A step already
+#   running in a thread can't be interrupted, so remove() waits (up to a
+#   timeout) for it to finish, and a bot re-added while its old step is
+#   still running skips runs until that step is done: two steps of one bot
+#   never overlap.
+#
+# A step is a callable taking no arguments. Coroutine functions run on the
+# loop; plain functions (blocking exchange calls) run in the scheduler's
+# thread pool.
+
+import asyncio
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+DEFAULT_TICK = 0.5
+DEFAULT_WHEEL_SIZE = 512
+DEFAULT_MAX_CONCURRENCY = 64
+DEFAULT_STOP_TIMEOUT = 10
+
+class ScheduledBot:
+    def __init__(self, bot_id, step, interval, jitter):
+        self.bot_id = bot_id
+        self.step = step
+        self.interval = interval
+        self.jitter = jitter
+        self.task = None  # Step currently running, if any
+        self.future = None  # Its thread pool future, for plain-function steps
+        self.slot = None  # Wheel slot holding the next run
+        self.runs = 0
+        self.skipped = 0
+        self.errors = 0
+
+class BotScheduler:
+    """Timer-wheel scheduler running bot steps as tasks on one event loop"""
+
+    def __init__(self, tick=DEFAULT_TICK, wheel_size=DEFAULT_WHEEL_SIZE,
+                 max_concurrency=DEFAULT_MAX_CONCURRENCY):
+        self.tick = tick
+        self.wheel = [{} for _ in range(wheel_size)]  # slot -> {bot_id: remaining rounds}
+        self.position = 0
+        self.max_concurrency = max_concurrency
+        self.bots = {}
+        self.draining = {}  # bot_id -> thread pool future of a removed bot's step still running
+        self.loop = None
+        self.executor = None
+        self.thread = None
+        self.started = threading.Event()
+
+    # Called from any thread
+
+    def start(self):
+        """Start the event loop thread (once)"""
+        if self.thread is not None:
+            return
+        self.thread = threading.Thread(target=self._run_loop, name='bot-scheduler', daemon=True)
+        self.thread.start()
+        self.started.wait()
+
+    def add(self, bot_id, step, interval=30, jitter=0.1):
+        """Schedule step() every `interval` seconds (± jitter·interval); False if already scheduled"""
+        self.start()
+        return self._call(self._add, bot_id, step, interval, jitter)
+
+    def remove(self, bot_id, timeout=DEFAULT_STOP_TIMEOUT):
+        """Unschedule a bot and cancel its running step; False if it wasn't scheduled
+
+        A step running in the thread pool is waited for (up to `timeout`
+        seconds), so unless that times out nothing of the bot is running once
+        this returns. Called from the loop thread it cannot wait.
+        """
+        if self.loop is None:
+            return False
+        removed, running = self._call(self._remove, bot_id)
+        if running is not None and threading.current_thread() is not self.thread:
+            wait([running], timeout)
+        return removed
+
+    def is_scheduled(self, bot_id):
+        return bot_id in self.bots
+
+    def stats(self, bot_id):
+        bot = self.bots.get(bot_id)
+        if bot is None:
+            return None
+        return {'runs': bot.runs, 'skipped': bot.skipped, 'errors': bot.errors,
+                'running': bot.task is not None}
+
+    def shutdown(self, timeout=5):
+        """Cancel every bot and stop the loop"""
+        if self.loop is None:
+            return
+        for bot_id in list(self.bots):
+            self.remove(bot_id, timeout)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout)
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.executor = None
+        self.loop = None
+        self.thread = None
+        self.started.clear()
+
+    def _call(self, function, *args):
+        """Run function(*args) on the loop thread and return its result"""
+        if threading.current_thread() is self.thread:
+            return function(*args)
+        future = asyncio.run_coroutine_threadsafe(self._invoke(function, *args), self.loop)
+        return future.result()
+
+    async def _invoke(self, function, *args):
+        return function(*args)
+
+    # Loop thread only
+
+    def _run_loop(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.semaphore = asyncio.Semaphore(self.max_concurrency)
+        self.executor = ThreadPoolExecutor(thread_name_prefix='bot-step')
+        self.loop.create_task(self._ticker())
+        self.loop.call_soon(self.started.set)
+        try:
+            self.loop.run_forever()
+        finally:
+            for task in asyncio.all_tasks(self.loop):
+                task.cancel()
+            self.loop.run_until_complete(asyncio.gather(*asyncio.all_tasks(self.loop), return_exceptions=True))
+            self.loop.close()
+
+    def _add(self, bot_id, step, interval, jitter):
+        if bot_id in self.bots:
+            return False
+        bot = self.bots[bot_id] = ScheduledBot(bot_id, step, interval, jitter)
+        # Runs are skipped until a step left over from before a remove() is done
+        previous = self.draining.pop(bot_id, None)
+        if previous is not None and not previous.done():
+            bot.future = previous
+            bot.task = self.loop.create_task(self._drain(bot, previous))
+        # First run within one jittered interval, spreading out bots added together
+        self._schedule(bot, random.uniform(0, max(jitter * interval, self.tick)))
+        return True
+
+    def _remove(self, bot_id):
+        """Unschedule; returns (removed, thread pool future of a step still running)"""
+        bot = self.bots.pop(bot_id, None)
+        if bot is None:
+            return False, None
+        self.wheel[bot.slot].pop(bot_id, None)
+        running = bot.future if bot.future is not None and not bot.future.done() else None
+        if bot.task is not None:
+            bot.task.cancel()
+        self.draining = {key: future for key, future in self.draining.items() if not future.done()}
+        if running is not None:
+            self.draining[bot_id] = running
+        return True, running
+
+    def _schedule(self, bot, delay):
+        ticks = max(1, round(delay / self.tick))
+        slot = (self.position + ticks) % len(self.wheel)
+        self.wheel[slot][bot.bot_id] = (ticks - 1) // len(self.wheel)
+        bot.slot = slot
+
+    def _next_delay(self, bot):
+        return bot.interval * (1 + random.uniform(-bot.jitter, bot.jitter))
+
+    async def _ticker(self):
+        next_tick = self.loop.time()
+        while True:
+            next_tick += self.tick
+            await asyncio.sleep(max(0, next_tick - self.loop.time()))
+            # Catch up on ticks missed while the loop was busy
+            while next_tick <= self.loop.time():
+                self._advance()
+                next_tick += self.tick
+            next_tick -= self.tick
+
+    def _advance(self):
+        self.position = (self.position + 1) % len(self.wheel)
+        slot = self.wheel[self.position]
+        for bot_id, rounds in list(slot.items()):
+            if rounds > 0:
+                slot[bot_id] = rounds - 1
+                continue
+            del slot[bot_id]
+            bot = self.bots[bot_id]
+            # Fixed-rate: the next run is scheduled now, not after this one finishes
+            self._schedule(bot, self._next_delay(bot))
+            if bot.task is not None:
+                bot.skipped += 1
+            else:
+                bot.task = self.loop.create_task(self._execute(bot))
+
+    async def _execute(self, bot):
+        try:
+            async with self.semaphore:
+                if asyncio.iscoroutinefunction(bot.step):
+                    await bot.step()
+                else:
+                    # Cancelling the task only stops waiting; the step runs to the end
+                    bot.future = self.executor.submit(bot.step)
+                    await asyncio.wrap_future(bot.future)
+            bot.runs += 1
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            bot.errors += 1
+            print(f"Error in bot {bot.bot_id}: {e}")
+        finally:
+            bot.task = None
+            bot.future = None
+
+    async def _drain(self, bot, previous):
+        try:
+            await asyncio.wrap_future(previous)
+        except BaseException:
+            pass  # Its outcome was the removed bot's
+        finally:
+            bot.task = None
+            bot.future = None
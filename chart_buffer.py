@@ -0,0 +1,103 @@
+# Chart Bar Buffers
+#
+# The dashboard polls the chart endpoint continuously. Instead of rebuilding
+# and re-serializing the whole window on every poll, each (symbol, interval)
+# keeps a ring buffer of its latest bars with every bar already encoded as
+# JSON. Polls merge in only the bars that are new (or the last bar, if it
+# is still forming) and answer by joining the pre-encoded slice.
+#
+# Every change bumps the buffer's version, which together with a per-buffer
+# token and the requested window (since, limit) makes the ETag, so unchanged
+# polls can be answered with a 304 and never get one for a different window.
+
+import json
+import threading
+import uuid
+import numpy as np
+
+DEFAULT_CAPACITY = 1000
+
+BAR_FIELDS = ('open', 'high', 'low', 'close', 'volume')
+
+def to_milliseconds(timestamps):
+    return np.asarray(timestamps).astype('datetime64[ns]').astype('datetime64[ms]').astype(np.int64)
+
+class ChartBuffer:
+    """Ring buffer of one symbol/interval's latest bars, pre-encoded as JSON"""
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self.timestamps = np.zeros(capacity, dtype=np.int64)  # bar open time in ms
+        self.encoded = [None] * capacity
+        self.head = 0  # Slot of the oldest bar
+        self.count = 0
+        self.version = 0
+        self.token = uuid.uuid4().hex[:12]  # Keeps ETags from another buffer/process from matching
+        self.lock = threading.Lock()
+
+    def slot(self, position):
+        return (self.head + position) % self.capacity
+
+    def last_timestamp(self):
+        """Open time (ms) of the newest bar, or None when empty"""
+        if self.count == 0:
+            return None
+        return int(self.timestamps[self.slot(self.count - 1)])
+
+    def update(self, bars):
+        """Merge bars (a column mapping, oldest first) into the buffer
+
+        Bars older than the newest buffered bar are ignored, one with the
+        same open time replaces it, later ones are appended (dropping the
+        oldest when full). Returns True if anything changed.
+        """
+        timestamps = to_milliseconds(bars['timestamp'])
+        with self.lock:
+            last = self.last_timestamp()
+            first = 0 if last is None else int(np.searchsorted(timestamps, last, side='left'))
+            if first == len(timestamps):
+                return False
+
+            # Round and convert every new bar at once, encode each one once
+            values = [timestamps[first:].tolist()] + [
+                np.round(np.asarray(bars[name][first:], dtype=float), 2).tolist() for name in BAR_FIELDS]
+
+            changed = False
+            for timestamp, o, h, l, c, v in zip(*values):
+                encoded = json.dumps({'timestamp': timestamp, 'open': o, 'high': h, 'low': l,
+                                      'close': c, 'volume': v}, separators=(',', ':'))
+                if timestamp == last:
+                    position = self.slot(self.count - 1)
+                    if self.encoded[position] == encoded:
+                        continue
+                else:
+                    if self.count == self.capacity:
+                        self.head = self.slot(1)
+                    else:
+                        self.count += 1
+                    position = self.slot(self.count - 1)
+                    self.timestamps[position] = timestamp
+                    last = timestamp
+                self.encoded[position] = encoded
+                changed = True
+
+            if changed:
+                self.version += 1
+            return changed
+
+    def etag(self, since=None, limit=None):
+        return f'{self.token}-{self.version}-{since}-{limit}'
+
+    def window(self, since=None, limit=None):
+        """Encoded bars opened at or after `since` (ms), at most the last `limit`, and the ETag"""
+        with self.lock:
+            order = self.slot(np.arange(self.count))
+            start = 0 if since is None else int(np.searchsorted(self.timestamps[order], since, side='left'))
+            if limit is not None:
+                start = max(start, self.count - limit)
+            return [self.encoded[i] for i in order[start:]], self.etag(since, limit)
+
+    def body(self, since=None, limit=None):
+        """JSON array of the window and its ETag"""
+        encoded, etag = self.window(since, limit)
+        return '[' + ','.join(encoded) + ']', etag
@@ -0,0 +1,221 @@
+# Event-Driven Backtesting
+#
+# Runs the same strategy classes as backtest_strategy, but through an order
+# lifecycle closer to a real exchange (and to MockExchange, which fills at
+# bid/ask):
+#
+# - a signal known at the start of a bar becomes a market order that reaches
+#   the exchange after `latency` and fills at the next bar open it sees
+# - fills pay half the spread, slippage (plus market impact that grows with
+#   the share of the bar's volume taken) and a fee on notional
+# - each bar fills at most participation_rate of its volume, so large orders
+#   fill partially and keep working on later bars
+# - stop_loss / take_profit (percent from entry) trigger on the bar's low /
+#   high and exit at the trigger price, or at the open if the bar gapped past
+#
+# Orders in flight sit in a heapq of (arrival time, sequence, side) tuples.
+# Everything else is scalar state, plus a preallocated fill array, so the
+# per-bar cost stays constant and no event objects are created.
+
+import heapq
+import numpy as np
+import pandas as pd
+from strategies import BUY, SELL, HOLD
+from backtest import column, periods_per_year, calculate_performance_metrics
+
+SIGNAL_CODES = {'buy': BUY, 'sell': SELL, 'hold': HOLD}
+
+# Why a fill happened
+REASON_SIGNAL = 0
+REASON_STOP_LOSS = 1
+REASON_TAKE_PROFIT = 2
+
+FILL_DTYPE = np.dtype([
+    ('bar', np.int64),
+    ('side', np.int8),  # BUY or SELL
+    ('price', np.float64),
+    ('amount', np.float64),
+    ('fee', np.float64),
+    ('reason', np.int8)
+])
+
+class FillBuffer:
+    """Append-only fill records in a growable structured array"""
+
+    def __init__(self, capacity=1024):
+        self.records = np.empty(capacity, dtype=FILL_DTYPE)
+        self.size = 0
+
+    def append(self, bar, side, price, amount, fee, reason):
+        if self.size == len(self.records):
+            self.records = np.resize(self.records, 2 * len(self.records))
+        self.records[self.size] = (bar, side, price, amount, fee, reason)
+        self.size += 1
+
+    def view(self):
+        return self.records[:self.size]
+
+def backtest_event_driven(strategy, data, fee_rate=0.001, spread_bps=2.0, slippage_bps=1.0,
+                          impact_bps=50.0, participation_rate=0.1, stop_loss=None,
+                          take_profit=None, latency=None):
+    """Event-driven backtest of a TradingStrategy
+
+    Costs are in basis points; impact_bps is the extra slippage for taking a
+    bar's entire volume. latency is a timedelta-like order delay (default none).
+    Returns (results, fills): a backtest_strategy-style result dict with cost
+    and fill statistics, and the FILL_DTYPE array of every fill.
+    """
+    print(f"Event-driven backtest of {strategy.name}...")
+
+    close = column(data, 'close', float)
+    open_ = column(data, 'open', float)
+    high = column(data, 'high', float)
+    low = column(data, 'low', float)
+    volume = column(data, 'volume', float)
+    times = column(data, 'timestamp', 'datetime64[ns]').astype(np.int64)
+    delay = 0 if latency is None else pd.Timedelta(latency).value
+    n_bars = len(close)
+
+    signals = strategy.generate_signals(close) if strategy.supports_vectorized else None
+    half_spread = spread_bps / 2e4
+    base_slippage = slippage_bps / 1e4
+
+    cash = float(strategy.balance)
+    position = 0.0
+    entry_cash = None  # Cash before the first fill of the open position
+    stop_price = take_price = None
+    round_trip_pnl = []
+
+    in_flight = []  # heap of (arrival time, sequence, side)
+    sequence = 0
+    last_intent = HOLD
+    working_side = HOLD  # Market order currently working at the exchange
+    working_remaining = 0.0  # Quote budget left (buys) or base amount left (sells)
+    working_reason = REASON_SIGNAL
+
+    fills = FillBuffer()
+    fees_paid = slippage_paid = 0.0
+    partial_fills = 0
+    equity = np.empty(n_bars)
+    in_position = np.empty(n_bars, dtype=bool)
+
+    for i in range(n_bars):
+        # 1. The signal for this bar (from closes before it) becomes an order
+        if signals is not None:
+            intent = signals[i]
+        else:
+            intent = SIGNAL_CODES[strategy.generate_signal(data, i)]
+
+        if intent != HOLD and intent != last_intent:
+            heapq.heappush(in_flight, (times[i] + delay, sequence, intent))
+            sequence += 1
+            last_intent = intent
+
+        # 2. Orders that reached the exchange by this bar replace the working order
+        while in_flight and in_flight[0][0] <= times[i]:
+            _, _, side = heapq.heappop(in_flight)
+            if side == BUY and position == 0:
+                working_side, working_remaining = BUY, cash * 0.95
+            elif side == SELL and position > 0:
+                working_side, working_remaining = SELL, position
+            else:
+                working_side = HOLD
+            working_reason = REASON_SIGNAL
+
+        capacity = participation_rate * volume[i]  # Quote notional this bar can absorb
+
+        # 3. The working order fills at the open, up to the bar's capacity
+        if working_side != HOLD and capacity > 0:
+            if working_side == BUY:
+                notional = min(working_remaining, capacity)
+                slip = base_slippage + impact_bps / 1e4 * notional / volume[i]
+                price = open_[i] * (1 + half_spread + slip)
+                fee = notional * fee_rate
+                amount = (notional - fee) / price
+                if entry_cash is None:
+                    entry_cash = cash
+                    if stop_loss is not None:
+                        stop_price = price * (1 - stop_loss / 100)
+                    if take_profit is not None:
+                        take_price = price * (1 + take_profit / 100)
+                cash -= notional
+                position += amount
+                working_remaining -= notional
+                done = working_remaining <= 1e-9
+            else:
+                amount = min(working_remaining, capacity / open_[i])
+                slip = base_slippage + impact_bps / 1e4 * amount * open_[i] / volume[i]
+                price = open_[i] * (1 - half_spread - slip)
+                fee = amount * price * fee_rate
+                cash += amount * price - fee
+                position -= amount
+                working_remaining -= amount
+                done = working_remaining <= 1e-12
+
+            fees_paid += fee
+            slippage_paid += amount * open_[i] * (half_spread + slip)
+            fills.append(i, working_side, price, amount, fee, working_reason)
+            if done:
+                working_side = HOLD
+            else:
+                partial_fills += 1
+
+        # 4. Protective exits against this bar's range (stop checked first)
+        if position > 0 and working_side != SELL:
+            trigger = None
+            if stop_price is not None and low[i] <= stop_price:
+                trigger, reason = min(open_[i], stop_price), REASON_STOP_LOSS
+            elif take_price is not None and high[i] >= take_price:
+                trigger, reason = max(open_[i], take_price), REASON_TAKE_PROFIT
+
+            if trigger is not None:
+                amount = min(position, capacity / trigger)
+                price = trigger * (1 - half_spread - base_slippage)
+                fee = amount * price * fee_rate
+                cash += amount * price - fee
+                position -= amount
+                fees_paid += fee
+                slippage_paid += amount * trigger * (half_spread + base_slippage)
+                if amount > 0:
+                    fills.append(i, SELL, price, amount, fee, reason)
+
+                # Whatever the bar couldn't absorb keeps working as a market sell
+                working_side, working_remaining, working_reason = SELL, position, reason
+                last_intent = SELL
+
+        # 5. Book the round trip once the position is fully closed
+        if entry_cash is not None and position <= 1e-12 and working_side != BUY:
+            round_trip_pnl.append(cash - entry_cash)
+            position = 0.0
+            entry_cash = None
+            stop_price = take_price = None
+            if working_side == SELL:
+                working_side = HOLD
+
+        equity[i] = cash + position * close[i]
+        in_position[i] = position > 0
+
+    strategy.balance = cash
+    strategy.position = position
+
+    fills = fills.view()
+    round_trip_pnl = np.array(round_trip_pnl)
+    final_value = equity[-1] if n_bars else cash
+    metrics = calculate_performance_metrics(equity, strategy.initial_balance,
+                                            periods_per_year(data['timestamp']), in_position)
+
+    results = {
+        'strategy_name': strategy.name,
+        'parameters': strategy.parameters,
+        'total_trades': len(fills),
+        'final_value': final_value,
+        'total_return': (final_value - strategy.initial_balance) / strategy.initial_balance * 100,
+        **metrics,
+        'win_rate': np.mean(round_trip_pnl > 0) * 100 if len(round_trip_pnl) else 0,
+        'fees_paid': fees_paid,
+        'slippage_paid': slippage_paid,
+        'partial_fills': partial_fills,
+        'stop_loss_exits': int(np.sum(fills['reason'] == REASON_STOP_LOSS)),
+        'take_profit_exits': int(np.sum(fills['reason'] == REASON_TAKE_PROFIT))
+    }
+    return results, fills
@@ -0,0 +1,66 @@
+# Indicator Cache
+#
+# Full indicator series (SMA, RSI, ...) keyed by (dataset fingerprint,
+# indicator type, period), so strategies in a sweep that share a period
+# compute that series once per dataset. Entries are evicted least recently
+# used first once the cache grows past its memory budget.
+
+import hashlib
+from collections import OrderedDict
+import numpy as np
+
+DEFAULT_CACHE_BYTES = 256 * 1024 * 1024  # 256 MB
+
+def dataset_fingerprint(values):
+    """Content hash of a price array"""
+    values = np.ascontiguousarray(values)
+    digest = hashlib.blake2b(values, digest_size=16)
+    digest.update(str((values.dtype.str, values.shape)).encode())
+    return digest.hexdigest()
+
+class IndicatorCache:
+    """LRU cache of indicator arrays bounded by total array size"""
+
+    def __init__(self, max_bytes=DEFAULT_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, fingerprint, kind, period, compute):
+        """Return the cached series, calling compute() to fill it on a miss"""
+        key = (fingerprint, kind, period)
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return self.entries[key]
+
+        self.misses += 1
+        series = np.asarray(compute())
+        series.flags.writeable = False  # shared between strategies
+
+        if series.nbytes <= self.max_bytes:
+            self.entries[key] = series
+            self.nbytes += series.nbytes
+            while self.nbytes > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.nbytes -= evicted.nbytes
+
+        return series
+
+    def clear(self):
+        self.entries.clear()
+        self.nbytes = 0
+
+    def stats(self):
+        return {
+            'entries': len(self.entries),
+            'bytes': self.nbytes,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses
+        }
+
+# Process-wide cache used by the vectorized strategies (one per sweep worker)
+indicator_cache = IndicatorCache()
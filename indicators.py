@@ -0,0 +1,119 @@
+# Streaming Technical Indicators
+#
+# Every indicator keeps constant-size state and is fed one price per tick
+# through update(), which returns the current value (None until warmed up).
+# Used by the backtest loop engine and by live bots, so both see the same
+# numbers without re-scanning the price history on every bar.
+
+from collections import deque
+
+class SMA:
+    """Simple moving average backed by a rolling sum"""
+
+    def __init__(self, period):
+        self.period = period
+        self.reset()
+
+    def reset(self):
+        self.window = deque(maxlen=self.period)
+        self.total = 0.0
+        self.updates = 0
+
+    @property
+    def ready(self):
+        return len(self.window) == self.period
+
+    @property
+    def value(self):
+        return self.total / self.period if self.ready else None
+
+    def update(self, price):
+        if self.ready:
+            self.total -= self.window[0]
+        self.window.append(price)
+        self.total += price
+
+        # Re-sum once per full window so add/subtract rounding can't drift
+        self.updates += 1
+        if self.updates % self.period == 0:
+            self.total = sum(self.window)
+
+        return self.value
+
+class EMA:
+    """Exponential moving average seeded with the SMA of the first period prices"""
+
+    def __init__(self, period):
+        self.period = period
+        self.alpha = 2 / (period + 1)
+        self.reset()
+
+    def reset(self):
+        self.seed = SMA(self.period)
+        self.value = None
+
+    @property
+    def ready(self):
+        return self.value is not None
+
+    def update(self, price):
+        if self.value is None:
+            self.value = self.seed.update(price)
+        else:
+            self.value += self.alpha * (price - self.value)
+        return self.value
+
+class RSI:
+    """Relative Strength Index over price changes
+
+    smoothing='wilder' uses Wilder's recursive average (seeded with the simple
+    mean of the first period changes); smoothing='simple' uses a plain rolling
+    mean of the last period gains and losses.
+    """
+
+    def __init__(self, period=14, smoothing='wilder'):
+        if smoothing not in ('wilder', 'simple'):
+            raise ValueError(f"Unknown RSI smoothing: {smoothing}")
+        self.period = period
+        self.smoothing = smoothing
+        self.reset()
+
+    def reset(self):
+        self.last_price = None
+        self.avg_gain = SMA(self.period)
+        self.avg_loss = SMA(self.period)
+        self.wilder_gain = None
+        self.wilder_loss = None
+        self.value = None
+
+    @property
+    def ready(self):
+        return self.value is not None
+
+    def update(self, price):
+        if self.last_price is None:
+            self.last_price = price
+            return None
+
+        delta = price - self.last_price
+        self.last_price = price
+        gain = delta if delta > 0 else 0.0
+        loss = -delta if delta < 0 else 0.0
+
+        if self.smoothing == 'wilder' and self.wilder_gain is not None:
+            self.wilder_gain = (self.wilder_gain * (self.period - 1) + gain) / self.period
+            self.wilder_loss = (self.wilder_loss * (self.period - 1) + loss) / self.period
+            avg_gain, avg_loss = self.wilder_gain, self.wilder_loss
+        else:
+            avg_gain = self.avg_gain.update(gain)
+            avg_loss = self.avg_loss.update(loss)
+            if avg_gain is None:
+                return None
+            if self.smoothing == 'wilder':
+                self.wilder_gain, self.wilder_loss = avg_gain, avg_loss
+
+        if avg_loss == 0:
+            self.value = 100
+        else:
+            self.value = 100 - (100 / (1 + avg_gain / avg_loss))
+        return self.value
@@ -0,0 +1,47 @@
+# Compiled Signal Kernels
+#
+# Strategies with path-dependent logic (trailing stops, state that depends
+# on earlier fills) can't be written as NumPy vector ops. Instead they
+# provide a step function that decides one bar at a time:
+#
+#     step(i, close, params, state) -> BUY, SELL or HOLD for bar i
+#
+# using only close[:i] (bars before i, like generate_signal), a float64
+# params array and a float64 state array it may update in place. Step
+# functions must stick to scalar arithmetic, loops and array indexing so
+# numba can compile them.
+#
+# With numba installed the loop over bars and the step function are
+# JIT-compiled; without it the same Python functions run interpreted. Both
+# paths execute the same operations on float64 values and give identical
+# signals. numba is only imported on the first compiled run, so importing
+# strategies stays cheap for workers that never use a kernel.
+
+import importlib.util
+import numpy as np
+
+JIT_AVAILABLE = importlib.util.find_spec('numba') is not None
+
+def signal_loop(step, close, params, state):
+    """Signal code for every bar from a step function"""
+    signals = np.zeros(len(close), dtype=np.int8)
+    for i in range(len(close)):
+        signals[i] = step(i, close, params, state)
+    return signals
+
+_compiled = {}
+
+def compiled(function, **options):
+    """JIT-compiled version of a function (compiled once per function)"""
+    if function not in _compiled:
+        from numba import njit
+        _compiled[function] = njit(**options)(function)
+    return _compiled[function]
+
+def run_kernel(step, close, params, state, jit=True):
+    """Run `step` over every bar, JIT-compiled when numba is available and jit is set"""
+    close = np.ascontiguousarray(close, dtype=np.float64)
+    params = np.ascontiguousarray(params, dtype=np.float64)
+    if jit and JIT_AVAILABLE:
+        return compiled(signal_loop)(compiled(step, cache=True), close, params, state)
+    return signal_loop(step, close, params, state)
@@ -8,14 +8,17 @@ from flask import Flask, send_from_directory, request, jsonify, session
 from flask_cors import CORS
 from src.models.user import db
 from src.routes.user import user_bp
-from src.routes.trading import trading_bp
+from src.routes.trading import trading_bp, MockExchange
 from src.routes.portfolio import portfolio_bp
 from src.routes.market_data import market_data_bp
 import json
+import multiprocessing
 from datetime import datetime, timedelta
-import uuid
-import threading
-import time
+from sqlalchemy.exc import IntegrityError
+from werkzeug.serving import is_running_from_reloader
+from bot_runtime import ShardedBotRuntime
+from bot_registry import (RUNNING, STOPPED, create_bot as register_bot, dashboard_totals, format_money,
+                          get_bot, record_stats, restore_running_bots, set_status, user_bots)
 
 app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
 app.config['SECRET_KEY'] = 'trading-bot-secret-key-change-in-production'
@@ -36,92 +39,34 @@ db.init_app(app)
 with app.app_context():
     db.create_all()
 
-# Global bot manager for running trading bots
-class BotManager:
-    def __init__(self):
-        self.running_bots = {}
-        self.bot_threads = {}
-    
-    def start_bot(self, user_id, bot_config):
-        bot_id = f"{user_id}_{bot_config['name']}"
-        if bot_id not in self.running_bots:
-            self.running_bots[bot_id] = bot_config
-            thread = threading.Thread(target=self._run_bot, args=(bot_id, bot_config))
-            thread.daemon = True
-            thread.start()
-            self.bot_threads[bot_id] = thread
-            return True
-        return False
-    
-    def stop_bot(self, user_id, bot_name):
-        bot_id = f"{user_id}_{bot_name}"
-        if bot_id in self.running_bots:
-            del self.running_bots[bot_id]
-            return True
+def save_bot_stats(user_id, bot_name, stats):
+    """Persist the fills and PnL a bot worker reported"""
+    with app.app_context():
+        record_stats(user_id, bot_name, stats)
+
+# Bots run in worker processes, sharded by bot_id (BOT_WORKERS, default one per core)
+bot_manager = ShardedBotRuntime(int(os.environ.get('BOT_WORKERS', 0)) or None, exchange_factory=MockExchange,
+                                on_stats=save_bot_stats)
+
+def should_restore_bots():
+    """Only the serving process restores bots: not the bot workers (which import
+    this module when spawned) and not the debug reloader's watcher process"""
+    # (parent_process() isn't set yet while a spawned child imports its main module)
+    if multiprocessing.current_process().name != 'MainProcess':
         return False
-    
-    def get_bot_status(self, user_id, bot_name):
-        bot_id = f"{user_id}_{bot_name}"
-        return bot_id in self.running_bots
-    
-    def _run_bot(self, bot_id, bot_config):
-        """Simplified bot execution loop"""
-        print(f"Starting bot {bot_id} with config: {bot_config}")
-        
-        while bot_id in self.running_bots:
-            try:
-                # Simulate trading logic
-                # In a real implementation, this would:
-                # 1. Fetch market data
-                # 2. Apply trading strategy
-                # 3. Execute trades if conditions are met
-                # 4. Update portfolio
-                
-                print(f"Bot {bot_id} checking market conditions...")
-                
-                # Simulate a trade decision
-                if bot_config.get('strategy') == 'simple_moving_average':
-                    # Placeholder for SMA strategy
-                    pass
-                
-                time.sleep(30)  # Check every 30 seconds
-                
-            except Exception as e:
-                print(f"Error in bot {bot_id}: {e}")
-                break
-        
-        print(f"Bot {bot_id} stopped")
-
-bot_manager = BotManager()
+    return __name__ != '__main__' or is_running_from_reloader()
+
+# Resume every bot that was running when the process last stopped
+if should_restore_bots():
+    with app.app_context():
+        restore_running_bots(bot_manager)
 
 @app.route('/api/bots', methods=['GET'])
 def get_user_bots():
     """Get all bots for the current user"""
     user_id = session.get('user_id', 'demo_user')
     
-    # In a real implementation, this would query the database
-    demo_bots = [
-        {
-            'id': '1',
-            'name': 'BTC Scalper',
-            'strategy': 'simple_moving_average',
-            'status': 'running' if bot_manager.get_bot_status(user_id, 'BTC Scalper') else 'stopped',
-            'profit_loss': '+$125.50',
-            'trades_today': 8,
-            'created_at': '2024-01-15'
-        },
-        {
-            'id': '2',
-            'name': 'ETH Arbitrage',
-            'strategy': 'arbitrage',
-            'status': 'running' if bot_manager.get_bot_status(user_id, 'ETH Arbitrage') else 'stopped',
-            'profit_loss': '+$89.20',
-            'trades_today': 3,
-            'created_at': '2024-01-10'
-        }
-    ]
-    
-    return jsonify(demo_bots)
+    return jsonify([bot.to_dict() for bot in user_bots(user_id)])
 
 @app.route('/api/bots', methods=['POST'])
 def create_bot():
@@ -129,6 +74,9 @@ def create_bot():
     data = request.get_json()
     user_id = session.get('user_id', 'demo_user')
     
+    if not data.get('name') or not data.get('strategy'):
+        return jsonify({'success': False, 'message': 'name and strategy are required'}), 400
+    
     bot_config = {
         'name': data.get('name'),
         'strategy': data.get('strategy'),
@@ -136,14 +84,19 @@ def create_bot():
         'amount': data.get('amount'),
         'risk_level': data.get('risk_level', 'medium'),
         'stop_loss': data.get('stop_loss', 5),
-        'take_profit': data.get('take_profit', 10)
+        'take_profit': data.get('take_profit', 10),
+        'parameters': data.get('parameters', {})
     }
     
-    # In a real implementation, save to database
+    try:
+        bot = register_bot(user_id, bot_config)
+    except IntegrityError:
+        return jsonify({'success': False, 'message': 'A bot with this name already exists'}), 409
+    
     return jsonify({
         'success': True,
         'message': 'Bot created successfully',
-        'bot_id': str(uuid.uuid4())
+        'bot_id': str(bot.id)
     })
 
 @app.route('/api/bots/<bot_id>/start', methods=['POST'])
@@ -151,14 +104,13 @@ def start_bot(bot_id):
     """Start a trading bot"""
     user_id = session.get('user_id', 'demo_user')
     
-    # Mock bot configuration
-    bot_config = {
-        'name': f'Bot_{bot_id}',
-        'strategy': 'simple_moving_average',
-        'symbol': 'BTC/USDT'
-    }
+    bot = get_bot(user_id, bot_id)
+    if bot is None:
+        return jsonify({'success': False, 'message': 'Bot not found'}), 404
     
-    success = bot_manager.start_bot(user_id, bot_config)
+    success = bot.status != RUNNING
+    bot_manager.start_bot(user_id, bot.runtime_config())
+    set_status(bot, RUNNING)
     
     return jsonify({
         'success': success,
@@ -170,21 +122,45 @@ def stop_bot(bot_id):
     """Stop a trading bot"""
     user_id = session.get('user_id', 'demo_user')
     
-    success = bot_manager.stop_bot(user_id, f'Bot_{bot_id}')
+    bot = get_bot(user_id, bot_id)
+    if bot is None:
+        return jsonify({'success': False, 'message': 'Bot not found'}), 404
+    
+    success = bot.status == RUNNING
+    bot_manager.stop_bot(user_id, bot.name)
+    set_status(bot, STOPPED)
     
     return jsonify({
         'success': success,
         'message': 'Bot stopped successfully' if success else 'Bot not running'
     })
 
+@app.route('/api/bots/<bot_id>/status', methods=['GET'])
+def get_bot_status(bot_id):
+    """Get a trading bot's run statistics from the worker running it"""
+    user_id = session.get('user_id', 'demo_user')
+    
+    bot = get_bot(user_id, bot_id)
+    if bot is None:
+        return jsonify({'error': 'Bot not found'}), 404
+    
+    running = bot.status == RUNNING
+    return jsonify({
+        'status': bot.status,
+        'details': bot_manager.bot_status(user_id, bot.name) if running else None
+    })
+
 @app.route('/api/dashboard/stats', methods=['GET'])
 def get_dashboard_stats():
     """Get dashboard statistics"""
+    user_id = session.get('user_id', 'demo_user')
+    
+    totals = dashboard_totals(user_id)
     return jsonify({
-        'total_profit': '+$1,234.56',
-        'active_bots': 2,
-        'total_trades': 156,
-        'success_rate': '78.5%',
+        'total_profit': format_money(totals['profit_loss'], signed=True),
+        'active_bots': totals['active_bots'],
+        'total_trades': totals['trades_today'],
+        'success_rate': f"{totals['success_rate']:.1f}%",
         'portfolio_value': '$10,500.00',
         'daily_change': '+2.3%'
     })
@@ -1,12 +1,97 @@
 # Market Data Routes
 
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify
+import os
 import json
 import random
+import threading
+from collections import OrderedDict
+import numpy as np
 from datetime import datetime, timedelta
+from price_data import PriceGenerator
+from ohlcv_store import OHLCVStore, INTERVAL_FREQS
+from resample import ResampleCache, finer_intervals, interval_nanoseconds
+from chart_buffer import ChartBuffer, DEFAULT_CAPACITY
 
 market_data_bp = Blueprint('market_data', __name__)
 
+# Optional on-disk OHLCV history; chart requests fall back to mock bars without it
+ohlcv_store = OHLCVStore(os.environ['OHLCV_STORE_PATH']) if os.environ.get('OHLCV_STORE_PATH') else None
+
+# Higher-timeframe bars built from finer stored series, kept up to date as bars are appended
+resample_cache = ResampleCache()
+
+# Latest bars per (symbol, interval), served to chart polls without re-serializing.
+# Symbols come from the URL, so only the most recently polled MAX_CHARTS are
+# kept; evicting a chart also drops its mock generator. charts_lock only
+# guards the LRU bookkeeping, each chart refreshes under its own lock.
+MAX_CHARTS = 256
+chart_buffers = OrderedDict()
+mock_generators = {}
+charts_lock = threading.Lock()
+
+def mock_bars(symbol, interval, since):
+    """Mock bars opened since the last call, continuing one generated path per chart"""
+    key = (symbol, interval)
+    step = np.timedelta64(interval_nanoseconds(interval), 'ns')
+    now = np.datetime64(datetime.now(), 'ns')
+    
+    generator = mock_generators.get(key)
+    if generator is None or since is None:
+        base_price = 45000 if 'BTC' in symbol else 3200 if 'ETH' in symbol else 100
+        first_open = (now - DEFAULT_CAPACITY * step).astype(np.int64) // step.astype(np.int64) * step.astype(np.int64)
+        generator = PriceGenerator(base_price, freq=INTERVAL_FREQS[interval], start=first_open.view('datetime64[ns]'))
+        mock_generators[key] = generator
+    
+    # Every bar that has opened by now, including the one still forming
+    next_open = generator.start + generator.bar_index * step
+    n_bars = int((now - next_open) // step) + 1 if now >= next_open else 0
+    chunk = generator.next_chunk(n_bars)
+    return {name: values if name == 'timestamp' else values[:, 0] for name, values in chunk.items()}
+
+def source_bars(symbol, interval, since=None, limit=DEFAULT_CAPACITY):
+    """Bars opened at or after `since` (or the last `limit`): stored, resampled from a finer stored series, or mock"""
+    if ohlcv_store is not None:
+        if ohlcv_store.has(symbol, interval):
+            return ohlcv_store.read(symbol, interval, start=since, limit=None if since is not None else limit)
+        for base_interval in finer_intervals(interval):
+            if ohlcv_store.has(symbol, base_interval):
+                base = ohlcv_store.columns(symbol, base_interval)
+                bars = resample_cache.get(symbol, base_interval, interval, base)
+                if since is None:
+                    first = max(len(bars['timestamp']) - limit, 0)
+                else:
+                    first = int(np.searchsorted(bars['timestamp'], since.astype('datetime64[ns]'), side='left'))
+                return {name: values[first:] for name, values in bars.items()}
+    
+    return mock_bars(symbol, interval, since)
+
+def refresh_chart(symbol, interval):
+    """The chart buffer of symbol/interval with any new bars merged in"""
+    key = (symbol, interval)
+    with charts_lock:
+        entry = chart_buffers.get(key)
+        if entry is None:
+            entry = chart_buffers[key] = (ChartBuffer(), threading.Lock())
+            while len(chart_buffers) > MAX_CHARTS:
+                evicted, _ = chart_buffers.popitem(last=False)
+                mock_generators.pop(evicted, None)
+        else:
+            chart_buffers.move_to_end(key)
+    
+    # A slow store read or resample only holds up polls of this chart
+    buffer, lock = entry
+    with lock:
+        last = buffer.last_timestamp()
+        since = None if last is None else np.datetime64(last, 'ms')
+        buffer.update(source_bars(symbol, interval, since, buffer.capacity))
+    
+    # Evicted mid-refresh: don't leave the generator it just created behind
+    with charts_lock:
+        if key not in chart_buffers:
+            mock_generators.pop(key, None)
+    return buffer
+
 @market_data_bp.route('/prices', methods=['GET'])
 def get_market_prices():
     """Get current market prices for major cryptocurrencies"""
@@ -62,38 +147,36 @@ def get_chart_data(symbol):
     """Get historical chart data for a symbol"""
     
     interval = request.args.get('interval', '1h')  # 1m, 5m, 15m, 1h, 4h, 1d
-    limit = int(request.args.get('limit', 100))
+    limit = request.args.get('limit', '100')
+    since = request.args.get('since')  # Open time (ms) of the last bar the client has
     
-    # Generate mock OHLCV data
-    chart_data = []
-    base_price = 45000 if 'BTC' in symbol else 3200 if 'ETH' in symbol else 100
+    if interval not in INTERVAL_FREQS:
+        return jsonify({'error': f'Unsupported interval: {interval}'}), 400
+    try:
+        limit = int(limit)
+    except ValueError:
+        limit = 0
+    if limit <= 0:
+        return jsonify({'error': 'limit must be a positive integer'}), 400
+    limit = min(limit, DEFAULT_CAPACITY)
+    try:
+        since = int(since) if since is not None else None
+    except ValueError:
+        return jsonify({'error': 'since must be a timestamp in milliseconds'}), 400
     
-    for i in range(limit):
-        timestamp = datetime.now() - timedelta(hours=limit-i)
-        
-        # Simulate price movement
-        change = random.uniform(-0.02, 0.02)  # ±2% change
-        base_price *= (1 + change)
-        
-        # Generate OHLCV
-        open_price = base_price
-        high_price = open_price * (1 + random.uniform(0, 0.01))
-        low_price = open_price * (1 - random.uniform(0, 0.01))
-        close_price = open_price + random.uniform(-0.005, 0.005) * open_price
-        volume = random.uniform(1000000, 10000000)
-        
-        chart_data.append({
-            'timestamp': int(timestamp.timestamp() * 1000),
-            'open': round(open_price, 2),
-            'high': round(high_price, 2),
-            'low': round(low_price, 2),
-            'close': round(close_price, 2),
-            'volume': round(volume, 2)
-        })
-        
-        base_price = close_price
+    buffer = refresh_chart(symbol, interval)
     
-    return jsonify(chart_data)
+    # Only bars opened at or after `since`: the client's last bar (it may
+    # still have been forming) and anything newer
+    etag = buffer.etag(since, limit)
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        body, etag = buffer.body(since, limit)
+        response = Response(body, mimetype='application/json')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
 
 @market_data_bp.route('/orderbook/<symbol>', methods=['GET'])
 def get_orderbook(symbol):
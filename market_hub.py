@@ -0,0 +1,157 @@
+# Market Data Hub
+#
+# Running bots share market data instead of each fetching its own: the hub
+# fetches every subscribed symbol once per interval (as one job on the bot
+# scheduler), however many bots watch it, and publishes the result as an
+# immutable MarketSnapshot (ticker, order book, recent candles).
+#
+# Publishing swaps the symbol's snapshot reference in one assignment, so
+# readers never lock: latest(symbol) returns whichever complete snapshot
+# was current, and nothing in it changes afterwards (candle arrays are
+# read-only copies). Writers (publishing, subscription changes) do take the
+# lock, so a fetch that finishes after its last subscriber left never
+# publishes a stale snapshot. Subscribers may also pass a callback, which is pushed
+# every new snapshot right after it is published.
+#
+# Candles (timestamps in ms) come from the exchange's fetch_ohlcv when it
+# has one (ccxt exchanges do), otherwise they are built from the fetched
+# tickers.
+
+import itertools
+import threading
+import time
+import numpy as np
+
+DEFAULT_INTERVAL = 5
+CANDLE_INTERVAL = 60  # seconds per candle built from tickers
+CANDLE_LIMIT = 500
+
+class MarketSnapshot:
+    """One symbol's market data at one point in time (never mutated)"""
+
+    __slots__ = ('symbol', 'sequence', 'timestamp', 'ticker', 'order_book', 'candles')
+
+    def __init__(self, symbol, sequence, timestamp, ticker, order_book, candles):
+        self.symbol = symbol
+        self.sequence = sequence
+        self.timestamp = timestamp
+        self.ticker = ticker
+        self.order_book = order_book
+        self.candles = candles
+
+    @property
+    def price(self):
+        return self.ticker['last']
+
+class TickerCandles:
+    """Rolling OHLC candles built from ticker prices"""
+
+    def __init__(self, interval=CANDLE_INTERVAL, limit=CANDLE_LIMIT):
+        self.interval = interval
+        self.limit = limit
+        self.columns = {name: np.empty(0) for name in ('timestamp', 'open', 'high', 'low', 'close')}
+
+    def update(self, timestamp, price):
+        """Fold one price (timestamp in ms) in and return read-only copies of the candles"""
+        columns = self.columns
+        width = self.interval * 1000
+        bucket = timestamp // width * width
+        if len(columns['timestamp']) and columns['timestamp'][-1] == bucket:
+            columns['high'][-1] = max(columns['high'][-1], price)
+            columns['low'][-1] = min(columns['low'][-1], price)
+            columns['close'][-1] = price
+        else:
+            row = {'timestamp': bucket, 'open': price, 'high': price, 'low': price, 'close': price}
+            self.columns = columns = {name: np.append(values[-(self.limit - 1):], row[name])
+                                      for name, values in columns.items()}
+        return frozen(columns)
+
+def frozen(columns):
+    candles = {}
+    for name, values in columns.items():
+        values = np.array(values, dtype=float)
+        values.setflags(write=False)
+        candles[name] = values
+    return candles
+
+class MarketDataHub:
+    """One fetch per subscribed symbol per interval, shared by every subscriber"""
+
+    def __init__(self, exchange, scheduler, interval=DEFAULT_INTERVAL, candle_timeframe='1m',
+                 candle_limit=CANDLE_LIMIT):
+        self.exchange = exchange
+        self.scheduler = scheduler
+        self.interval = interval
+        self.candle_timeframe = candle_timeframe
+        self.candle_limit = candle_limit
+        self.snapshots = {}  # symbol -> latest MarketSnapshot, replaced whole
+        self.subscribers = {}  # symbol -> {subscriber_id: callback}, replaced whole on change
+        self.ticker_candles = {}
+        self.sequence = itertools.count(1)
+        self.lock = threading.Lock()  # Writers only; reads never take it
+
+    def job_id(self, symbol):
+        return f'market:{symbol}'
+
+    def subscribe(self, symbol, subscriber_id, callback=None):
+        """Start receiving `symbol`; the first subscriber starts its fetch job"""
+        with self.lock:
+            subscribers = dict(self.subscribers.get(symbol, {}))
+            subscribers[subscriber_id] = callback
+            self.subscribers[symbol] = subscribers
+            if len(subscribers) == 1:
+                self.scheduler.add(self.job_id(symbol), lambda: self.refresh(symbol),
+                                   interval=self.interval, jitter=0)
+
+    def unsubscribe(self, symbol, subscriber_id):
+        """Stop receiving `symbol`; the last subscriber stops its fetch job"""
+        with self.lock:
+            subscribers = dict(self.subscribers.get(symbol, {}))
+            subscribers.pop(subscriber_id, None)
+            if subscribers:
+                self.subscribers[symbol] = subscribers
+                return
+            self.subscribers.pop(symbol, None)
+            # No waiting for a fetch in flight: it needs this lock to publish,
+            # and finding no subscribers it drops its snapshot
+            self.scheduler.remove(self.job_id(symbol), timeout=0)
+            self.snapshots.pop(symbol, None)
+            self.ticker_candles.pop(symbol, None)
+
+    def latest(self, symbol):
+        """Current MarketSnapshot of symbol, or None before the first fetch"""
+        return self.snapshots.get(symbol)
+
+    def refresh(self, symbol):
+        """Fetch symbol once, publish the snapshot and push it to subscribers (None if nobody is subscribed)"""
+        now = time.time()
+        ticker = self.exchange.fetch_ticker(symbol)
+        order_book = None
+        if hasattr(self.exchange, 'fetch_order_book'):
+            order_book = self.exchange.fetch_order_book(symbol)
+
+        if hasattr(self.exchange, 'fetch_ohlcv'):
+            rows = np.asarray(self.exchange.fetch_ohlcv(symbol, self.candle_timeframe,
+                                                        limit=self.candle_limit), dtype=float)
+            names = ('timestamp', 'open', 'high', 'low', 'close', 'volume')
+            candles = frozen({name: rows[:, i] if len(rows) else np.empty(0) for i, name in enumerate(names)})
+        else:
+            candles = None
+
+        with self.lock:
+            subscribers = self.subscribers.get(symbol)
+            if subscribers is None:
+                return None  # Unsubscribed while fetching
+            if candles is None:
+                builder = self.ticker_candles.setdefault(symbol, TickerCandles(limit=self.candle_limit))
+                candles = builder.update(int(now * 1000), ticker['last'])
+            snapshot = MarketSnapshot(symbol, next(self.sequence), now, dict(ticker), order_book, candles)
+            self.snapshots[symbol] = snapshot
+
+        for subscriber_id, callback in subscribers.items():
+            if callback is not None:
+                try:
+                    callback(snapshot)
+                except Exception as e:
+                    print(f"Error pushing {symbol} to {subscriber_id}: {e}")
+        return snapshot
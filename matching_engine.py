@@ -0,0 +1,430 @@
+# Order Matching Engine
+#
+# Local exchange stand-in: limit and market orders matched on a price-time
+# priority order book per symbol, with balances kept per account.
+#
+# Concurrency:
+# - each symbol's book has its own lock, so orders on different symbols
+#   match in parallel
+# - account balances are guarded by lock striping: an account hashes to one
+#   of n_stripes locks, so requests for different accounts rarely contend
+#   and no lock is held per account
+# - the book lock is only held to match: an order plans its fills, reserves
+#   the taker's funds (under the taker's stripe), claims the makers'
+#   quantities and reservations and rests any remainder. Balances are then
+#   settled under the stripes of every account involved, in stripe order,
+#   after the book lock is released, so orders on one symbol only queue
+#   for the match itself. A book lock is never taken with a stripe held, so
+#   the locks can't deadlock, and a fill moves funds between both accounts
+#   atomically
+#
+# Funds are reserved when an order rests on the book (free -> used), so a
+# maker can always settle the fills against it. With house liquidity on,
+# the exchange itself also quotes every symbol at the ticker's bid/ask with
+# unlimited size (behind any resting order at the same price), which keeps
+# market orders filling on an empty book as the old mock exchange did.
+#
+# Memory stays flat over a long run: only open orders are indexed (closed
+# and cancelled ones leave the index and the book), and each account keeps
+# its last HISTORY_LIMIT orders and trades.
+
+import heapq
+import itertools
+import threading
+import uuid
+from collections import defaultdict, deque
+from datetime import datetime
+
+DEFAULT_STRIPES = 64
+HISTORY_LIMIT = 1000  # Orders and trades kept per account
+DUST = 1e-12  # Relative amount treated as fully filled
+HOUSE = None  # Account of house liquidity fills (no balance)
+
+class OrderError(Exception):
+    """Order rejected (insufficient balance, bad parameters, unknown order)"""
+
+class Accounts:
+    """Per-account balances behind a fixed set of striped locks"""
+
+    def __init__(self, initial_balance=None, n_stripes=DEFAULT_STRIPES):
+        self.initial_balance = dict(initial_balance or {})
+        self.stripes = [threading.Lock() for _ in range(n_stripes)]
+        self.balances = {}  # account -> {asset: [free, used]}
+        self.create_lock = threading.Lock()
+
+    def stripe(self, account):
+        return hash(account) % len(self.stripes)
+
+    def locked(self, accounts):
+        """Context manager holding the stripes of every account given, in stripe order"""
+        return StripeLocks([self.stripes[i] for i in sorted({self.stripe(a) for a in accounts if a is not HOUSE})])
+
+    def get(self, account):
+        """Balance table of an account, created with the initial balance on first use"""
+        balance = self.balances.get(account)
+        if balance is None:
+            with self.create_lock:
+                balance = self.balances.setdefault(
+                    account, {asset: [amount, 0.0] for asset, amount in self.initial_balance.items()})
+        return balance
+
+    def asset(self, account, asset):
+        return self.get(account).setdefault(asset, [0.0, 0.0])
+
+    def snapshot(self, account):
+        with self.locked([account]):
+            balance = self.get(account)
+            return {
+                'free': {asset: values[0] for asset, values in balance.items()},
+                'used': {asset: values[1] for asset, values in balance.items()},
+                'total': {asset: values[0] + values[1] for asset, values in balance.items()}
+            }
+
+class StripeLocks:
+    def __init__(self, locks):
+        self.locks = locks
+
+    def __enter__(self):
+        for lock in self.locks:
+            lock.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        for lock in reversed(self.locks):
+            lock.release()
+
+class OrderBook:
+    """Resting limit orders of one symbol, best price first, then oldest first"""
+
+    def __init__(self, symbol):
+        self.symbol = symbol
+        self.lock = threading.Lock()
+        self.levels = {'buy': {}, 'sell': {}}  # side -> {price: deque of orders}
+        self.heaps = {'buy': [], 'sell': []}  # -price for bids, price for asks (may hold stale prices)
+        self.last_price = None
+
+    def _key(self, side, price):
+        return -price if side == 'buy' else price
+
+    def best(self, side):
+        """Best price with resting orders on `side`, or None"""
+        heap, levels = self.heaps[side], self.levels[side]
+        while heap:
+            price = -heap[0] if side == 'buy' else heap[0]
+            queue = levels.get(price)
+            while queue and queue[0]['remaining'] <= 0:
+                queue.popleft()  # Filled makers are removed lazily
+            if queue:
+                return price
+            levels.pop(price, None)
+            heapq.heappop(heap)
+        return None
+
+    def levels_from_best(self, side):
+        """Prices with resting orders on `side`, best first
+
+        Walks the heap in order (a second heap holds the frontier), so a
+        sweep through k levels costs O(k log k) whatever the book's size.
+        """
+        if self.best(side) is None:  # Also drops levels earlier sweeps emptied
+            return
+        heap, levels = self.heaps[side], self.levels[side]
+        frontier = [(heap[0], 0)]
+        seen = set()
+        while frontier:
+            key, index = heapq.heappop(frontier)
+            for child in (2 * index + 1, 2 * index + 2):
+                if child < len(heap):
+                    heapq.heappush(frontier, (heap[child], child))
+            price = -key if side == 'buy' else key
+            if price in levels and price not in seen:
+                seen.add(price)
+                yield price
+
+    def add(self, order):
+        side, price = order['side'], order['price']
+        queue = self.levels[side].get(price)
+        if queue is None:
+            queue = self.levels[side][price] = deque()
+            heapq.heappush(self.heaps[side], self._key(side, price))
+        queue.append(order)
+
+    def remove(self, order):
+        """Take a cancelled order off its level, dropping the level once empty"""
+        side, price = order['side'], order['price']
+        levels = self.levels[side]
+        queue = levels.get(price)
+        if queue is None:
+            return
+        queue = deque(resting for resting in queue if resting is not order and resting['remaining'] > 0)
+        if queue:
+            levels[price] = queue
+            return
+        del levels[price]
+        # The level's heap entry is dropped lazily; rebuild once stale entries pile up
+        heap = self.heaps[side]
+        if len(heap) > 2 * len(levels) + 64:
+            heap[:] = [self._key(side, level_price) for level_price in levels]
+            heapq.heapify(heap)
+
+    def depth(self, side, limit):
+        """[[price, amount], ...] of the best `limit` levels"""
+        levels = []
+        for price in self.levels_from_best(side):
+            amount = sum(order['remaining'] for order in self.levels[side][price])
+            if amount > 0:
+                levels.append([price, amount])
+            if len(levels) == limit:
+                break
+        return levels
+
+class MatchingEngine:
+    """Limit/market order matching with per-account balances
+
+    quote(symbol) returns the house {'bid', 'ask'} for house liquidity, or
+    None to match only against resting orders.
+    """
+
+    def __init__(self, initial_balance=None, quote=None, n_stripes=DEFAULT_STRIPES):
+        self.accounts = Accounts(initial_balance, n_stripes)
+        self.quote = quote
+        self.books = {}
+        self.books_lock = threading.Lock()
+        self.orders = {}  # id -> open order
+        # Per account, changed with the account's stripe held
+        self.open_by_account = defaultdict(dict)  # account -> {id: open order}
+        self.account_orders = defaultdict(lambda: deque(maxlen=HISTORY_LIMIT))
+        self.account_trades = defaultdict(lambda: deque(maxlen=HISTORY_LIMIT))
+        self.sequence = itertools.count()
+
+    def book(self, symbol):
+        book = self.books.get(symbol)
+        if book is None:
+            with self.books_lock:
+                book = self.books.setdefault(symbol, OrderBook(symbol))
+        return book
+
+    def submit(self, account, symbol, side, order_type, amount, price=None):
+        """Match a new order and rest any limit remainder; returns the order dict"""
+        if side not in ('buy', 'sell'):
+            raise OrderError(f"Unknown side: {side}")
+        if order_type not in ('market', 'limit'):
+            raise OrderError(f"Unknown order type: {order_type}")
+        if not amount or amount <= 0:
+            raise OrderError("amount must be positive")
+        if order_type == 'limit' and (price is None or price <= 0):
+            raise OrderError("limit orders need a positive price")
+        base, quote_asset = symbol.split('/')
+
+        book = self.book(symbol)
+        with book.lock:
+            fills = self._plan(book, side, order_type, amount, price)
+            filled = sum(quantity for _, quantity, _ in fills)
+            rests = order_type == 'limit' and amount - filled > amount * DUST
+            if order_type == 'market' and filled == 0:
+                raise OrderError("No liquidity")
+
+            with self.accounts.locked([account]):
+                # The taker must cover every fill plus the funds a resting remainder reserves
+                if side == 'buy':
+                    escrow = sum(fill_price * quantity for fill_price, quantity, _ in fills)
+                    needed = escrow + ((amount - filled) * price if rests else 0.0)
+                    balance = self.accounts.asset(account, quote_asset)
+                else:
+                    escrow = filled
+                    needed = amount if rests else filled
+                    balance = self.accounts.asset(account, base)
+                if needed > balance[0] * (1 + DUST):
+                    raise OrderError("Insufficient balance")
+                # Held until the fills settle; the remainder's share becomes its reservation
+                balance[0] -= needed
+                balance[1] += needed
+
+                order = self._new_order(account, symbol, side, order_type, amount, price)
+                claims = [self._claim(book, order, fill_price, quantity, maker)
+                          for fill_price, quantity, maker in fills]
+
+                if rests:
+                    order['reserved'] = needed - escrow
+                    order['status'] = 'open'
+                    book.add(order)
+                    self.orders[order['id']] = order
+                    self.open_by_account[account][order['id']] = order
+                else:
+                    # Limit orders only get here fully filled; market remainders are dropped
+                    order['status'] = 'closed'
+                    order['remaining'] = 0.0
+
+        makers = [maker['account'] for _, _, maker, _ in claims if maker is not None]
+        with self.accounts.locked([account] + makers):
+            balance[0] += escrow
+            balance[1] -= escrow
+            for fill_price, quantity, maker, maker_done in claims:
+                self._settle(order, fill_price, quantity, maker, maker_done, base, quote_asset)
+        return order
+
+    def _plan(self, book, side, order_type, amount, limit_price):
+        """[(price, quantity, maker order or None for the house)] the order would fill"""
+        opposite = 'sell' if side == 'buy' else 'buy'
+        better = (lambda a, b: a < b) if side == 'buy' else (lambda a, b: a > b)
+        house = self.quote(book.symbol) if self.quote is not None else None
+        house_price = None if house is None else house['ask' if side == 'buy' else 'bid']
+
+        fills = []
+        remaining = amount
+        for level_price in book.levels_from_best(opposite):
+            # Resting orders keep priority over the house at the same price
+            if house_price is not None and better(house_price, level_price):
+                break
+            if order_type == 'limit' and better(limit_price, level_price):
+                return fills
+            for maker in book.levels[opposite][level_price]:
+                if maker['remaining'] <= 0:
+                    continue
+                quantity = min(maker['remaining'], remaining)
+                fills.append((level_price, quantity, maker))
+                remaining -= quantity
+                if remaining <= amount * DUST:
+                    return fills
+
+        # Whatever the book can't fill goes to the house, if it quotes within the limit
+        if house_price is not None and not (order_type == 'limit' and better(limit_price, house_price)):
+            fills.append((house_price, remaining, None))
+        return fills
+
+    def _new_order(self, account, symbol, side, order_type, amount, price):
+        order = {
+            'id': str(uuid.uuid4()),
+            'account': account,
+            'symbol': symbol,
+            'side': side,
+            'type': order_type,
+            'amount': amount,
+            'price': price,
+            'filled': 0.0,
+            'remaining': amount,
+            'cost': 0.0,
+            'reserved': 0.0,
+            'sequence': next(self.sequence),
+            'timestamp': datetime.now().isoformat(),
+            'status': 'open'
+        }
+        self.account_orders[account].append(order)
+        return order
+
+    def _close(self, order, status):
+        """Drop a no longer open order from the open-order indexes"""
+        order['status'] = status
+        self.orders.pop(order['id'], None)
+        open_orders = self.open_by_account.get(order['account'])
+        if open_orders is not None:
+            open_orders.pop(order['id'], None)
+            if not open_orders:
+                del self.open_by_account[order['account']]
+
+    def open_orders(self, account, symbol=None):
+        return [order for order in list(self.open_by_account.get(account, {}).values())
+                if symbol is None or order['symbol'] == symbol]
+
+    def _claim(self, book, taker, price, quantity, maker):
+        """Book side of one fill (book lock held): fill both orders, take the maker's reservation"""
+        maker_done = False
+        if maker is not None:
+            maker['reserved'] -= price * quantity if maker['side'] == 'buy' else quantity
+            self._fill(maker, price, quantity)
+            if maker['remaining'] <= 0:
+                # Closed now so a cancel can't release funds the settlement still moves
+                maker['status'] = 'closed'
+                maker_done = True
+        self._fill(taker, price, quantity)
+        book.last_price = price
+        return price, quantity, maker, maker_done
+
+    def _settle(self, taker, price, quantity, maker, maker_done, base, quote_asset):
+        """Move funds for one claimed fill (stripes of both accounts held)"""
+        cost = price * quantity
+        buyer, seller = (taker, maker) if taker['side'] == 'buy' else (maker, taker)
+
+        # Taker trades from free funds
+        if taker['side'] == 'buy':
+            self.accounts.asset(taker['account'], quote_asset)[0] -= cost
+            self.accounts.asset(taker['account'], base)[0] += quantity
+        else:
+            self.accounts.asset(taker['account'], base)[0] -= quantity
+            self.accounts.asset(taker['account'], quote_asset)[0] += cost
+
+        # Makers trade from their reservation
+        if maker is not None:
+            if maker['side'] == 'buy':
+                self.accounts.asset(maker['account'], quote_asset)[1] -= cost
+                self.accounts.asset(maker['account'], base)[0] += quantity
+            else:
+                self.accounts.asset(maker['account'], base)[1] -= quantity
+                self.accounts.asset(maker['account'], quote_asset)[0] += cost
+            if maker_done:
+                # Return any rounding residue of the reservation
+                reserved = self.accounts.asset(maker['account'], quote_asset if maker['side'] == 'buy' else base)
+                reserved[0] += maker['reserved']
+                reserved[1] -= maker['reserved']
+                maker['reserved'] = 0.0
+                self._close(maker, 'closed')
+
+        trade = {
+            'id': str(uuid.uuid4()),
+            'order': taker['id'],
+            'maker_order': maker['id'] if maker is not None else None,
+            'symbol': taker['symbol'],
+            'side': taker['side'],
+            'buyer': buyer['account'] if buyer is not None else HOUSE,
+            'seller': seller['account'] if seller is not None else HOUSE,
+            'amount': quantity,
+            'price': price,
+            'cost': cost,
+            'timestamp': datetime.now().isoformat()
+        }
+        self.account_trades[taker['account']].append(trade)
+        if maker is not None and maker['account'] != taker['account']:
+            self.account_trades[maker['account']].append(trade)
+
+    def _fill(self, order, price, quantity):
+        order['filled'] += quantity
+        remaining = order['amount'] - order['filled']
+        order['remaining'] = remaining if remaining > order['amount'] * DUST else 0.0
+        order['cost'] += price * quantity
+        order['price'] = order['price'] if order['type'] == 'limit' else order['cost'] / order['filled']
+
+    def cancel(self, account, order_id):
+        """Cancel an open order and release its reserved funds"""
+        order = self.orders.get(order_id)
+        if order is None or order['account'] != account:
+            raise OrderError(f"Unknown or no longer open order: {order_id}")
+        book = self.book(order['symbol'])
+        base, quote_asset = order['symbol'].split('/')
+        with book.lock, self.accounts.locked([account]):
+            if order['status'] != 'open':
+                raise OrderError(f"Order {order_id} is {order['status']}")
+            asset = quote_asset if order['side'] == 'buy' else base
+            balance = self.accounts.asset(account, asset)
+            balance[0] += order['reserved']
+            balance[1] -= order['reserved']
+            order['reserved'] = 0.0
+            order['remaining'] = 0.0
+            book.remove(order)
+            self._close(order, 'canceled')
+        return order
+
+    def order_book(self, symbol, limit=20):
+        book = self.book(symbol)
+        with book.lock:
+            return {
+                'symbol': symbol,
+                'bids': book.depth('buy', limit),
+                'asks': book.depth('sell', limit),
+                'timestamp': int(datetime.now().timestamp() * 1000)
+            }
+
+    def top_of_book(self, symbol):
+        """(best bid, best ask, last trade price) from resting orders"""
+        book = self.book(symbol)
+        with book.lock:
+            return book.best('buy'), book.best('sell'), book.last_price
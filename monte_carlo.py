@@ -0,0 +1,201 @@
+# Monte Carlo Robustness Testing
+#
+# One backtest on one price path says little about risk. This runs a
+# strategy over many alternative paths and reports confidence intervals on
+# total return, max drawdown and Sharpe ratio. Paths are either:
+#
+# - 'bootstrap': the dataset's log returns resampled in blocks of
+#   block_size bars (blocks keep short-range volatility clustering)
+# - 'generated': fresh synthetic paths from price_data.PriceGenerator
+#
+# All paths live in one (paths, bars) array. Vectorized strategies compute
+# every path's signals in one generate_signals call and the fills/equity
+# arithmetic runs across the path axis, replicating run_vectorized. Other
+# strategies are backtested path by path on a process pool.
+#
+# monte_carlo_trades() instead resamples the round trips of a finished
+# backtest: shuffling their order changes only the drawdown, bootstrapping
+# them with replacement also changes the return.
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from strategies import BUY, SELL
+from backtest import backtest_strategy, column, periods_per_year
+
+METRICS = ('total_return', 'max_drawdown', 'sharpe_ratio')
+
+def bootstrap_paths(close, n_paths, block_size=24, seed=None):
+    """(n_paths, len(close)) paths built from block-resampled log returns of close"""
+    close = np.asarray(close, dtype=float)
+    log_returns = np.diff(np.log(close))
+    n_returns = len(log_returns)
+    block_size = max(1, min(block_size, n_returns))
+
+    rng = np.random.default_rng(seed)
+    n_blocks = -(-n_returns // block_size)
+    starts = rng.integers(0, n_returns - block_size + 1, size=(n_paths, n_blocks))
+    idx = (starts[:, :, None] + np.arange(block_size)).reshape(n_paths, -1)[:, :n_returns]
+
+    paths = np.empty((n_paths, n_returns + 1))
+    paths[:, 0] = 0.0
+    np.cumsum(log_returns[idx], axis=1, out=paths[:, 1:])
+    return close[0] * np.exp(paths)
+
+def generated_paths(n_paths, n_bars, initial_price=45000, freq='1h', seed=None, **options):
+    """(n_paths, n_bars) independent synthetic close paths"""
+    from price_data import PriceGenerator
+    generator = PriceGenerator(np.full(n_paths, float(initial_price)), freq=freq, seed=seed, **options)
+    return generator.next_chunk(n_bars)['close'].T.copy()
+
+def equity_paths(signals, close, initial_balance):
+    """Per-bar equity of every path, with run_vectorized's fill rules
+
+    A BUY fills only when flat and invests 95% of the balance; a SELL fills
+    only when long and closes the whole position; fills are at the close.
+    """
+    n_paths, n_bars = close.shape
+    bars = np.arange(n_bars)
+
+    # Long after bar t iff the last non-HOLD signal up to t was a BUY
+    last_signal = np.maximum.accumulate(np.where(signals != 0, bars, -1), axis=1)
+    codes = np.take_along_axis(signals, np.maximum(last_signal, 0), axis=1)
+    long = (last_signal >= 0) & (codes == BUY)
+
+    was_long = np.zeros_like(long)
+    was_long[:, 1:] = long[:, :-1]
+    entries = long & ~was_long
+    exits = was_long & ~long
+
+    entry_bar = np.maximum.accumulate(np.where(entries, bars, -1), axis=1)
+    entry_price = np.take_along_axis(close, np.maximum(entry_bar, 0), axis=1)
+    position_growth = 0.05 + 0.95 * close / entry_price
+
+    # Cash balance after every round trip closed so far
+    balance = initial_balance * np.cumprod(np.where(exits, position_growth, 1.0), axis=1)
+    return np.where(long, balance * position_growth, balance), long
+
+def path_metrics(equity, initial_balance, bars_per_year):
+    """total_return, max_drawdown and sharpe_ratio of every equity row
+
+    Same definitions as calculate_performance_metrics, along axis 1.
+    """
+    n_paths = len(equity)
+    curve = np.column_stack((np.full(n_paths, float(initial_balance)), equity))
+    previous = curve[:, :-1]
+    returns = np.divide(curve[:, 1:], previous, out=np.ones_like(equity), where=previous != 0) - 1
+
+    volatility = returns.std(axis=1)
+    sharpe = np.divide(returns.mean(axis=1), volatility, out=np.zeros(n_paths), where=volatility > 0)
+
+    peak = np.maximum.accumulate(curve, axis=1)
+    return {
+        'total_return': (curve[:, -1] - initial_balance) / initial_balance * 100,
+        'max_drawdown': ((curve - peak) / peak).min(axis=1) * 100,
+        'sharpe_ratio': sharpe * np.sqrt(bars_per_year)
+    }
+
+def confidence_intervals(samples, confidence=0.9):
+    """{metric: {'mean', 'median', 'lower', 'upper'}} with a central `confidence` interval"""
+    tail = (1 - confidence) / 2 * 100
+    return {
+        name: {
+            'mean': float(np.mean(values)),
+            'median': float(np.median(values)),
+            'lower': float(np.percentile(values, tail)),
+            'upper': float(np.percentile(values, 100 - tail))
+        }
+        for name, values in samples.items()
+    }
+
+def _backtest_path(strategy_class, parameters, timestamps, close):
+    result = backtest_strategy(strategy_class(**parameters), {'timestamp': timestamps, 'close': close})
+    return tuple(result[name] for name in METRICS)
+
+def monte_carlo_backtest(strategy_class, parameters, data, n_paths=1000, method='bootstrap',
+                         block_size=24, seed=None, confidence=0.9, max_workers=None, **path_options):
+    """Backtest strategy_class(**parameters) over n_paths resampled versions of data
+
+    Returns {'method', 'paths', 'samples': {metric: array}, 'intervals': {...}}.
+    Extra keyword arguments go to PriceGenerator for method='generated'.
+    """
+    close = column(data, 'close', float)
+    timestamps = column(data, 'timestamp', 'datetime64[ns]')
+    strategy = strategy_class(**parameters)
+    print(f"Monte Carlo: {strategy.name} over {n_paths} {method} paths...")
+
+    if method == 'bootstrap':
+        paths = bootstrap_paths(close, n_paths, block_size, seed)
+    elif method == 'generated':
+        paths = generated_paths(n_paths, len(close), close[0], seed=seed, **path_options)
+    else:
+        raise ValueError(f"Unknown Monte Carlo method: {method}")
+
+    if strategy.supports_vectorized:
+        signals = strategy.generate_signals(paths)
+        equity, _ = equity_paths(signals, paths, strategy.initial_balance)
+        samples = path_metrics(equity, strategy.initial_balance, periods_per_year(timestamps))
+    else:
+        max_workers = min(max_workers or os.cpu_count() or 1, n_paths)
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            rows = list(pool.map(_backtest_path, [strategy_class] * n_paths, [parameters] * n_paths,
+                                 [timestamps] * n_paths, paths,
+                                 chunksize=max(1, n_paths // (4 * max_workers))))
+        samples = dict(zip(METRICS, np.array(rows, dtype=float).T))
+
+    return {
+        'method': method,
+        'paths': n_paths,
+        'samples': samples,
+        'intervals': confidence_intervals(samples, confidence)
+    }
+
+def round_trip_growth(trades):
+    """Balance multiple of every closed round trip in a TradeLog"""
+    records = trades.view()
+    buys = records[records['side'] == BUY]
+    sells = records[records['side'] == SELL]
+    buys = buys[:len(sells)]
+    balance_before = buys['balance'] + buys['amount'] * buys['price']
+    return sells['balance'] / balance_before
+
+def monte_carlo_trades(trades, initial_balance=10000, n_paths=1000, method='shuffle', seed=None,
+                       confidence=0.9):
+    """Resample a backtest's round trips into n_paths alternative trade sequences
+
+    'shuffle' permutes the trips (same final return, different drawdowns);
+    'bootstrap' draws trips with replacement. Only closed round trips count,
+    so a position still open at the end of the backtest is left out.
+    sharpe_ratio here is the per-trip mean/std of returns, not annualized.
+    """
+    growth = round_trip_growth(trades)
+    n_trips = len(growth)
+    rng = np.random.default_rng(seed)
+
+    if n_trips == 0:
+        samples = {name: np.zeros(n_paths) for name in METRICS}
+        return {'method': method, 'paths': n_paths, 'samples': samples,
+                'intervals': confidence_intervals(samples, confidence)}
+
+    if method == 'shuffle':
+        order = rng.permuted(np.tile(np.arange(n_trips), (n_paths, 1)), axis=1)
+    elif method == 'bootstrap':
+        order = rng.integers(0, n_trips, size=(n_paths, n_trips))
+    else:
+        raise ValueError(f"Unknown trade resampling method: {method}")
+
+    sequences = growth[order]
+    equity = initial_balance * np.cumprod(sequences, axis=1)
+    samples = path_metrics(equity, initial_balance, 1)
+
+    trip_returns = sequences - 1
+    volatility = trip_returns.std(axis=1)
+    samples['sharpe_ratio'] = np.divide(trip_returns.mean(axis=1), volatility,
+                                        out=np.zeros(n_paths), where=volatility > 0)
+
+    return {
+        'method': method,
+        'paths': n_paths,
+        'samples': samples,
+        'intervals': confidence_intervals(samples, confidence)
+    }
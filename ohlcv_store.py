@@ -0,0 +1,184 @@
+# Columnar OHLCV Store
+#
+# One directory per symbol and interval holding a raw little-endian array per
+# column (timestamp as int64 nanoseconds, prices and volume as float64):
+#
+#     <root>/BTC-USDT/1h/timestamp.bin
+#     <root>/BTC-USDT/1h/close.bin
+#     ...
+#
+# Reads are memory-mapped, so opening years of minute bars costs nothing up
+# front and every process reading the same files shares the OS page cache.
+# Timestamps are kept sorted and act as the time index: range queries are a
+# binary search followed by zero-copy slices. Pandas is only imported to
+# build DataFrames and parse timestamps, so readers of raw columns (e.g.
+# sweep workers) don't load it.
+
+import os
+import numpy as np
+
+COLUMNS = {
+    'timestamp': np.dtype('<i8'),
+    'open': np.dtype('<f8'),
+    'high': np.dtype('<f8'),
+    'low': np.dtype('<f8'),
+    'close': np.dtype('<f8'),
+    'volume': np.dtype('<f8')
+}
+
+# Chart intervals and the pandas frequency each one stands for
+INTERVAL_FREQS = {
+    '1m': '1min',
+    '5m': '5min',
+    '15m': '15min',
+    '1h': '1h',
+    '4h': '4h',
+    '1d': '1D'
+}
+
+def canonical_interval(interval):
+    """Map a chart interval ('1m') or pandas frequency ('1min', 'H') to the store key"""
+    if interval in INTERVAL_FREQS:
+        return interval
+    import pandas as pd
+    try:
+        duration = pd.Timedelta(pd.tseries.frequencies.to_offset(interval))
+    except ValueError:
+        return interval
+    for name, freq in INTERVAL_FREQS.items():
+        if pd.Timedelta(freq) == duration:
+            return name
+    return interval
+
+def to_nanoseconds(timestamp):
+    import pandas as pd
+    return pd.Timestamp(timestamp).value
+
+def columns_to_frame(columns):
+    """DataFrame sharing memory with the given column arrays"""
+    import pandas as pd
+    return pd.DataFrame({
+        'timestamp': columns['timestamp'].view('datetime64[ns]'),
+        'close': columns['close'],
+        'open': columns['open'],
+        'high': columns['high'],
+        'low': columns['low'],
+        'volume': columns['volume']
+    }, copy=False)
+
+class OHLCVStore:
+    """Per-symbol, per-interval columnar OHLCV files with memory-mapped reads"""
+
+    def __init__(self, root):
+        self.root = root
+
+    def path(self, symbol, interval):
+        return os.path.join(self.root, symbol.replace('/', '-'), canonical_interval(interval))
+
+    def column_path(self, symbol, interval, column):
+        return os.path.join(self.path(symbol, interval), f'{column}.bin')
+
+    def has(self, symbol, interval):
+        return os.path.exists(self.column_path(symbol, interval, 'timestamp'))
+
+    def length(self, symbol, interval):
+        if not self.has(symbol, interval):
+            return 0
+        size = os.path.getsize(self.column_path(symbol, interval, 'timestamp'))
+        return size // COLUMNS['timestamp'].itemsize
+
+    def write(self, symbol, interval, data, append=False):
+        """Write (or append) OHLCV rows; `data` is a DataFrame or mapping of columns
+
+        Appended rows must start after the last stored timestamp. A full
+        write goes to temporary files renamed over the old ones, so readers
+        that memory-mapped the old files keep valid (if stale) data instead
+        of a truncated mapping.
+        """
+        import pandas as pd
+        timestamps = np.asarray(pd.to_datetime(np.asarray(data['timestamp'])).asi8, dtype=COLUMNS['timestamp'])
+        if len(timestamps) > 1 and np.any(np.diff(timestamps) <= 0):
+            raise ValueError("timestamps must be strictly increasing")
+
+        if append and self.has(symbol, interval):
+            last = self.columns(symbol, interval)['timestamp']
+            if len(last) and len(timestamps) and timestamps[0] <= last[-1]:
+                raise ValueError("appended rows must start after the last stored bar")
+            append = True
+        else:
+            append = False
+
+        os.makedirs(self.path(symbol, interval), exist_ok=True)
+        replaced = []
+        for column, dtype in COLUMNS.items():
+            values = timestamps if column == 'timestamp' else np.asarray(data[column], dtype=dtype)
+            path = self.column_path(symbol, interval, column)
+            # Appending only grows the files, which existing mappings tolerate
+            target = path if append else path + '.tmp'
+            with open(target, 'ab' if append else 'wb') as f:
+                f.write(np.ascontiguousarray(values, dtype=dtype).tobytes())
+            if not append:
+                replaced.append((target, path))
+
+        # timestamp.bin (which sets the length readers map) goes in last
+        for temp_path, path in sorted(replaced, key=lambda item: item[1].endswith('timestamp.bin')):
+            os.replace(temp_path, path)
+
+    def columns(self, symbol, interval):
+        """Read-only memory maps of every column"""
+        length = self.length(symbol, interval)
+        columns = {}
+        for column, dtype in COLUMNS.items():
+            if length == 0:
+                columns[column] = np.empty(0, dtype=dtype)
+            else:
+                columns[column] = np.memmap(self.column_path(symbol, interval, column),
+                                            dtype=dtype, mode='r', shape=(length,))
+        return columns
+
+    def locate(self, symbol, interval, start=None, end=None, limit=None):
+        """Row range [first, last) for timestamps in [start, end], keeping the last `limit`"""
+        timestamps = self.columns(symbol, interval)['timestamp']
+        first = 0 if start is None else int(np.searchsorted(timestamps, to_nanoseconds(start), side='left'))
+        last = len(timestamps) if end is None else int(np.searchsorted(timestamps, to_nanoseconds(end), side='right'))
+        if limit is not None:
+            first = max(first, last - limit)
+        return first, last
+
+    def read(self, symbol, interval, start=None, end=None, limit=None):
+        """Zero-copy column slices for a time range"""
+        first, last = self.locate(symbol, interval, start, end, limit)
+        return {column: values[first:last] for column, values in self.columns(symbol, interval).items()}
+
+    def read_frame(self, symbol, interval, start=None, end=None, limit=None):
+        """DataFrame over the memory-mapped columns (no copy of the price data)"""
+        first, last = self.locate(symbol, interval, start, end, limit)
+        columns = self.columns(symbol, interval)
+        frame = columns_to_frame({column: values[first:last] for column, values in columns.items()})
+
+        # Lets other processes (e.g. sweep workers) map the same rows themselves
+        frame.attrs['ohlcv_source'] = (self.root, symbol, canonical_interval(interval), first, last)
+        return frame
+
+def frame_source(data):
+    """The store rows backing `data`, or None if it did not come from read_frame unchanged"""
+    source = data.attrs.get('ohlcv_source') if hasattr(data, 'attrs') else None
+    if source is None:
+        return None
+
+    # attrs survive slicing and in-place edits of the columns, so confirm the
+    # frame still holds exactly the stored rows
+    root, symbol, interval, first, last = source
+    if len(data) != last - first or len(data) == 0:
+        return None
+    stored = OHLCVStore(root).columns(symbol, interval)
+    if len(stored['timestamp']) < last:
+        return None
+    for column, dtype in COLUMNS.items():
+        if column not in data:
+            continue
+        values = np.asarray(data[column])
+        values = values.view(np.int64) if column == 'timestamp' else values.astype(dtype, copy=False)
+        if not np.array_equal(values, stored[column][first:last]):
+            return None
+    return source
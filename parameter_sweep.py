@@ -0,0 +1,112 @@
+# Parallel Parameter Sweep
+#
+# Fans (strategy class, parameters) combinations out over a process pool.
+# The price columns are copied once into shared memory and every worker
+# attaches to them in its initializer, so a task only pickles the strategy
+# class and a small parameters dict instead of the whole DataFrame. Data read
+# from an OHLCVStore skips the copy: workers memory-map the same files.
+#
+# Workers see the data as a dict of column arrays, which the backtest engines
+# accept directly, so a worker never needs to import pandas.
+
+import os
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+import numpy as np
+from backtest import backtest_strategy
+from ohlcv_store import OHLCVStore, frame_source
+
+# Per-worker state, set up once by the pool initializer
+_worker_data = None
+_worker_segments = []
+
+class SharedPriceData:
+    """Columns of a price DataFrame published as shared memory blocks"""
+
+    def __init__(self, data):
+        self.columns = {}
+        self.segments = []
+
+        for column in data:
+            values = np.ascontiguousarray(np.asarray(data[column]))
+            segment = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+            np.ndarray(values.shape, dtype=values.dtype, buffer=segment.buf)[:] = values
+
+            self.segments.append(segment)
+            self.columns[column] = (segment.name, values.dtype.str, len(values))
+
+    def close(self):
+        for segment in self.segments:
+            segment.close()
+            segment.unlink()
+        self.segments = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def _attach_worker(columns):
+    """Pool initializer: map the worker's column arrays onto the shared blocks"""
+    global _worker_data
+
+    arrays = {}
+    for column, (name, dtype, length) in columns.items():
+        segment = shared_memory.SharedMemory(name=name)
+        _worker_segments.append(segment)  # keep the mapping alive
+        arrays[column] = np.ndarray((length,), dtype=np.dtype(dtype), buffer=segment.buf)
+
+    _worker_data = arrays
+
+def _open_worker_source(source):
+    """Pool initializer for store-backed data: map the store rows directly"""
+    global _worker_data
+    root, symbol, interval, first, last = source
+    columns = OHLCVStore(root).columns(symbol, interval)
+    _worker_data = {column: values[first:last] for column, values in columns.items()}
+    _worker_data['timestamp'] = _worker_data['timestamp'].view('datetime64[ns]')
+
+def worker_data():
+    """The price columns (name -> array) attached to the current pool worker"""
+    return _worker_data
+
+@contextmanager
+def shared_data_pool(data, max_workers=None):
+    """ProcessPoolExecutor whose workers read `data` through worker_data()"""
+    source = frame_source(data)
+    if source is not None:
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_open_worker_source,
+                                 initargs=(source,)) as pool:
+            yield pool
+        return
+
+    with SharedPriceData(data) as shared:
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_attach_worker,
+                                 initargs=(shared.columns,)) as pool:
+            yield pool
+
+def _run_task(index, strategy_class, parameters, engine):
+    strategy = strategy_class(**parameters)
+    return index, backtest_strategy(strategy, _worker_data, engine=engine)
+
+def run_parameter_sweep(data, tasks, max_workers=None, engine='auto'):
+    """Backtest every (strategy_class, parameters) task in parallel
+
+    Yields (task_index, result) pairs as soon as each backtest finishes.
+    max_workers defaults to the number of CPUs.
+    """
+    tasks = list(tasks)
+    if not tasks:
+        return
+
+    max_workers = min(max_workers or os.cpu_count() or 1, len(tasks))
+
+    with shared_data_pool(data, max_workers) as pool:
+        futures = [
+            pool.submit(_run_task, index, strategy_class, parameters, engine)
+            for index, (strategy_class, parameters) in enumerate(tasks)
+        ]
+        for future in as_completed(futures):
+            yield future.result()
@@ -0,0 +1,177 @@
+# Multi-Asset Portfolio Backtesting
+#
+# Simulates one portfolio over many symbols on an aligned time index. State is
+# a PositionLedger: one cash balance plus a quantity array with an entry per
+# symbol, and trades stored as parallel arrays. Each bar costs a few NumPy
+# operations over the symbol axis, whatever the number of symbols.
+#
+# Rebalancing follows the same rule as the /api/portfolio/rebalance endpoint:
+# trade back to target when any asset drifts more than the threshold
+# (percentage points) from its target. A bar count can also force periodic
+# rebalances. Optional per-symbol strategies switch each asset between its
+# target weight (long signal) and cash (sell signal); a signal change only
+# trades the symbols whose signal changed.
+
+import numpy as np
+import pandas as pd
+from strategies import BUY
+from backtest import periods_per_year, calculate_performance_metrics
+
+TRADE_DTYPE = np.dtype([
+    ('bar', np.int64),
+    ('symbol', np.int32),
+    ('quantity', np.float64),  # Positive = buy, negative = sell
+    ('price', np.float64),
+    ('fee', np.float64)
+])
+
+class PositionLedger:
+    """Cash and per-symbol quantities for one portfolio"""
+
+    def __init__(self, symbols, cash, fee_rate=0.001):
+        self.symbols = list(symbols)
+        self.cash = float(cash)
+        self.quantities = np.zeros(len(self.symbols))
+        self.fee_rate = fee_rate
+        self.fees_paid = 0.0
+        self.turnover = 0.0
+        self._trade_chunks = []
+
+    def value(self, prices):
+        return self.cash + self.quantities @ prices
+
+    def weights(self, prices):
+        return self.quantities * prices / self.value(prices)
+
+    def rebalance(self, bar, prices, target_weights, symbols=None):
+        """Trade to target_weights (fractions of equity) at `prices`, paying fees from cash
+
+        symbols: optional boolean mask; only those symbols are traded.
+        """
+        equity = self.value(prices)
+        delta = equity * target_weights / prices - self.quantities
+        if symbols is not None:
+            delta[~symbols] = 0
+        notional = delta * prices
+
+        # Scale buys down if sales plus cash can't cover them and their fees
+        cash_after = self.cash - notional.sum() - np.abs(notional).sum() * self.fee_rate
+        if cash_after < 0:
+            buys = delta > 0
+            buy_cost = notional[buys].sum() * (1 + self.fee_rate)
+            scale = max(1 - (-cash_after) / buy_cost, 0) if buy_cost > 0 else 0
+            delta[buys] *= scale
+            notional = delta * prices
+
+        traded = np.flatnonzero(delta)
+        if not len(traded):
+            return
+
+        fees = np.abs(notional[traded]) * self.fee_rate
+        self.cash -= notional[traded].sum() + fees.sum()
+        self.quantities[traded] += delta[traded]
+        self.fees_paid += fees.sum()
+        self.turnover += np.abs(notional[traded]).sum()
+
+        chunk = np.empty(len(traded), dtype=TRADE_DTYPE)
+        chunk['bar'] = bar
+        chunk['symbol'] = traded
+        chunk['quantity'] = delta[traded]
+        chunk['price'] = prices[traded]
+        chunk['fee'] = fees
+        self._trade_chunks.append(chunk)
+
+    @property
+    def trades(self):
+        if not self._trade_chunks:
+            return np.empty(0, dtype=TRADE_DTYPE)
+        return np.concatenate(self._trade_chunks)
+
+def align_closes(prices):
+    """Timestamps and a (bars, symbols) close matrix on the bars all symbols share"""
+    closes = pd.concat(
+        [frame.set_index('timestamp')['close'].rename(symbol) for symbol, frame in prices.items()],
+        axis=1, join='inner'
+    ).sort_index()
+    return closes.index.to_numpy(), closes.to_numpy(dtype=float)
+
+def long_mask(signals):
+    """Whether each bar ends long, given BUY/SELL/HOLD codes along axis 0"""
+    bars = np.arange(len(signals))[:, None]
+    last_signal = np.maximum.accumulate(np.where(signals != 0, bars, -1), axis=0)
+    codes = np.take_along_axis(signals, np.maximum(last_signal, 0), axis=0)
+    return (last_signal >= 0) & (codes == BUY)
+
+def backtest_portfolio(prices, targets, strategy_factory=None, rebalance_threshold=1.0,
+                       rebalance_every=None, fee_rate=0.001, initial_balance=10000):
+    """Backtest a target-allocation portfolio
+
+    prices: {symbol: OHLCV DataFrame}, e.g. from generate_multi_asset_price_data
+    targets: {symbol: target percentage}; anything left over stays in cash
+    strategy_factory: optional callable returning a vectorized strategy per
+        symbol; the asset is only held while that strategy is long
+
+    Returns (results, ledger); results follows backtest_strategy's format.
+    """
+    symbols = list(prices)
+    timestamps, closes = align_closes(prices)
+    n_bars, n_symbols = closes.shape
+
+    target_weights = np.array([targets.get(symbol, 0) for symbol in symbols], dtype=float) / 100
+
+    if strategy_factory is not None:
+        signals = np.column_stack([strategy_factory(symbol).generate_signals(closes[:, i])
+                                   for i, symbol in enumerate(symbols)])
+        active = long_mask(signals)
+    else:
+        active = np.ones((n_bars, n_symbols), dtype=bool)
+
+    ledger = PositionLedger(symbols, initial_balance, fee_rate)
+    equity = np.empty(n_bars)
+    in_position = np.empty(n_bars, dtype=bool)
+    rebalances = 0
+
+    for t in range(n_bars):
+        bar_prices = closes[t]
+        wanted = target_weights * active[t]
+
+        # A signal change only trades the symbols that changed; the rest are
+        # rebalanced together only when one of them drifts past the threshold
+        changed = np.ones(n_symbols, dtype=bool) if t == 0 else active[t] != active[t - 1]
+        trade = changed if changed.any() else None
+        if rebalance_every and t % rebalance_every == 0:
+            trade = np.ones(n_symbols, dtype=bool)
+        elif ledger.value(bar_prices) > 0:
+            drift = np.abs(ledger.weights(bar_prices) - wanted) * 100
+            if np.any(drift[~changed] > rebalance_threshold):
+                trade = np.ones(n_symbols, dtype=bool)
+
+        if trade is not None:
+            ledger.rebalance(t, bar_prices, wanted, trade)
+            rebalances += 1
+
+        equity[t] = ledger.value(bar_prices)
+        in_position[t] = np.any(ledger.quantities > 0)
+
+    final_value = equity[-1] if n_bars else initial_balance
+    final_prices = closes[-1] if n_bars else np.ones(n_symbols)
+    metrics = calculate_performance_metrics(equity, initial_balance, periods_per_year(timestamps), in_position)
+
+    results = {
+        'strategy_name': 'Portfolio',
+        'parameters': {
+            'targets': dict(targets),
+            'rebalance_threshold': rebalance_threshold,
+            'rebalance_every': rebalance_every,
+            'fee_rate': fee_rate
+        },
+        'total_trades': len(ledger.trades),
+        'rebalances': rebalances,
+        'final_value': final_value,
+        'total_return': (final_value - initial_balance) / initial_balance * 100,
+        **metrics,
+        'fees_paid': ledger.fees_paid,
+        'turnover': ledger.turnover,
+        'final_weights': dict(zip(symbols, (ledger.weights(final_prices) * 100).round(2).tolist()))
+    }
+    return results, ledger
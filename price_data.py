@@ -0,0 +1,170 @@
+# Synthetic Price Data
+#
+# Seedable, vectorized generator for mock OHLCV series. Paths are built with
+# NumPy a chunk at a time (one chunk for ordinary datasets), so minute bars
+# over several years are cheap to produce and can be streamed when they do
+# not fit in memory. Drift, volatility and the market cycle are expressed
+# per hour and scaled to the bar frequency.
+#
+# Each random stream draws a fixed number of values per bar, so a given seed
+# produces the same path (up to rounding) whatever chunk size is used.
+
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from pandas.tseries.frequencies import to_offset
+
+DEFAULT_DRIFT = 0.0001  # Slight upward trend per hour
+DEFAULT_VOLATILITY = 0.02 / np.sqrt(3)  # Same spread as uniform ±2% hourly moves
+DEFAULT_CYCLE_AMPLITUDE = 0.001  # Long-term market cycle
+DEFAULT_CYCLE_FREQUENCY = 0.01  # Radians per hour
+
+def bar_duration(freq):
+    """Length of one bar as a Timedelta ('1h', '5min', 'H', ...)"""
+    return pd.Timedelta(to_offset(freq))
+
+class PriceGenerator:
+    """Continues one (possibly multi-symbol) price path across calls to next_chunk
+
+    initial_prices: a float or one float per symbol
+    correlation: symbol-by-symbol correlation matrix of per-bar shocks
+    regimes: list of {'drift': ..., 'volatility': ...} market regimes; each bar
+        switches to a randomly drawn regime with probability regime_switch_prob
+    """
+
+    def __init__(self, initial_prices, freq='1h', start=None, drift=DEFAULT_DRIFT,
+                 volatility=DEFAULT_VOLATILITY, correlation=None, regimes=None,
+                 regime_switch_prob=0.0, cycle_amplitude=DEFAULT_CYCLE_AMPLITUDE,
+                 cycle_frequency=DEFAULT_CYCLE_FREQUENCY, seed=None):
+        self.last_close = np.atleast_1d(np.asarray(initial_prices, dtype=float)).copy()
+        n_symbols = len(self.last_close)
+
+        self.step = bar_duration(freq)
+        self.hours = self.step / pd.Timedelta(hours=1)
+        self.start = np.datetime64(pd.Timestamp(start if start is not None else datetime.now()), 'ns')
+
+        regimes = regimes or [{'drift': drift, 'volatility': volatility}]
+        self.regime_drift = np.array([r['drift'] for r in regimes], dtype=float)
+        self.regime_volatility = np.array([r['volatility'] for r in regimes], dtype=float)
+        self.regime_switch_prob = regime_switch_prob
+        self.regime = 0
+
+        self.cholesky = None
+        if correlation is not None:
+            correlation = np.asarray(correlation, dtype=float)
+            if correlation.shape != (n_symbols, n_symbols):
+                raise ValueError("correlation must be a square matrix with one row per symbol")
+            self.cholesky = np.linalg.cholesky(correlation)
+
+        self.cycle_amplitude = cycle_amplitude
+        self.cycle_frequency = cycle_frequency
+
+        # One independent stream per kind of draw keeps chunking from reordering them
+        streams = np.random.SeedSequence(seed).spawn(6)
+        (self.shock_rng, self.switch_rng, self.regime_rng,
+         self.high_rng, self.low_rng, self.volume_rng) = [np.random.default_rng(s) for s in streams]
+        self.bar_index = 0
+
+    @property
+    def n_symbols(self):
+        return len(self.last_close)
+
+    def next_regimes(self, n_bars):
+        """Regime index of each of the next n_bars bars"""
+        switches = self.switch_rng.random(n_bars) < self.regime_switch_prob
+        choices = self.regime_rng.integers(0, len(self.regime_drift), size=n_bars)
+
+        last_switch = np.maximum.accumulate(np.where(switches, np.arange(n_bars), -1))
+        regimes = np.where(last_switch >= 0, choices[np.maximum(last_switch, 0)], self.regime)
+        if n_bars:
+            self.regime = regimes[-1]
+        return regimes
+
+    def next_chunk(self, n_bars):
+        """Generate the next n_bars bars
+
+        Returns a dict with 'timestamp' (datetime64[ns], shape (n_bars,)) and
+        'open', 'high', 'low', 'close', 'volume' arrays of shape (n_bars, n_symbols).
+        """
+        shape = (n_bars, self.n_symbols)
+        bars = np.arange(self.bar_index, self.bar_index + n_bars)
+
+        shocks = self.shock_rng.standard_normal(shape)
+        if self.cholesky is not None:
+            shocks = shocks @ self.cholesky.T
+
+        regimes = self.next_regimes(n_bars)
+        drift = self.regime_drift[regimes] * self.hours
+        volatility = self.regime_volatility[regimes] * np.sqrt(self.hours)
+        cycle = self.cycle_amplitude * self.hours * np.sin(bars * self.hours * self.cycle_frequency)
+
+        change = (drift + cycle)[:, None] + volatility[:, None] * shocks
+        close = self.last_close * np.cumprod(1 + change, axis=0)
+
+        open_ = np.empty(shape)
+        open_[:1] = self.last_close
+        open_[1:] = close[:-1]
+
+        high = np.maximum(open_, close) * (1 + self.high_rng.uniform(0, 0.005, shape))
+        low = np.minimum(open_, close) * (1 - self.low_rng.uniform(0, 0.005, shape))
+        volume = self.volume_rng.uniform(1000000, 10000000, shape) * self.hours
+
+        timestamps = self.start + bars * np.timedelta64(self.step.value, 'ns')
+
+        if n_bars:
+            self.last_close = close[-1].copy()
+        self.bar_index += n_bars
+
+        return {
+            'timestamp': timestamps,
+            'open': open_,
+            'high': high,
+            'low': low,
+            'close': close,
+            'volume': volume
+        }
+
+def chunk_to_frames(chunk, n_symbols):
+    """Split a generated chunk into one OHLCV DataFrame per symbol"""
+    return [
+        pd.DataFrame({
+            'timestamp': chunk['timestamp'],
+            'close': chunk['close'][:, i],
+            'open': chunk['open'][:, i],
+            'high': chunk['high'][:, i],
+            'low': chunk['low'][:, i],
+            'volume': chunk['volume'][:, i]
+        })
+        for i in range(n_symbols)
+    ]
+
+def bars_between(duration, freq):
+    return int(pd.Timedelta(duration) / bar_duration(freq))
+
+def generate_price_data(n_bars, initial_price=45000, freq='1h', end=None, **options):
+    """One symbol's OHLCV DataFrame of n_bars bars ending at `end` (default now)"""
+    end = pd.Timestamp(end if end is not None else datetime.now())
+    generator = PriceGenerator(initial_price, freq=freq, start=end - n_bars * bar_duration(freq), **options)
+    return chunk_to_frames(generator.next_chunk(n_bars), 1)[0]
+
+def generate_multi_asset_price_data(initial_prices, n_bars, freq='1h', end=None, **options):
+    """Aligned OHLCV DataFrames for several symbols
+
+    initial_prices maps symbol to starting price; pass correlation (in the same
+    symbol order) for correlated moves. Returns {symbol: DataFrame}.
+    """
+    symbols = list(initial_prices)
+    end = pd.Timestamp(end if end is not None else datetime.now())
+    generator = PriceGenerator([initial_prices[s] for s in symbols], freq=freq,
+                               start=end - n_bars * bar_duration(freq), **options)
+    frames = chunk_to_frames(generator.next_chunk(n_bars), len(symbols))
+    return dict(zip(symbols, frames))
+
+def iter_price_chunks(n_bars, chunk_size=1000000, initial_price=45000, freq='1h', start=None, **options):
+    """Stream a single-symbol path as DataFrames of at most chunk_size bars"""
+    generator = PriceGenerator(initial_price, freq=freq, start=start, **options)
+    remaining = n_bars
+    while remaining > 0:
+        size = min(chunk_size, remaining)
+        yield chunk_to_frames(generator.next_chunk(size), 1)[0]
+        remaining -= size
@@ -0,0 +1,126 @@
+# Strategy Reports
+#
+# Charts of optimization results, kept out of the backtesting path:
+# matplotlib and seaborn are only imported when a chart is drawn, and
+# run_strategy_tests can hand the finished results file to a background
+# process (or skip plotting) instead of rendering before it returns.
+#
+# Charts read the records written by a ResultSink, so a report can also be
+# rendered later, or while a sweep is still running:
+#
+#     python reporting.py strategy_test_results.jsonl --preview
+
+import argparse
+import multiprocessing
+import numpy as np
+
+DEFAULT_REPORT_PATH = 'strategy_optimization_results.png'
+
+# Quick-look settings: screen resolution and a capped number of points
+PREVIEW_DPI = 72
+PREVIEW_MAX_POINTS = 500
+
+def downsample(results, max_points):
+    """Every k-th result in total_return order, keeping the best and worst"""
+    if max_points is None or len(results) <= max_points:
+        return results
+    ranked = sorted(results, key=lambda result: result['total_return'])
+    keep = np.unique(np.linspace(0, len(ranked) - 1, max_points).round().astype(int))
+    return [ranked[i] for i in keep]
+
+def create_performance_visualization(results, strategy_type, output_path=DEFAULT_REPORT_PATH,
+                                     dpi=300, max_points=None):
+    """Create performance visualization"""
+    import matplotlib
+    matplotlib.use('Agg')  # no display needed, safe in worker processes
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    import pandas as pd
+
+    df = pd.DataFrame(downsample(results, max_points))
+
+    plt.figure(figsize=(15, 10))
+
+    # Plot 1: Total Return vs Sharpe Ratio
+    plt.subplot(2, 2, 1)
+    plt.scatter(df['total_return'], df['sharpe_ratio'], alpha=0.6)
+    plt.xlabel('Total Return (%)')
+    plt.ylabel('Sharpe Ratio')
+    plt.title(f'{strategy_type} Strategy: Return vs Risk')
+    plt.grid(True, alpha=0.3)
+
+    # Plot 2: Total Return vs Max Drawdown
+    plt.subplot(2, 2, 2)
+    plt.scatter(df['max_drawdown'], df['total_return'], alpha=0.6, color='red')
+    plt.xlabel('Max Drawdown (%)')
+    plt.ylabel('Total Return (%)')
+    plt.title(f'{strategy_type} Strategy: Return vs Drawdown')
+    plt.grid(True, alpha=0.3)
+
+    # Plot 3: Win Rate vs Total Return
+    plt.subplot(2, 2, 3)
+    plt.scatter(df['win_rate'], df['total_return'], alpha=0.6, color='green')
+    plt.xlabel('Win Rate (%)')
+    plt.ylabel('Total Return (%)')
+    plt.title(f'{strategy_type} Strategy: Win Rate vs Return')
+    plt.grid(True, alpha=0.3)
+
+    # Plot 4: Parameter heatmap (for SMA strategy), always from every result
+    if strategy_type == 'SMA':
+        plt.subplot(2, 2, 4)
+        pivot_df = pd.DataFrame([{
+            'short_period': result['parameters']['short_period'],
+            'long_period': result['parameters']['long_period'],
+            'total_return': result['total_return']
+        } for result in results])
+        heatmap_data = pivot_df.pivot_table(index='short_period', columns='long_period',
+                                            values='total_return')
+        sns.heatmap(heatmap_data, annot=True, fmt='.1f', cmap='RdYlGn')
+        plt.title('SMA Parameters Heatmap (Total Return %)')
+
+    plt.tight_layout()
+    plt.savefig(output_path, dpi=dpi, bbox_inches='tight')
+    plt.close()
+    return output_path
+
+def render_report(results_path, section='sma_optimization', strategy_type='SMA',
+                  output_path=DEFAULT_REPORT_PATH, preview=False):
+    """Chart one section of a results file written by a ResultSink"""
+    from results_sink import ResultSink
+
+    results = list(ResultSink(results_path, readonly=True).read(section))
+
+    if not results:
+        print(f"No '{section}' results in {results_path}, skipping report")
+        return None
+
+    # A file reused across runs can hold several datasets; chart the latest
+    dataset = results[-1].get('dataset')
+    results = [result for result in results if result.get('dataset') == dataset]
+
+    if preview:
+        return create_performance_visualization(results, strategy_type, output_path,
+                                                dpi=PREVIEW_DPI, max_points=PREVIEW_MAX_POINTS)
+    return create_performance_visualization(results, strategy_type, output_path)
+
+def render_in_background(results_path, **options):
+    """Start render_report in a separate process and return the Process"""
+    process = multiprocessing.Process(target=render_report, args=(results_path,), kwargs=options)
+    process.start()
+    return process
+
+def main():
+    parser = argparse.ArgumentParser(description="Chart strategy optimization results")
+    parser.add_argument('results_path', help="JSON Lines file or Parquet directory from a ResultSink")
+    parser.add_argument('--section', default='sma_optimization')
+    parser.add_argument('--strategy-type', default='SMA')
+    parser.add_argument('--output', default=DEFAULT_REPORT_PATH)
+    parser.add_argument('--preview', action='store_true', help="low-dpi chart of a sample of the results")
+    args = parser.parse_args()
+
+    path = render_report(args.results_path, args.section, args.strategy_type, args.output, args.preview)
+    if path:
+        print(f"Report saved to {path}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,158 @@
+# Multi-Timeframe Resampling
+#
+# Builds higher-timeframe OHLCV bars from a finer base series with NumPy
+# group reductions: bars are bucketed by flooring their timestamps to the
+# interval (epoch aligned, like the exchanges' candles), and each bucket's
+# open/high/low/close/volume is one take or reduceat over the base arrays.
+#
+# ResampleCache keeps the aggregate of every (symbol, base interval,
+# interval) it has built. When the base series grows (e.g. bars appended to
+# an OHLCVStore), only the last, possibly incomplete, bucket and the new
+# base rows are re-aggregated.
+#
+# align_to_base() maps an aggregate back onto the base bars without
+# look-ahead, for strategies that combine timeframes.
+
+import numpy as np
+
+INTERVAL_SECONDS = {
+    '1m': 60,
+    '5m': 5 * 60,
+    '15m': 15 * 60,
+    '1h': 60 * 60,
+    '4h': 4 * 60 * 60,
+    '1d': 24 * 60 * 60
+}
+
+OHLCV_COLUMNS = ('timestamp', 'open', 'high', 'low', 'close', 'volume')
+
+def interval_nanoseconds(interval):
+    if interval not in INTERVAL_SECONDS:
+        raise ValueError(f"Unsupported interval: {interval}")
+    return INTERVAL_SECONDS[interval] * 10 ** 9
+
+def finer_intervals(interval):
+    """Intervals that tile `interval` exactly, finest first"""
+    width = INTERVAL_SECONDS[interval]
+    return sorted((name for name, seconds in INTERVAL_SECONDS.items()
+                   if seconds < width and width % seconds == 0),
+                  key=INTERVAL_SECONDS.get)
+
+def _nanoseconds(timestamps):
+    return np.asarray(timestamps).astype('datetime64[ns]').view(np.int64)
+
+def _aggregate(base, width):
+    """Aggregate bars and the base row where each one starts"""
+    timestamps = _nanoseconds(base['timestamp'])
+    if len(timestamps) == 0:
+        empty = {name: np.empty(0) for name in OHLCV_COLUMNS[1:]}
+        return {'timestamp': np.empty(0, dtype='datetime64[ns]'), **empty}, np.empty(0, dtype=np.int64)
+
+    buckets = timestamps // width
+    starts = np.flatnonzero(np.concatenate(([True], buckets[1:] != buckets[:-1])))
+    ends = np.append(starts[1:], len(timestamps))
+
+    bars = {
+        'timestamp': (buckets[starts] * width).view('datetime64[ns]'),
+        'open': np.asarray(base['open'], dtype=float)[starts],
+        'high': np.maximum.reduceat(np.asarray(base['high'], dtype=float), starts),
+        'low': np.minimum.reduceat(np.asarray(base['low'], dtype=float), starts),
+        'close': np.asarray(base['close'], dtype=float)[ends - 1],
+        'volume': np.add.reduceat(np.asarray(base['volume'], dtype=float), starts)
+    }
+    return bars, starts
+
+def resample_ohlcv(base, interval):
+    """Aggregate a base OHLCV series (DataFrame or column mapping) to `interval`"""
+    bars, _ = _aggregate(base, interval_nanoseconds(interval))
+    return bars
+
+class Aggregate:
+    """Growable aggregate bars of one base series"""
+
+    def __init__(self, width, capacity=1024):
+        self.width = width
+        self.columns = {
+            name: np.empty(capacity, dtype='datetime64[ns]' if name == 'timestamp' else float)
+            for name in OHLCV_COLUMNS
+        }
+        self.size = 0
+        self.base_rows = 0  # Base rows aggregated so far
+        self.last_start = 0  # Base row where the last (possibly incomplete) bar starts
+        self.first_timestamp = None
+        self.last_timestamp = None
+
+    def replace_tail(self, position, bars):
+        """Overwrite bars from `position` on with `bars`"""
+        size = position + len(bars['timestamp'])
+        capacity = len(self.columns['timestamp'])
+        if size > capacity:
+            for name, values in self.columns.items():
+                self.columns[name] = np.resize(values, max(2 * capacity, size))
+        for name, values in self.columns.items():
+            values[position:size] = bars[name]
+        self.size = size
+
+    def update(self, base):
+        """Fold in base rows added since the last update"""
+        timestamps = base['timestamp']
+        rows = len(timestamps)
+        start = self.last_start
+        tail = {name: base[name][start:rows] for name in OHLCV_COLUMNS}
+        bars, starts = _aggregate(tail, self.width)
+
+        self.replace_tail(max(self.size - 1, 0), bars)
+        if len(starts):
+            self.last_start = start + int(starts[-1])
+        self.base_rows = rows
+        if rows:
+            self.first_timestamp = _nanoseconds(timestamps[:1])[0]
+            self.last_timestamp = _nanoseconds(timestamps[rows - 1:rows])[0]
+
+    def matches(self, base):
+        """Whether `base` still starts with the rows this aggregate was built from"""
+        timestamps = base['timestamp']
+        if len(timestamps) < self.base_rows:
+            return False
+        if self.base_rows == 0:
+            return True
+        return (_nanoseconds(timestamps[:1])[0] == self.first_timestamp and
+                _nanoseconds(timestamps[self.base_rows - 1:self.base_rows])[0] == self.last_timestamp)
+
+    def view(self):
+        return {name: values[:self.size] for name, values in self.columns.items()}
+
+class ResampleCache:
+    """Aggregates per (symbol, base interval, interval), updated incrementally"""
+
+    def __init__(self):
+        self.entries = {}
+
+    def get(self, symbol, base_interval, interval, base):
+        """Aggregate bars of `base` (a mapping of base_interval columns) at `interval`
+
+        `base` is typically the store's memory-mapped columns, so calls after
+        new bars are appended only aggregate the new rows.
+        """
+        key = (symbol, base_interval, interval)
+        entry = self.entries.get(key)
+        if entry is None or not entry.matches(base):
+            entry = self.entries[key] = Aggregate(interval_nanoseconds(interval))
+        if len(base['timestamp']) != entry.base_rows or entry.base_rows == 0:
+            entry.update(base)
+        return entry.view()
+
+    def clear(self):
+        self.entries.clear()
+
+def align_to_base(bars, interval, base_timestamps, column='close'):
+    """Value of `column` from the last completed `interval` bar at each base bar
+
+    A bar counts as completed once its period has ended by the base bar's
+    timestamp, so strategies never see a higher-timeframe bar before it
+    closes. NaN before the first completed bar.
+    """
+    ends = _nanoseconds(bars['timestamp']) + interval_nanoseconds(interval)
+    latest = np.searchsorted(ends, _nanoseconds(base_timestamps), side='right') - 1
+    values = np.asarray(bars[column], dtype=float)
+    return np.where(latest >= 0, values[np.maximum(latest, 0)] if len(values) else np.nan, np.nan)
@@ -0,0 +1,149 @@
+# Streaming Results Sink
+#
+# Writes backtest results as they finish instead of collecting everything in
+# memory and dumping it at the end. Two formats, picked by the path:
+#
+# - JSON Lines (*.jsonl): one record per line, flushed and fsynced per
+#   record, so a crash loses at most the line being written (a torn last
+#   line is skipped when reading back)
+# - Parquet (a directory, or any other path): records are buffered and
+#   written as numbered part files of batch_size rows each, each renamed
+#   into place once complete; needs pandas with pyarrow or fastparquet
+#
+# Every record carries a 'section' tag (e.g. 'sma_optimization'). Reopening
+# an existing sink appends to it, and completed() returns the keys a section
+# already holds so a resumed sweep can skip those parameter sets; find()
+# streams the file for just the records a caller needs back.
+
+import json
+import os
+import numpy as np
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    return str(value)
+
+def result_key(strategy_name, parameters):
+    """Identity of a backtest within a section"""
+    return strategy_name, json.dumps(parameters, sort_keys=True, default=_json_default)
+
+class ResultSink:
+    """Append-only store of result records in JSON Lines or Parquet"""
+
+    def __init__(self, path, batch_size=1000, fsync=True, readonly=False):
+        self.path = path
+        self.format = 'jsonl' if path.endswith('.jsonl') else 'parquet'
+        self.batch_size = batch_size
+        self.fsync = fsync
+        self.pending = []
+        self.file = None
+
+        if readonly:
+            # Reading while another process writes: never touch the files
+            pass
+        elif self.format == 'jsonl':
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self.file = open(path, 'a+')
+            # Start on a fresh line if the last run died mid-record
+            if self.file.tell() > 0:
+                self.file.seek(self.file.tell() - 1)
+                if self.file.read(1) != '\n':
+                    self.file.write('\n')
+        else:
+            os.makedirs(path, exist_ok=True)
+
+    def write(self, section, record):
+        """Persist one result record under `section`"""
+        record = {'section': section, **record}
+        if self.format == 'jsonl':
+            self.file.write(json.dumps(record, default=_json_default) + '\n')
+            self.file.flush()
+            if self.fsync:
+                os.fsync(self.file.fileno())
+        else:
+            self.pending.append(record)
+            if len(self.pending) >= self.batch_size:
+                self.flush()
+
+    def flush(self):
+        """Write buffered Parquet records as a new part file"""
+        if self.format != 'parquet' or not self.pending:
+            return
+        import pandas as pd
+
+        # Nested values (parameters, walk-forward windows) are stored as JSON text
+        rows = [{key: json.dumps(value, default=_json_default) if isinstance(value, (dict, list)) else value
+                 for key, value in record.items()} for record in self.pending]
+        part = len([name for name in os.listdir(self.path) if name.endswith('.parquet')])
+        final_path = os.path.join(self.path, f'part-{part:05d}.parquet')
+        temp_path = final_path + '.tmp'
+        pd.DataFrame(rows).to_parquet(temp_path, index=False)
+        os.replace(temp_path, final_path)
+        self.pending = []
+
+    def close(self):
+        self.flush()
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def read(self, section=None):
+        """Yield the records written so far, optionally only one section's"""
+        for record in self._read_all():
+            if section is None or record.get('section') == section:
+                yield record
+
+    def _read_all(self):
+        if self.format == 'jsonl':
+            if not os.path.exists(self.path):
+                return
+            with open(self.path) as f:
+                for line in f:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        continue  # torn write from an interrupted run
+            return
+
+        import pandas as pd
+        if not os.path.isdir(self.path):
+            return
+        for name in sorted(os.listdir(self.path)):
+            if not name.endswith('.parquet'):
+                continue
+            for row in pd.read_parquet(os.path.join(self.path, name)).to_dict('records'):
+                if isinstance(row.get('parameters'), str):
+                    row['parameters'] = json.loads(row['parameters'])
+                yield row
+        yield from self.pending
+
+    def stored(self, section, dataset=None):
+        """Yield (result_key, record) for `section`, optionally only records of one dataset"""
+        for record in self.read(section):
+            if 'strategy_name' not in record or 'parameters' not in record:
+                continue
+            if dataset is not None and record.get('dataset') != dataset:
+                continue
+            yield result_key(record['strategy_name'], record['parameters']), record
+
+    def completed(self, section, dataset=None):
+        """Set of result keys already stored in `section` (records stay on disk)"""
+        return {key for key, _ in self.stored(section, dataset)}
+
+    def find(self, section, keys, dataset=None):
+        """{result_key: record} for just the given keys, in one pass over the section"""
+        wanted = set(keys)
+        found = {}
+        for key, record in self.stored(section, dataset):
+            if key in wanted:
+                found[key] = record
+        return found
@@ -0,0 +1,365 @@
+# Trading Strategies
+#
+# Strategy classes and signal codes. Imports only NumPy (plus the indicator,
+# cache and trade log modules, which do too), so pool workers and live bots
+# that just need a strategy start quickly.
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from indicators import SMA, RSI
+from indicator_cache import indicator_cache, dataset_fingerprint
+from trade_log import TradeLog
+from kernels import run_kernel
+
+# Signal codes used by the vectorized engine
+BUY = 1
+SELL = -1
+HOLD = 0
+
+SIGNAL_NAMES = {BUY: 'buy', SELL: 'sell', HOLD: 'hold'}
+
+def rolling_mean(values, period):
+    """Mean of each full window of `period` values along the last axis
+    (window k covers values[..., k:k+period])"""
+    if values.shape[-1] < period:
+        return np.empty(values.shape[:-1] + (0,))
+    return sliding_window_view(values, period, axis=-1).mean(axis=-1)
+
+class TradingStrategy:
+    """Base class for trading strategies"""
+    
+    def __init__(self, name, parameters=None):
+        self.name = name
+        self.parameters = parameters or {}
+        self.trades = TradeLog()
+        self.initial_balance = 10000
+        self.balance = self.initial_balance  # Starting balance
+        self.position = 0  # Current position
+        self.entry_price = 0
+        self.bars_seen = 0  # Closes fed to the streaming indicators
+        self.last_signal = 'hold'
+        
+    def generate_signal(self, data, index):
+        """Generate trading signal based on strategy logic
+        
+        Streaming strategies feed every close before `index` to their
+        indicators once, so a sequential pass costs O(1) per bar.
+        """
+        if index < self.bars_seen:
+            # Rewound to an earlier bar (e.g. a new dataset) - replay from the start
+            self.reset_indicators()
+            self.bars_seen = 0
+            self.last_signal = 'hold'
+        
+        close = np.asarray(data['close'])
+        while self.bars_seen < index:
+            self.update(close[self.bars_seen])
+        return self.last_signal
+    
+    def reset_indicators(self):
+        """Clear streaming indicator state"""
+        raise NotImplementedError
+    
+    def update(self, price):
+        """Feed one closed bar and return the signal for the next bar"""
+        self.bars_seen += 1
+        self.last_signal = self.next_signal(price)
+        return self.last_signal
+    
+    def next_signal(self, price):
+        """Update indicators with `price` and decide the next signal"""
+        raise NotImplementedError
+    
+    def generate_signals(self, close):
+        """Generate signal codes for every bar at once (BUY/SELL/HOLD int8 array)
+        
+        Must match generate_signal(data, i) for every i. `close` may also be
+        a 2-D (paths, bars) array, giving one row of signals per path.
+        Strategies that cannot be vectorized leave this unimplemented and use
+        the loop engine.
+        """
+        raise NotImplementedError
+    
+    @property
+    def supports_vectorized(self):
+        return type(self).generate_signals is not TradingStrategy.generate_signals
+    
+    def execute_trade(self, signal, price, timestamp):
+        """Execute trade based on signal"""
+        if signal == 'buy' and self.position == 0:
+            # Buy signal - enter long position
+            amount = self.balance * 0.95 / price  # Use 95% of balance
+            self.position = amount
+            self.entry_price = price
+            self.balance -= amount * price
+            
+            self.trades.append(timestamp, BUY, price, amount, self.balance)
+            
+        elif signal == 'sell' and self.position > 0:
+            # Sell signal - exit long position
+            self.balance += self.position * price
+            
+            self.trades.append(timestamp, SELL, price, self.position, self.balance,
+                               (price - self.entry_price) * self.position)
+            
+            self.position = 0
+            self.entry_price = 0
+    
+    def get_portfolio_value(self, current_price):
+        """Get current portfolio value"""
+        return self.balance + (self.position * current_price)
+
+class SMAStrategy(TradingStrategy):
+    """Simple Moving Average Crossover Strategy"""
+    
+    def __init__(self, short_period=10, long_period=30):
+        super().__init__("SMA Crossover", {
+            'short_period': short_period,
+            'long_period': long_period
+        })
+        self.short_period = short_period
+        self.long_period = long_period
+        self.reset_indicators()
+    
+    def reset_indicators(self):
+        self.short_ma = SMA(self.short_period)
+        self.long_ma = SMA(self.long_period)
+        self.prev_short_ma = None
+        self.prev_long_ma = None
+    
+    def next_signal(self, price):
+        prev_short_ma, prev_long_ma = self.prev_short_ma, self.prev_long_ma
+        short_ma = self.short_ma.update(price)
+        long_ma = self.long_ma.update(price)
+        self.prev_short_ma, self.prev_long_ma = short_ma, long_ma
+        
+        if short_ma is None or long_ma is None or prev_long_ma is None:
+            return 'hold'
+        
+        # Golden cross - short MA crosses above long MA
+        if short_ma > long_ma and prev_short_ma <= prev_long_ma:
+            return 'buy'
+        # Death cross - short MA crosses below long MA
+        elif short_ma < long_ma and prev_short_ma >= prev_long_ma:
+            return 'sell'
+        
+        return 'hold'
+    
+    def generate_signals(self, close):
+        close = np.asarray(close, dtype=float)
+        signals = np.zeros(close.shape, dtype=np.int8)
+        n_bars = close.shape[-1]
+        
+        # The loop engine holds until both the current and previous long MA
+        # windows are complete, i.e. from index long_period + 1 onwards
+        start = max(self.short_period, self.long_period) + 1
+        if n_bars <= start:
+            return signals
+        
+        # Shared across strategies on the same dataset (e.g. 5/20 and 5/30)
+        fingerprint = dataset_fingerprint(close)
+        short_means = indicator_cache.get(fingerprint, 'sma', self.short_period,
+                                          lambda: rolling_mean(close, self.short_period))
+        long_means = indicator_cache.get(fingerprint, 'sma', self.long_period,
+                                         lambda: rolling_mean(close, self.long_period))
+        
+        idx = np.arange(start, n_bars)
+        short_ma = short_means[..., idx - self.short_period]
+        long_ma = long_means[..., idx - self.long_period]
+        prev_short_ma = short_means[..., idx - self.short_period - 1]
+        prev_long_ma = long_means[..., idx - self.long_period - 1]
+        
+        golden = (short_ma > long_ma) & (prev_short_ma <= prev_long_ma)
+        death = (short_ma < long_ma) & (prev_short_ma >= prev_long_ma)
+        
+        tail = signals[..., start:]
+        tail[golden] = BUY
+        tail[death] = SELL
+        return signals
+
+class RSIStrategy(TradingStrategy):
+    """RSI Oversold/Overbought Strategy"""
+    
+    def __init__(self, period=14, oversold=30, overbought=70, smoothing='simple'):
+        parameters = {'period': period, 'oversold': oversold, 'overbought': overbought}
+        if smoothing != 'simple':
+            # Only when not the default, so results stored before it existed keep their keys
+            parameters['smoothing'] = smoothing
+        super().__init__("RSI Strategy", parameters)
+        self.period = period
+        self.oversold = oversold
+        self.overbought = overbought
+        # 'simple' averages the last `period` changes (what calculate_rsi does);
+        # 'wilder' uses Wilder's smoothing
+        self.smoothing = smoothing
+        self.reset_indicators()
+    
+    def reset_indicators(self):
+        self.rsi = RSI(self.period, smoothing=self.smoothing)
+    
+    def calculate_rsi(self, prices):
+        """Calculate RSI indicator"""
+        deltas = np.diff(prices)
+        gains = np.where(deltas > 0, deltas, 0)
+        losses = np.where(deltas < 0, -deltas, 0)
+        
+        avg_gain = np.mean(gains[-self.period:])
+        avg_loss = np.mean(losses[-self.period:])
+        
+        if avg_loss == 0:
+            return 100
+        
+        rs = avg_gain / avg_loss
+        rsi = 100 - (100 / (1 + rs))
+        return rsi
+    
+    def next_signal(self, price):
+        rsi = self.rsi.update(price)
+        if rsi is None:
+            return 'hold'
+        
+        if rsi < self.oversold:
+            return 'buy'
+        elif rsi > self.overbought:
+            return 'sell'
+        
+        return 'hold'
+    
+    def calculate_rsi_series(self, close):
+        """RSI for every bar from the closes before it (NaN until warmed up)"""
+        close = np.asarray(close, dtype=float)
+        rsi = np.full(close.shape, np.nan)
+        n_bars = close.shape[-1]
+        start = self.period + 1
+        if n_bars <= start:
+            return rsi
+        
+        if self.smoothing == 'wilder' and close.ndim > 1:
+            return np.array([self.calculate_rsi_series(row) for row in close])
+        
+        if self.smoothing == 'wilder':
+            # Wilder's average is recursive, so run the streaming indicator once
+            indicator = RSI(self.period, smoothing='wilder')
+            for i in range(len(close) - 1):
+                value = indicator.update(close[i])
+                if value is not None:
+                    rsi[i + 1] = value
+            return rsi
+        
+        deltas = np.diff(close)
+        gains = np.where(deltas > 0, deltas, 0)
+        losses = np.where(deltas < 0, -deltas, 0)
+        
+        # Bar i uses the `period` deltas ending at deltas[i - 2]
+        avg_gain = rolling_mean(gains, self.period)[..., :n_bars - start]
+        avg_loss = rolling_mean(losses, self.period)[..., :n_bars - start]
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            values = 100 - (100 / (1 + avg_gain / avg_loss))
+        rsi[..., start:] = np.where(avg_loss == 0, 100, values)
+        return rsi
+    
+    def generate_signals(self, close):
+        close = np.asarray(close, dtype=float)
+        rsi = indicator_cache.get(dataset_fingerprint(close), f'rsi_{self.smoothing}', self.period,
+                                  lambda: self.calculate_rsi_series(close))
+        signals = np.zeros(rsi.shape, dtype=np.int8)
+        signals[rsi < self.oversold] = BUY
+        signals[rsi > self.overbought] = SELL
+        return signals
+
+class KernelStrategy(TradingStrategy):
+    """Strategy defined by a per-bar step function (see kernels)
+    
+    Subclasses set `step` to a staticmethod and describe its inputs with
+    kernel_params() and kernel_state(). Both engines run the same step: the
+    vectorized engine over the whole close array (JIT-compiled when numba
+    is installed), the loop engine one bar per generate_signal call.
+    """
+    
+    step = None
+    use_jit = True
+    
+    def kernel_params(self):
+        """float64 array of the step function's parameters"""
+        raise NotImplementedError
+    
+    def kernel_state(self):
+        """Fresh float64 state array for a run"""
+        raise NotImplementedError
+    
+    def reset_indicators(self):
+        self.state = self.kernel_state()
+    
+    def generate_signal(self, data, index):
+        if index < self.bars_seen or self.bars_seen == 0:
+            # New run (or rewound) - start from a fresh state
+            self.reset_indicators()
+            self.bars_seen = 0
+            self.last_signal = 'hold'
+        
+        close = np.asarray(data['close'], dtype=float)
+        params = self.kernel_params()
+        step = type(self).step
+        while self.bars_seen <= index:
+            self.last_signal = SIGNAL_NAMES[step(self.bars_seen, close, params, self.state)]
+            self.bars_seen += 1
+        return self.last_signal
+    
+    def generate_signals(self, close):
+        close = np.asarray(close, dtype=float)
+        if close.ndim > 1:
+            return np.array([self.generate_signals(row) for row in close])
+        return run_kernel(type(self).step, close, self.kernel_params(), self.kernel_state(),
+                          jit=self.use_jit)
+
+def trailing_stop_step(i, close, params, state):
+    """Breakout entry with a trailing stop exit
+    
+    params: [lookback, trail_percent]
+    state: [1.0 while long else 0.0, highest close since entry]
+    """
+    lookback = int(params[0])
+    if i <= lookback:
+        return HOLD
+    
+    price = close[i - 1]
+    if state[0] == 0.0:
+        # Enter when the last close beats the previous `lookback` closes
+        highest = close[i - 1 - lookback]
+        for j in range(i - lookback, i - 1):
+            if close[j] > highest:
+                highest = close[j]
+        if price > highest:
+            state[0] = 1.0
+            state[1] = price
+            return BUY
+        return HOLD
+    
+    # Exit once the close falls trail_percent below its high since entry
+    if price > state[1]:
+        state[1] = price
+    if price <= state[1] * (1 - params[1] / 100):
+        state[0] = 0.0
+        return SELL
+    return HOLD
+
+class TrailingStopStrategy(KernelStrategy):
+    """Breakout Strategy with a Trailing Stop"""
+    
+    step = staticmethod(trailing_stop_step)
+    
+    def __init__(self, lookback=20, trail_percent=5):
+        super().__init__(
+            name="Trailing Stop Breakout",
+            parameters={'lookback': lookback, 'trail_percent': trail_percent}
+        )
+        self.lookback = lookback
+        self.trail_percent = trail_percent
+        self.reset_indicators()
+    
+    def kernel_params(self):
+        return np.array([self.lookback, self.trail_percent], dtype=np.float64)
+    
+    def kernel_state(self):
+        return np.zeros(2)
@@ -0,0 +1,334 @@
+# Strategy Parameter Optimizers
+#
+# Pluggable search over a strategy's parameter space. A space maps each
+# constructor argument to its candidate values, e.g.
+#
+#     {'short_period': [5, 10, 15, 20], 'long_period': [20, 30, 40, 50]}
+#
+# Every optimizer returns the top_k backtest_strategy result records (best
+# first) of the configurations it evaluated on the full dataset. Only that
+# running top-k is kept in memory; the full record of every configuration
+# goes to the sink, if there is one.
+#
+# The budget is counted in full-dataset backtests: a run on 25% of the data
+# costs 0.25. Setting prune_fraction makes any optimizer first backtest each
+# configuration on that leading fraction of the data and drop configurations
+# that score in the bottom prune_quantile of everything seen so far.
+#
+# With a ResultSink, every full-data result is written to it the moment it
+# finishes, and configurations already stored under the same section are
+# reused instead of backtested again (only their keys are held in memory;
+# their records are streamed back from the sink), so an interrupted sweep
+# resumes.
+# Records are tagged with a fingerprint of the closes they were run on, so
+# results from different data are never reused.
+
+import heapq
+import itertools
+import math
+import random
+import numpy as np
+from backtest import backtest_strategy, column, row_count, slice_rows
+from parameter_sweep import run_parameter_sweep
+from indicator_cache import dataset_fingerprint
+from results_sink import result_key
+
+class Optimizer:
+    """Base class: bookkeeping, budget, pruning and (parallel) evaluation"""
+
+    name = 'base'
+
+    def __init__(self, strategy_class, space, objective='total_return', budget=None,
+                 constraint=None, prune_fraction=None, prune_quantile=0.25,
+                 min_trials_before_pruning=5, max_workers=None, seed=None, sink=None,
+                 section=None, top_k=10):
+        self.strategy_class = strategy_class
+        self.space = {name: list(values) for name, values in space.items()}
+        self.objective = objective
+        self.budget = budget
+        self.constraint = constraint
+        self.prune_fraction = prune_fraction
+        self.prune_quantile = prune_quantile
+        self.min_trials_before_pruning = min_trials_before_pruning
+        self.max_workers = max_workers
+        self.rng = random.Random(seed)
+        self.sink = sink
+        self.section = section or f'{self.name}_{strategy_class.__name__}'
+        self.top_k = top_k
+
+    def optimize(self, data):
+        """Search the space on `data` and return the top_k full-data result records, best first"""
+        self.top = []  # min-heap of (score, order, record), at most top_k long
+        self.completed = 0  # full-data results seen, resumed ones included
+        self.evaluated = set()
+        self.partial_scores = []
+        self.spent = 0.0
+        self.pruned = 0
+        self.stored = set()
+        self.resumed = 0
+        if self.sink is not None:
+            self.dataset = dataset_fingerprint(column(data, 'close', float))
+            self.stored = self.sink.completed(self.section, self.dataset)
+
+        self.search(data)
+        return self.results
+
+    @property
+    def results(self):
+        """The best top_k full-data results so far, best first"""
+        return [record for _, _, record in sorted(self.top, key=lambda item: item[:2], reverse=True)]
+
+    @property
+    def best(self):
+        return max(self.top, key=lambda item: item[:2])[2] if self.top else None
+
+    def record(self, result):
+        """Fold one full-data result into the running top-k"""
+        self.completed += 1
+        # Earlier results win ties
+        item = (self.score(result), -self.completed, result)
+        if len(self.top) < self.top_k:
+            heapq.heappush(self.top, item)
+        elif item[:2] > self.top[0][:2]:
+            heapq.heapreplace(self.top, item)
+
+    def search(self, data):
+        raise NotImplementedError
+
+    # Search space helpers
+
+    def key(self, parameters):
+        return tuple(parameters[name] for name in self.space)
+
+    def is_valid(self, parameters):
+        return self.constraint is None or self.constraint(parameters)
+
+    def all_candidates(self):
+        names = list(self.space)
+        candidates = []
+        for values in itertools.product(*self.space.values()):
+            parameters = dict(zip(names, values))
+            if self.is_valid(parameters):
+                candidates.append(parameters)
+        return candidates
+
+    def sample_unseen(self, count):
+        """Up to `count` valid configurations not evaluated yet, in random order"""
+        candidates = [p for p in self.all_candidates() if self.key(p) not in self.evaluated]
+        self.rng.shuffle(candidates)
+        return candidates[:count]
+
+    def score(self, result):
+        value = result[self.objective]
+        return value if value is not None and value == value else -math.inf  # NaN/None rank last
+
+    # Evaluation
+
+    def remaining(self):
+        return math.inf if self.budget is None else self.budget - self.spent
+
+    def backtest(self, candidates, data, fraction=1.0):
+        """Backtest candidates on the leading `fraction` of data, within budget"""
+        affordable = self.remaining() / fraction
+        if affordable < len(candidates):
+            candidates = candidates[:int(affordable + 1e-9)]
+        if not candidates:
+            return candidates, []
+
+        self.spent += len(candidates) * fraction
+        subset = data if fraction >= 1 else slice_rows(data, 0, max(int(row_count(data) * fraction), 1))
+        sink = self.sink if fraction >= 1 else None
+
+        if self.max_workers == 1 or len(candidates) == 1:
+            results = []
+            for p in candidates:
+                results.append(backtest_strategy(self.strategy_class(**p), subset))
+                if sink is not None:
+                    sink.write(self.section, {**results[-1], 'dataset': self.dataset})
+        else:
+            tasks = [(self.strategy_class, p) for p in candidates]
+            results = [None] * len(tasks)
+            for index, result in run_parameter_sweep(subset, tasks, max_workers=self.max_workers):
+                results[index] = result
+                if sink is not None:
+                    sink.write(self.section, {**result, 'dataset': self.dataset})
+
+        return candidates, results
+
+    def stored_key(self, parameters):
+        """The sink key of these parameters if an earlier run stored them, else None"""
+        if not self.stored:
+            return None
+        strategy = self.strategy_class(**parameters)
+        key = result_key(strategy.name, strategy.parameters)
+        return key if key in self.stored else None
+
+    def stored_results(self, keys):
+        """Records of earlier runs for these sink keys, streamed back from the sink"""
+        found = self.sink.find(self.section, keys, self.dataset)
+        return [{key: value for key, value in record.items() if key not in ('section', 'dataset')}
+                for record in found.values()]
+
+    def evaluate(self, candidates, data):
+        """Evaluate candidates on the full data (after optional pruning) and record them"""
+        for parameters in candidates:
+            self.evaluated.add(self.key(parameters))
+
+        # Resume: reuse results already in the sink
+        fresh, resumed_keys = [], []
+        for parameters in candidates:
+            key = self.stored_key(parameters)
+            if key is None:
+                fresh.append(parameters)
+            else:
+                resumed_keys.append(key)
+        resumed = self.stored_results(resumed_keys) if resumed_keys else []
+        for result in resumed:
+            self.record(result)
+        self.resumed += len(resumed)
+        candidates = fresh
+
+        if self.prune_fraction:
+            candidates, partial = self.backtest(candidates, data, self.prune_fraction)
+            scores = [self.score(r) for r in partial]
+            history = self.partial_scores + scores
+            self.partial_scores = history
+
+            if len(history) >= self.min_trials_before_pruning:
+                cutoff = np.quantile(history, self.prune_quantile)
+                survivors = [p for p, s in zip(candidates, scores) if s >= cutoff]
+                self.pruned += len(candidates) - len(survivors)
+                candidates = survivors
+
+        candidates, results = self.backtest(candidates, data)
+        for result in results:
+            self.record(result)
+
+class GridSearch(Optimizer):
+    """Every valid combination, in grid order"""
+
+    name = 'grid'
+
+    def search(self, data):
+        self.evaluate(self.all_candidates(), data)
+
+class RandomSearch(Optimizer):
+    """Uniformly sampled combinations until the budget (or space) runs out"""
+
+    name = 'random'
+
+    def __init__(self, *args, n_trials=20, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.n_trials = n_trials
+
+    def search(self, data):
+        count = self.n_trials if self.budget is None else max(int(self.budget), 1)
+        self.evaluate(self.sample_unseen(count), data)
+
+class SuccessiveHalving(Optimizer):
+    """Start many configurations on a small slice of data, keep the best 1/eta
+    at each rung and give survivors eta times more data until the full set"""
+
+    name = 'halving'
+
+    def __init__(self, *args, eta=3, rungs=3, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.eta = eta
+        self.rungs = rungs
+
+    def search(self, data):
+        candidates = self.all_candidates()
+        if self.budget is not None:
+            # Each rung costs n0 / eta ** (rungs - 1) full backtests
+            n0 = int(self.budget * self.eta ** (self.rungs - 1) / self.rungs)
+            self.rng.shuffle(candidates)
+            candidates = candidates[:max(n0, 1)]
+
+        for rung in range(self.rungs - 1):
+            fraction = self.eta ** (rung - self.rungs + 1)
+            candidates, partial = self.backtest(candidates, data, fraction)
+            keep = max(len(candidates) // self.eta, 1)
+            ranked = sorted(zip(candidates, partial), key=lambda item: self.score(item[1]), reverse=True)
+            self.pruned += len(candidates) - keep
+            candidates = [p for p, _ in ranked[:keep]]
+
+        self.evaluate(candidates, data)
+
+class TPESearch(Optimizer):
+    """Tree-structured Parzen estimator over discrete choices
+
+    After n_startup random trials, split results into the best `gamma`
+    fraction and the rest, estimate per-parameter choice frequencies for both
+    groups, and evaluate the sampled candidate with the highest good/bad
+    likelihood ratio.
+    """
+
+    name = 'tpe'
+
+    def __init__(self, *args, n_trials=30, n_startup=8, gamma=0.25, n_candidates=24, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.n_trials = n_trials
+        self.n_startup = n_startup
+        self.gamma = gamma
+        self.n_candidates = n_candidates
+
+    def optimize(self, data):
+        self.trials = []  # (score, parameters) of every full-data result, for the density estimates
+        return super().optimize(data)
+
+    def record(self, result):
+        super().record(result)
+        self.trials.append((self.score(result), result['parameters']))
+
+    def search(self, data):
+        trials = self.n_trials if self.budget is None else max(int(self.budget), 1)
+        self.evaluate(self.sample_unseen(min(self.n_startup, trials)), data)
+
+        while len(self.evaluated) < trials and self.remaining() >= 1:
+            candidate = self.suggest()
+            if candidate is None:
+                break
+            self.evaluate([candidate], data)
+
+    def choice_weights(self, trials, name):
+        counts = {value: 1.0 for value in self.space[name]}  # add-one smoothing
+        for _, parameters in trials:
+            counts[parameters[name]] += 1
+        total = sum(counts.values())
+        return {value: count / total for value, count in counts.items()}
+
+    def suggest(self):
+        if not self.trials:
+            unseen = self.sample_unseen(1)
+            return unseen[0] if unseen else None
+
+        ranked = sorted(self.trials, key=lambda trial: trial[0], reverse=True)
+        n_good = max(int(math.ceil(self.gamma * len(ranked))), 1)
+        good, bad = ranked[:n_good], ranked[n_good:]
+        good_weights = {name: self.choice_weights(good, name) for name in self.space}
+        bad_weights = {name: self.choice_weights(bad, name) for name in self.space}
+
+        best, best_ratio = None, -math.inf
+        for _ in range(self.n_candidates):
+            candidate = {}
+            for name, values in self.space.items():
+                weights = [good_weights[name][value] for value in values]
+                candidate[name] = self.rng.choices(values, weights=weights)[0]
+
+            if not self.is_valid(candidate) or self.key(candidate) in self.evaluated:
+                continue
+
+            ratio = sum(math.log(good_weights[name][candidate[name]] / bad_weights[name][candidate[name]])
+                        for name in self.space)
+            if ratio > best_ratio:
+                best, best_ratio = candidate, ratio
+
+        if best is None:
+            unseen = self.sample_unseen(1)
+            return unseen[0] if unseen else None
+        return best
+
+OPTIMIZERS = {
+    optimizer.name: optimizer
+    for optimizer in (GridSearch, RandomSearch, SuccessiveHalving, TPESearch)
+}
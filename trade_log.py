@@ -0,0 +1,147 @@
+# Trade Log
+#
+# Backtest trades as one structured NumPy array instead of a dict per trade.
+# A high-frequency backtest can produce millions of trades; as rows of fixed
+# dtypes they take ~41 bytes each, appends are amortized O(1), and win rate,
+# average win/loss, profit factor and holding times are array reductions.
+#
+# Iterating a TradeLog still yields the old trade dicts, so code written
+# against the list of dicts keeps working. Pandas is only imported to export
+# (to_frame / to_json / to_csv / to_parquet).
+
+import numpy as np
+
+# Same codes as the strategy signals
+BUY = 1
+SELL = -1
+
+TRADE_LOG_DTYPE = np.dtype([
+    ('timestamp', 'datetime64[ns]'),
+    ('side', np.int8),  # BUY or SELL
+    ('price', np.float64),
+    ('amount', np.float64),
+    ('balance', np.float64),  # Cash balance after the trade
+    ('pnl', np.float64)  # Realized profit/loss on sells, NaN on buys
+])
+
+def finite_or_none(value):
+    return float(value) if np.isfinite(value) else None
+
+class TradeLog:
+    """Append-only trades in a growable structured array"""
+
+    def __init__(self, capacity=64):
+        self.records = np.empty(capacity, dtype=TRADE_LOG_DTYPE)
+        self.size = 0
+
+    def reserve(self, count):
+        if self.size + count > len(self.records):
+            self.records = np.resize(self.records, max(2 * len(self.records), self.size + count))
+
+    def append(self, timestamp, side, price, amount, balance, pnl=np.nan):
+        self.reserve(1)
+        self.records[self.size] = (timestamp, side, price, amount, balance, pnl)
+        self.size += 1
+
+    def extend(self, trades):
+        """Append a TRADE_LOG_DTYPE array of trades"""
+        self.reserve(len(trades))
+        self.records[self.size:self.size + len(trades)] = trades
+        self.size += len(trades)
+
+    def clear(self):
+        self.size = 0
+
+    def view(self):
+        return self.records[:self.size]
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+        for trade in self.view():
+            yield self.trade_dict(trade)
+
+    @staticmethod
+    def trade_dict(trade):
+        """One trade in the original dict format"""
+        buy = trade['side'] == BUY
+        record = {
+            'timestamp': trade['timestamp'],
+            'action': 'buy' if buy else 'sell',
+            'price': float(trade['price']),
+            'amount': float(trade['amount']),
+            'balance': float(trade['balance']),
+            'position_value': float(trade['amount'] * trade['price']) if buy else 0
+        }
+        if not buy:
+            record['profit_loss'] = float(trade['pnl'])
+        return record
+
+    # Statistics
+
+    def closed_pnl(self):
+        """Realized PnL of every closing trade"""
+        trades = self.view()
+        return trades['pnl'][trades['side'] == SELL]
+
+    def win_rate(self):
+        pnl = self.closed_pnl()
+        return np.mean(pnl > 0) * 100 if len(pnl) else 0
+
+    def average_win(self):
+        pnl = self.closed_pnl()
+        wins = pnl[pnl > 0]
+        return wins.mean() if len(wins) else 0.0
+
+    def average_loss(self):
+        pnl = self.closed_pnl()
+        losses = pnl[pnl < 0]
+        return losses.mean() if len(losses) else 0.0
+
+    def profit_factor(self):
+        """Gross profit over gross loss (inf with no losing trades)"""
+        pnl = self.closed_pnl()
+        gross_loss = -pnl[pnl < 0].sum()
+        gross_profit = pnl[pnl > 0].sum()
+        if gross_loss == 0:
+            return np.inf if gross_profit > 0 else 0.0
+        return gross_profit / gross_loss
+
+    def holding_times(self):
+        """timedelta64 from each entry to the exit that closed it"""
+        trades = self.view()
+        sells = np.flatnonzero(trades['side'] == SELL)
+        buys = np.flatnonzero(trades['side'] == BUY)
+        # Each exit closes the most recent entry before it
+        entries = buys[np.searchsorted(buys, sells) - 1]
+        return trades['timestamp'][sells] - trades['timestamp'][entries]
+
+    def stats(self):
+        holding = self.holding_times()
+        return {
+            'win_rate': self.win_rate(),
+            'average_win': self.average_win(),
+            'average_loss': self.average_loss(),
+            # None instead of inf (no losing trades), which isn't valid JSON
+            'profit_factor': finite_or_none(self.profit_factor()),
+            'average_holding_hours': holding.mean() / np.timedelta64(1, 'h') if len(holding) else 0.0
+        }
+
+    # Export
+
+    def to_frame(self):
+        import pandas as pd
+        trades = self.view()
+        frame = pd.DataFrame({name: trades[name] for name in TRADE_LOG_DTYPE.names})
+        frame['side'] = np.where(trades['side'] == BUY, 'buy', 'sell')
+        return frame
+
+    def to_json(self, path):
+        self.to_frame().to_json(path, orient='records', date_format='iso', lines=True)
+
+    def to_csv(self, path):
+        self.to_frame().to_csv(path, index=False)
+
+    def to_parquet(self, path):
+        self.to_frame().to_parquet(path, index=False)
@@ -2,92 +2,82 @@
 
 from flask import Blueprint, request, jsonify, session
 import json
-import uuid
-from datetime import datetime
 import ccxt
+from matching_engine import MatchingEngine, OrderError
 
 trading_bp = Blueprint('trading', __name__)
 
-# Mock exchange for demonstration
+# Starting balance of every mock account
+INITIAL_BALANCE = {
+    'USDT': 10000.0,
+    'BTC': 0.5,
+    'ETH': 2.0
+}
+
+DEFAULT_ACCOUNT = 'demo_user'
+
+# Mock price data, quoted by the house when house liquidity is on
+MOCK_TICKERS = {
+    'BTC/USDT': {'last': 45000.0, 'bid': 44995.0, 'ask': 45005.0},
+    'ETH/USDT': {'last': 3200.0, 'bid': 3198.0, 'ask': 3202.0},
+    'ADA/USDT': {'last': 0.85, 'bid': 0.849, 'ask': 0.851}
+}
+DEFAULT_TICKER = {'last': 100.0, 'bid': 99.5, 'ask': 100.5}
+
+def public_order(order):
+    """Order as returned to API clients"""
+    return {key: value for key, value in order.items() if key not in ('account', 'reserved', 'sequence')}
+
+# Mock exchange for demonstration and load tests: ccxt-style calls on a local matching engine
 class MockExchange:
-    def __init__(self):
-        self.balance = {
-            'USDT': 10000.0,
-            'BTC': 0.5,
-            'ETH': 2.0
-        }
-        self.orders = []
-        self.trades = []
+    def __init__(self, house_liquidity=True):
+        self.house_liquidity = house_liquidity
+        self.engine = MatchingEngine(INITIAL_BALANCE, quote=self.house_quote if house_liquidity else None)
+    
+    def house_quote(self, symbol):
+        return MOCK_TICKERS.get(symbol, DEFAULT_TICKER)
     
     def fetch_ticker(self, symbol):
-        # Mock price data
-        prices = {
-            'BTC/USDT': {'last': 45000.0, 'bid': 44995.0, 'ask': 45005.0},
-            'ETH/USDT': {'last': 3200.0, 'bid': 3198.0, 'ask': 3202.0},
-            'ADA/USDT': {'last': 0.85, 'bid': 0.849, 'ask': 0.851}
-        }
-        return prices.get(symbol, {'last': 100.0, 'bid': 99.5, 'ask': 100.5})
+        quote = self.house_quote(symbol)
+        bid, ask, last = self.engine.top_of_book(symbol)
+        if self.house_liquidity:
+            bid = quote['bid'] if bid is None else max(bid, quote['bid'])
+            ask = quote['ask'] if ask is None else min(ask, quote['ask'])
+        return {'last': last if last is not None else quote['last'], 'bid': bid, 'ask': ask}
     
-    def create_market_buy_order(self, symbol, amount):
-        ticker = self.fetch_ticker(symbol)
-        price = ticker['ask']
-        cost = amount * price
-        
-        base, quote = symbol.split('/')
-        
-        if self.balance.get(quote, 0) >= cost:
-            self.balance[quote] -= cost
-            self.balance[base] = self.balance.get(base, 0) + amount
-            
-            order = {
-                'id': str(uuid.uuid4()),
-                'symbol': symbol,
-                'side': 'buy',
-                'amount': amount,
-                'price': price,
-                'cost': cost,
-                'timestamp': datetime.now().isoformat(),
-                'status': 'closed'
-            }
-            self.orders.append(order)
-            self.trades.append(order)
-            return order
-        else:
-            raise Exception("Insufficient balance")
+    def fetch_order_book(self, symbol, limit=20):
+        """Resting orders per price level (house quotes not included)"""
+        return self.engine.order_book(symbol, limit)
     
-    def create_market_sell_order(self, symbol, amount):
-        ticker = self.fetch_ticker(symbol)
-        price = ticker['bid']
-        cost = amount * price
-        
-        base, quote = symbol.split('/')
-        
-        if self.balance.get(base, 0) >= amount:
-            self.balance[base] -= amount
-            self.balance[quote] = self.balance.get(quote, 0) + cost
-            
-            order = {
-                'id': str(uuid.uuid4()),
-                'symbol': symbol,
-                'side': 'sell',
-                'amount': amount,
-                'price': price,
-                'cost': cost,
-                'timestamp': datetime.now().isoformat(),
-                'status': 'closed'
-            }
-            self.orders.append(order)
-            self.trades.append(order)
-            return order
-        else:
-            raise Exception("Insufficient balance")
+    def create_order(self, symbol, type, side, amount, price=None, account=DEFAULT_ACCOUNT):
+        return public_order(self.engine.submit(account, symbol, side, type, amount, price))
     
-    def fetch_balance(self):
-        return {
-            'free': self.balance.copy(),
-            'used': {k: 0 for k in self.balance.keys()},
-            'total': self.balance.copy()
-        }
+    def create_market_buy_order(self, symbol, amount, account=DEFAULT_ACCOUNT):
+        return self.create_order(symbol, 'market', 'buy', amount, account=account)
+    
+    def create_market_sell_order(self, symbol, amount, account=DEFAULT_ACCOUNT):
+        return self.create_order(symbol, 'market', 'sell', amount, account=account)
+    
+    def create_limit_buy_order(self, symbol, amount, price, account=DEFAULT_ACCOUNT):
+        return self.create_order(symbol, 'limit', 'buy', amount, price, account=account)
+    
+    def create_limit_sell_order(self, symbol, amount, price, account=DEFAULT_ACCOUNT):
+        return self.create_order(symbol, 'limit', 'sell', amount, price, account=account)
+    
+    def cancel_order(self, order_id, account=DEFAULT_ACCOUNT):
+        return public_order(self.engine.cancel(account, order_id))
+    
+    def fetch_balance(self, account=DEFAULT_ACCOUNT):
+        return self.engine.accounts.snapshot(account)
+    
+    def fetch_orders(self, account=DEFAULT_ACCOUNT):
+        return [public_order(order) for order in list(self.engine.account_orders.get(account, ()))]
+    
+    def fetch_open_orders(self, symbol=None, account=DEFAULT_ACCOUNT):
+        return [public_order(order) for order in self.engine.open_orders(account, symbol)]
+    
+    def fetch_my_trades(self, account=DEFAULT_ACCOUNT):
+        return list(self.engine.account_trades.get(account, ()))
 
 # Global mock exchange instance
 mock_exchange = MockExchange()
@@ -167,16 +157,16 @@ def execute_trade():
         symbol = data.get('symbol')
         side = data.get('side')  # 'buy' or 'sell'
         amount = float(data.get('amount'))
+        order_type = data.get('type', 'market')  # 'market' or 'limit'
+        price = float(data['price']) if data.get('price') is not None else None
+        account = session.get('user_id', DEFAULT_ACCOUNT)
         
-        if side == 'buy':
-            order = mock_exchange.create_market_buy_order(symbol, amount)
-        else:
-            order = mock_exchange.create_market_sell_order(symbol, amount)
+        order = mock_exchange.create_order(symbol, order_type, side, amount, price, account=account)
         
         return jsonify({
             'success': True,
             'order': order,
-            'message': f'Successfully executed {side} order for {amount} {symbol}'
+            'message': f'Successfully placed {order_type} {side} order for {amount} {symbol}'
         })
         
     except Exception as e:
@@ -188,18 +178,27 @@ def execute_trade():
 @trading_bp.route('/balance', methods=['GET'])
 def get_balance():
     """Get current account balance"""
-    balance = mock_exchange.fetch_balance()
+    balance = mock_exchange.fetch_balance(session.get('user_id', DEFAULT_ACCOUNT))
     return jsonify(balance)
 
 @trading_bp.route('/orders', methods=['GET'])
 def get_orders():
     """Get order history"""
-    return jsonify(mock_exchange.orders)
+    return jsonify(mock_exchange.fetch_orders(session.get('user_id', DEFAULT_ACCOUNT)))
+
+@trading_bp.route('/orders/<order_id>/cancel', methods=['POST'])
+def cancel_order(order_id):
+    """Cancel an open limit order"""
+    try:
+        order = mock_exchange.cancel_order(order_id, session.get('user_id', DEFAULT_ACCOUNT))
+        return jsonify({'success': True, 'order': order})
+    except OrderError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
 
 @trading_bp.route('/trades', methods=['GET'])
 def get_trades():
     """Get trade history"""
-    return jsonify(mock_exchange.trades)
+    return jsonify(mock_exchange.fetch_my_trades(session.get('user_id', DEFAULT_ACCOUNT)))
 
 @trading_bp.route('/price/<symbol>', methods=['GET'])
 def get_price(symbol):
@@ -1,328 +1,133 @@
 # Trading Bot Strategy Testing and Optimization
+#
+# Entry point for strategy tests. The strategies and backtest engines live in
+# strategies.py and backtest.py (NumPy only) and are re-exported here; pandas,
+# mock data generation, optimizers and plotting load on first use.
 
-import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
-from datetime import datetime, timedelta
-import random
-import json
+import os
+from datetime import timedelta
+from strategies import (
+    BUY, SELL, HOLD, rolling_mean, TradingStrategy, SMAStrategy, RSIStrategy,
+    KernelStrategy, TrailingStopStrategy
+)
+from backtest import (
+    run_signal_loop, run_vectorized, periods_per_year, calculate_performance_metrics,
+    backtest_strategy, calculate_win_rate
+)
+from indicator_cache import dataset_fingerprint
 
-class TradingStrategy:
-    """Base class for trading strategies"""
-    
-    def __init__(self, name, parameters=None):
-        self.name = name
-        self.parameters = parameters or {}
-        self.trades = []
-        self.balance = 10000  # Starting balance
-        self.position = 0  # Current position
-        self.entry_price = 0
-        
-    def generate_signal(self, data, index):
-        """Generate trading signal based on strategy logic"""
-        raise NotImplementedError
-    
-    def execute_trade(self, signal, price, timestamp):
-        """Execute trade based on signal"""
-        if signal == 'buy' and self.position == 0:
-            # Buy signal - enter long position
-            amount = self.balance * 0.95 / price  # Use 95% of balance
-            self.position = amount
-            self.entry_price = price
-            self.balance -= amount * price
-            
-            trade = {
-                'timestamp': timestamp,
-                'action': 'buy',
-                'price': price,
-                'amount': amount,
-                'balance': self.balance,
-                'position_value': self.position * price
-            }
-            self.trades.append(trade)
-            
-        elif signal == 'sell' and self.position > 0:
-            # Sell signal - exit long position
-            self.balance += self.position * price
-            
-            trade = {
-                'timestamp': timestamp,
-                'action': 'sell',
-                'price': price,
-                'amount': self.position,
-                'balance': self.balance,
-                'position_value': 0,
-                'profit_loss': (price - self.entry_price) * self.position
-            }
-            self.trades.append(trade)
-            
-            self.position = 0
-            self.entry_price = 0
-    
-    def get_portfolio_value(self, current_price):
-        """Get current portfolio value"""
-        return self.balance + (self.position * current_price)
+def generate_mock_price_data(days=365, initial_price=45000, seed=None, freq='1h',
+                             store=None, symbol='BTC/USDT', **options):
+    """Generate mock cryptocurrency price data
+    
+    Built in one vectorized pass and reproducible when seeded. Extra options
+    (drift, volatility, regimes, ...) are passed to price_data.PriceGenerator.
+    
+    With an OHLCVStore, the last `days` of stored bars for symbol/freq are
+    memory-mapped instead when the series exists (all of it if it is
+    shorter); an existing series is never replaced. Only when the store has
+    no bars for symbol/freq are the generated bars saved to it first.
+    """
+    from price_data import generate_price_data, bars_between
+    
+    n_bars = bars_between(timedelta(days=days), freq)
+    if store is not None:
+        stored = store.length(symbol, freq)
+        if stored > 0:
+            if stored < n_bars:
+                print(f"Store holds only {stored} of {n_bars} {symbol} {freq} bars, using those")
+            return store.read_frame(symbol, freq, limit=n_bars)
+    
+    data = generate_price_data(n_bars, initial_price, freq=freq, seed=seed, **options)
+    if store is not None:
+        store.write(symbol, freq, data)
+        return store.read_frame(symbol, freq, limit=n_bars)
+    return data
 
-class SMAStrategy(TradingStrategy):
-    """Simple Moving Average Crossover Strategy"""
-    
-    def __init__(self, short_period=10, long_period=30):
-        super().__init__("SMA Crossover", {
-            'short_period': short_period,
-            'long_period': long_period
-        })
-        self.short_period = short_period
-        self.long_period = long_period
-    
-    def generate_signal(self, data, index):
-        if index < self.long_period:
-            return 'hold'
-        
-        short_ma = data['close'].iloc[index-self.short_period:index].mean()
-        long_ma = data['close'].iloc[index-self.long_period:index].mean()
-        
-        prev_short_ma = data['close'].iloc[index-self.short_period-1:index-1].mean()
-        prev_long_ma = data['close'].iloc[index-self.long_period-1:index-1].mean()
-        
-        # Golden cross - short MA crosses above long MA
-        if short_ma > long_ma and prev_short_ma <= prev_long_ma:
-            return 'buy'
-        # Death cross - short MA crosses below long MA
-        elif short_ma < long_ma and prev_short_ma >= prev_long_ma:
-            return 'sell'
-        
-        return 'hold'
+DEFAULT_RESULTS_PATH = 'strategy_test_results.jsonl'
 
-class RSIStrategy(TradingStrategy):
-    """RSI Oversold/Overbought Strategy"""
-    
-    def __init__(self, period=14, oversold=30, overbought=70):
-        super().__init__("RSI Strategy", {
-            'period': period,
-            'oversold': oversold,
-            'overbought': overbought
-        })
-        self.period = period
-        self.oversold = oversold
-        self.overbought = overbought
-    
-    def calculate_rsi(self, prices):
-        """Calculate RSI indicator"""
-        deltas = np.diff(prices)
-        gains = np.where(deltas > 0, deltas, 0)
-        losses = np.where(deltas < 0, -deltas, 0)
-        
-        avg_gain = np.mean(gains[-self.period:])
-        avg_loss = np.mean(losses[-self.period:])
-        
-        if avg_loss == 0:
-            return 100
-        
-        rs = avg_gain / avg_loss
-        rsi = 100 - (100 / (1 + rs))
-        return rsi
-    
-    def generate_signal(self, data, index):
-        if index < self.period + 1:
-            return 'hold'
-        
-        prices = data['close'].iloc[:index].values
-        rsi = self.calculate_rsi(prices)
-        
-        if rsi < self.oversold:
-            return 'buy'
-        elif rsi > self.overbought:
-            return 'sell'
-        
-        return 'hold'
+# Parameter spaces searched by optimize_strategy_parameters
+SMA_PARAMETER_SPACE = {
+    'short_period': list(range(5, 21, 5)),  # 5, 10, 15, 20
+    'long_period': list(range(20, 51, 10))  # 20, 30, 40, 50
+}
 
-def generate_mock_price_data(days=365, initial_price=45000):
-    """Generate mock cryptocurrency price data"""
-    dates = pd.date_range(start=datetime.now() - timedelta(days=days), 
-                         end=datetime.now(), freq='H')
-    
-    prices = []
-    current_price = initial_price
-    
-    for i in range(len(dates)):
-        # Add some trend and volatility
-        trend = 0.0001  # Slight upward trend
-        volatility = random.uniform(-0.02, 0.02)  # ±2% hourly volatility
-        
-        # Add some market cycles
-        cycle = 0.001 * np.sin(i * 0.01)  # Long-term cycle
-        
-        change = trend + volatility + cycle
-        current_price *= (1 + change)
-        prices.append(current_price)
-    
-    data = pd.DataFrame({
-        'timestamp': dates,
-        'close': prices
-    })
-    
-    # Add OHLV data
-    data['open'] = data['close'].shift(1)
-    data['high'] = data[['open', 'close']].max(axis=1) * (1 + np.random.uniform(0, 0.005, len(data)))
-    data['low'] = data[['open', 'close']].min(axis=1) * (1 - np.random.uniform(0, 0.005, len(data)))
-    data['volume'] = np.random.uniform(1000000, 10000000, len(data))
-    
-    return data.dropna()
+RSI_PARAMETER_SPACE = {
+    'period': [10, 14, 21],
+    'oversold': [20, 30, 35],
+    'overbought': [65, 70, 80]
+}
 
-def backtest_strategy(strategy, data):
-    """Backtest a trading strategy"""
-    print(f"Backtesting {strategy.name}...")
-    
-    for i in range(len(data)):
-        signal = strategy.generate_signal(data, i)
-        price = data.iloc[i]['close']
-        timestamp = data.iloc[i]['timestamp']
-        
-        strategy.execute_trade(signal, price, timestamp)
-    
-    # Calculate performance metrics
-    final_value = strategy.get_portfolio_value(data.iloc[-1]['close'])
-    total_return = (final_value - 10000) / 10000 * 100
-    
-    # Calculate Sharpe ratio (simplified)
-    if len(strategy.trades) > 1:
-        returns = []
-        for i in range(1, len(strategy.trades)):
-            if 'profit_loss' in strategy.trades[i]:
-                returns.append(strategy.trades[i]['profit_loss'] / 10000)
-        
-        if returns:
-            sharpe_ratio = np.mean(returns) / np.std(returns) if np.std(returns) > 0 else 0
-        else:
-            sharpe_ratio = 0
-    else:
-        sharpe_ratio = 0
-    
-    # Calculate maximum drawdown
-    portfolio_values = []
-    for i in range(len(data)):
-        if i < len(strategy.trades):
-            portfolio_values.append(strategy.get_portfolio_value(data.iloc[i]['close']))
-        else:
-            portfolio_values.append(strategy.get_portfolio_value(data.iloc[i]['close']))
-    
-    peak = np.maximum.accumulate(portfolio_values)
-    drawdown = (portfolio_values - peak) / peak
-    max_drawdown = np.min(drawdown) * 100
-    
-    results = {
-        'strategy_name': strategy.name,
-        'parameters': strategy.parameters,
-        'total_trades': len(strategy.trades),
-        'final_value': final_value,
-        'total_return': total_return,
-        'sharpe_ratio': sharpe_ratio,
-        'max_drawdown': max_drawdown,
-        'win_rate': calculate_win_rate(strategy.trades)
-    }
-    
-    return results
-
-def calculate_win_rate(trades):
-    """Calculate win rate from trades"""
-    profitable_trades = 0
-    total_trades = 0
-    
-    for trade in trades:
-        if 'profit_loss' in trade:
-            total_trades += 1
-            if trade['profit_loss'] > 0:
-                profitable_trades += 1
-    
-    return (profitable_trades / total_trades * 100) if total_trades > 0 else 0
+def sma_periods_ordered(parameters):
+    return parameters['short_period'] < parameters['long_period']
 
-def optimize_strategy_parameters():
-    """Optimize strategy parameters using grid search"""
-    print("Optimizing strategy parameters...")
+def optimize_strategy_parameters(max_workers=None, optimizer='grid', data=None, sink=None,
+                                 **optimizer_options):
+    """Optimize strategy parameters
+    
+    optimizer: 'grid', 'random', 'halving' or 'tpe' (see strategy_optimizers).
+    Extra keyword arguments such as budget, prune_fraction or seed are passed
+    to the optimizer. Batches are backtested in parallel; max_workers defaults
+    to the number of CPUs. Without `data`, six months of mock data are generated.
+    With a ResultSink, results stream to its 'sma_optimization' and
+    'rsi_optimization' sections and stored configurations are skipped.
+    
+    Returns the SMA and RSI optimizers' top results (top_k, default 10),
+    best first; the full results are only in the sink.
+    """
+    from strategy_optimizers import OPTIMIZERS
+    
+    print(f"Optimizing strategy parameters ({optimizer} search)...")
     
     # Generate test data
-    data = generate_mock_price_data(days=180)  # 6 months of data
-    
-    # SMA Strategy optimization
-    sma_results = []
-    for short in range(5, 21, 5):  # 5, 10, 15, 20
-        for long in range(20, 51, 10):  # 20, 30, 40, 50
-            if short < long:
-                strategy = SMAStrategy(short_period=short, long_period=long)
-                result = backtest_strategy(strategy, data)
-                sma_results.append(result)
-    
-    # RSI Strategy optimization
-    rsi_results = []
-    for period in [10, 14, 21]:
-        for oversold in [20, 30, 35]:
-            for overbought in [65, 70, 80]:
-                strategy = RSIStrategy(period=period, oversold=oversold, overbought=overbought)
-                result = backtest_strategy(strategy, data)
-                rsi_results.append(result)
+    if data is None:
+        data = generate_mock_price_data(days=180)  # 6 months of data
+    
+    optimizer_class = OPTIMIZERS[optimizer]
+    
+    sma_optimizer = optimizer_class(SMAStrategy, SMA_PARAMETER_SPACE, constraint=sma_periods_ordered,
+                                    max_workers=max_workers, sink=sink, section='sma_optimization',
+                                    **optimizer_options)
+    sma_results = sma_optimizer.optimize(data)
+    
+    rsi_optimizer = optimizer_class(RSIStrategy, RSI_PARAMETER_SPACE,
+                                    max_workers=max_workers, sink=sink, section='rsi_optimization',
+                                    **optimizer_options)
+    rsi_results = rsi_optimizer.optimize(data)
     
     return sma_results, rsi_results
 
-def create_performance_visualization(results, strategy_type):
-    """Create performance visualization"""
-    df = pd.DataFrame(results)
-    
-    plt.figure(figsize=(15, 10))
-    
-    # Plot 1: Total Return vs Sharpe Ratio
-    plt.subplot(2, 2, 1)
-    plt.scatter(df['total_return'], df['sharpe_ratio'], alpha=0.6)
-    plt.xlabel('Total Return (%)')
-    plt.ylabel('Sharpe Ratio')
-    plt.title(f'{strategy_type} Strategy: Return vs Risk')
-    plt.grid(True, alpha=0.3)
-    
-    # Plot 2: Total Return vs Max Drawdown
-    plt.subplot(2, 2, 2)
-    plt.scatter(df['max_drawdown'], df['total_return'], alpha=0.6, color='red')
-    plt.xlabel('Max Drawdown (%)')
-    plt.ylabel('Total Return (%)')
-    plt.title(f'{strategy_type} Strategy: Return vs Drawdown')
-    plt.grid(True, alpha=0.3)
-    
-    # Plot 3: Win Rate vs Total Return
-    plt.subplot(2, 2, 3)
-    plt.scatter(df['win_rate'], df['total_return'], alpha=0.6, color='green')
-    plt.xlabel('Win Rate (%)')
-    plt.ylabel('Total Return (%)')
-    plt.title(f'{strategy_type} Strategy: Win Rate vs Return')
-    plt.grid(True, alpha=0.3)
-    
-    # Plot 4: Parameter heatmap (for SMA strategy)
-    if strategy_type == 'SMA':
-        plt.subplot(2, 2, 4)
-        # Create pivot table for heatmap
-        pivot_data = []
-        for result in results:
-            pivot_data.append({
-                'short_period': result['parameters']['short_period'],
-                'long_period': result['parameters']['long_period'],
-                'total_return': result['total_return']
-            })
-        
-        pivot_df = pd.DataFrame(pivot_data)
-        heatmap_data = pivot_df.pivot(index='short_period', columns='long_period', values='total_return')
-        sns.heatmap(heatmap_data, annot=True, fmt='.1f', cmap='RdYlGn')
-        plt.title('SMA Parameters Heatmap (Total Return %)')
-    
-    plt.tight_layout()
-    plt.savefig('/home/ubuntu/strategy_optimization_results.png', dpi=300, bbox_inches='tight')
-    plt.close()
+def create_performance_visualization(results, strategy_type, **options):
+    """Create performance visualization (see reporting; imports matplotlib on first use)"""
+    from reporting import create_performance_visualization
+    return create_performance_visualization(results, strategy_type, **options)
 
-def run_strategy_tests():
-    """Run comprehensive strategy tests"""
+def run_strategy_tests(results_path=None, seed=None, report='background'):
+    """Run comprehensive strategy tests
+    
+    Results stream to results_path (default $STRATEGY_RESULTS_PATH or
+    strategy_test_results.jsonl) as each backtest finishes; a directory path
+    writes Parquet instead. Re-running with the same seed resumes: results
+    already in the file for the same data are not recomputed.
+    
+    report: 'background' charts the SMA optimization in a separate process,
+    'preview' renders a quick low-dpi chart, 'full' renders in this process
+    and None skips plotting.
+    """
+    from results_sink import ResultSink, result_key
+    from price_data import bars_between
+    
+    results_path = results_path or os.environ.get('STRATEGY_RESULTS_PATH', DEFAULT_RESULTS_PATH)
+    
     print("Running Trading Bot Strategy Tests and Optimization")
     print("=" * 60)
     
+    sink = ResultSink(results_path)
+    
     # Generate test data
-    data = generate_mock_price_data(days=365)
+    data = generate_mock_price_data(days=365, seed=seed)
     print(f"Generated {len(data)} hours of mock price data")
+    dataset = dataset_fingerprint(data['close'].to_numpy(dtype=float))
     
     # Test individual strategies
     strategies = [
@@ -331,10 +136,15 @@ def run_strategy_tests():
         RSIStrategy(period=14, oversold=30, overbought=70),
         RSIStrategy(period=21, oversold=25, overbought=75)
     ]
+    stored = sink.find('individual_tests',
+                       [result_key(strategy.name, strategy.parameters) for strategy in strategies], dataset)
     
     results = []
     for strategy in strategies:
-        result = backtest_strategy(strategy, data)
+        result = stored.get(result_key(strategy.name, strategy.parameters))
+        if result is None:
+            result = backtest_strategy(strategy, data)
+            sink.write('individual_tests', {**result, 'dataset': dataset})
         results.append(result)
         print(f"\n{result['strategy_name']} Results:")
         print(f"  Parameters: {result['parameters']}")
@@ -349,11 +159,12 @@ def run_strategy_tests():
     print("PARAMETER OPTIMIZATION")
     print("=" * 60)
     
-    sma_results, rsi_results = optimize_strategy_parameters()
+    optimization_data = generate_mock_price_data(days=180, seed=None if seed is None else seed + 1)
+    sma_results, rsi_results = optimize_strategy_parameters(data=optimization_data, sink=sink)
     
-    # Find best performing strategies
-    best_sma = max(sma_results, key=lambda x: x['total_return'])
-    best_rsi = max(rsi_results, key=lambda x: x['total_return'])
+    # Find best performing strategies (each optimizer returns its top results, best first)
+    best_sma = sma_results[0]
+    best_rsi = rsi_results[0]
     
     print(f"\nBest SMA Strategy:")
     print(f"  Parameters: {best_sma['parameters']}")
@@ -367,25 +178,66 @@ def run_strategy_tests():
     print(f"  Sharpe Ratio: {best_rsi['sharpe_ratio']:.3f}")
     print(f"  Max Drawdown: {best_rsi['max_drawdown']:.2f}%")
     
-    # Create visualizations
-    create_performance_visualization(sma_results, 'SMA')
+    # Out-of-sample check: re-optimize on 90-day windows, trade the next 30 days
+    from walk_forward import walk_forward
+    
+    print("\n" + "=" * 60)
+    print("WALK-FORWARD ANALYSIS")
+    print("=" * 60)
+    
+    train_bars, test_bars = bars_between('90D', '1h'), bars_between('30D', '1h')
+    windowing = {'train_bars': train_bars, 'test_bars': test_bars}
+    walk_forward_results = {
+        'sma': walk_forward(SMAStrategy, SMA_PARAMETER_SPACE, data, train_bars, test_bars,
+                            constraint=sma_periods_ordered),
+        'rsi': walk_forward(RSIStrategy, RSI_PARAMETER_SPACE, data, train_bars, test_bars)
+    }
+    
+    # Walk-forward runs come back from its own cache; only the records are deduplicated
+    best_parameters = {'sma': best_sma['parameters'], 'rsi': best_rsi['parameters']}
+    stored = sink.find('walk_forward', [result_key(name, windowing) for name in walk_forward_results], dataset)
+    stored.update(sink.find('best_strategies', [result_key('best', best_parameters)], dataset))
+    
+    for name, analysis in walk_forward_results.items():
+        summary = analysis['summary']
+        print(f"\n{name.upper()} walk-forward ({summary['windows']} windows):")
+        print(f"  Out-of-Sample Return: {summary['compounded_oos_return']:.2f}%")
+        print(f"  Mean In-Sample Return: {summary['mean_is_return']:.2f}%")
+        print(f"  Mean Out-of-Sample Return: {summary['mean_oos_return']:.2f}%")
+        print(f"  Profitable Windows: {summary['profitable_windows']}/{summary['windows']}")
+        if result_key(name, windowing) not in stored:
+            sink.write('walk_forward', {'strategy': name, 'strategy_name': name, 'parameters': windowing,
+                                        'dataset': dataset, **analysis})
+    
+    if result_key('best', best_parameters) not in stored:
+        sink.write('best_strategies', {'strategy_name': 'best', 'parameters': best_parameters,
+                                       'sma': best_sma, 'rsi': best_rsi, 'dataset': dataset})
+    sink.close()
+    
+    # Create visualizations from the saved results
+    if report is not None:
+        import reporting
+        if report == 'background':
+            reporting.render_in_background(results_path)
+        else:
+            reporting.render_report(results_path, preview=(report == 'preview'))
     
-    # Save detailed results
+    # Every record is in the results file; only the summary is returned
     all_results = {
+        'results_path': results_path,
         'individual_tests': results,
-        'sma_optimization': sma_results,
-        'rsi_optimization': rsi_results,
         'best_strategies': {
             'sma': best_sma,
             'rsi': best_rsi
-        }
+        },
+        'walk_forward': {name: analysis['summary'] for name, analysis in walk_forward_results.items()}
     }
     
-    with open('/home/ubuntu/strategy_test_results.json', 'w') as f:
-        json.dump(all_results, f, indent=2, default=str)
-    
-    print(f"\nResults saved to strategy_test_results.json")
-    print(f"Visualization saved to strategy_optimization_results.png")
+    print(f"\nResults saved to {results_path}")
+    if report == 'background':
+        print(f"Rendering visualization to strategy_optimization_results.png in the background")
+    elif report is not None:
+        print(f"Visualization saved to strategy_optimization_results.png")
     
     return all_results
 
@@ -0,0 +1,245 @@
+# Walk-Forward Analysis
+#
+# Optimizing on one dataset and reporting the winner measures how well the
+# parameters fit that history, not how they trade afterwards. Walk-forward
+# analysis splits the data into consecutive windows, picks the best
+# parameters on each train window and scores them on the test window that
+# follows it:
+#
+#     | train 0          | test 0 |
+#              | train 1          | test 1 |
+#                       | train 2          | test 2 |
+#
+# anchored=True keeps every train window starting at the first bar
+# (expanding windows) instead of rolling them forward.
+#
+# Windows run in parallel on the shared-memory pool from parameter_sweep.
+# Every backtest goes through a ResultCache keyed by the content of the data
+# slice, the strategy and its parameters, so overlapping analyses, repeated
+# runs and a run with one extra window only backtest what they haven't seen.
+# Slices are identified by their bar offsets and closes, not wall-clock
+# timestamps, so the same (e.g. seeded) data hits the cache whenever it was
+# generated. The cache is pruned after each analysis: entries unused for
+# max_age seconds go first, then the least recently used beyond max_entries.
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import as_completed
+import numpy as np
+from backtest import backtest_strategy, column, row_count, slice_rows
+from indicator_cache import dataset_fingerprint
+from strategy_optimizers import GridSearch
+from parameter_sweep import shared_data_pool, worker_data
+
+# Bump when backtest_strategy's metrics change so stale entries stop matching
+CACHE_VERSION = 2
+DEFAULT_CACHE_DIR = '.walk_forward_cache'
+DEFAULT_CACHE_MAX_ENTRIES = 100000
+DEFAULT_CACHE_MAX_AGE = 30 * 24 * 3600  # seconds
+
+def slice_fingerprint(data):
+    """Content hash of the bars a backtest sees (bar offsets and closes)"""
+    timestamps = column(data, 'timestamp', 'datetime64[ns]').view(np.int64)
+    close = column(data, 'close', float)
+    offsets = timestamps - timestamps[0] if len(timestamps) else timestamps
+    return dataset_fingerprint(offsets) + dataset_fingerprint(close)
+
+class ResultCache:
+    """Backtest results on disk, one JSON file per (slice, strategy, parameters, engine)
+
+    Files are written to a temporary name and renamed into place, so
+    concurrent workers never read a half-written entry. A hit refreshes the
+    entry's modification time, which prune() uses as its last use.
+    """
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_entries=DEFAULT_CACHE_MAX_ENTRIES,
+                 max_age=DEFAULT_CACHE_MAX_AGE):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, fingerprint, strategy_class, parameters, engine):
+        content = json.dumps([CACHE_VERSION, fingerprint, strategy_class.__qualname__,
+                              parameters, engine], sort_keys=True, default=str)
+        return hashlib.blake2b(content.encode(), digest_size=20).hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, key[:2], f'{key}.json')
+
+    def get(self, key):
+        path = self.path(key)
+        try:
+            with open(path) as f:
+                result = json.load(f)
+            os.utime(path)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return result
+
+    def put(self, key, result):
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(result, f, default=float)
+        os.replace(temp_path, path)
+
+    def prune(self):
+        """Delete entries older than max_age, then the least recently used beyond max_entries"""
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    entries.append((os.path.getmtime(path), path))
+                except OSError:
+                    pass  # Replaced or pruned concurrently
+        entries.sort(reverse=True)
+        cutoff = time.time() - self.max_age if self.max_age else None
+        removed = 0
+        for index, (modified, path) in enumerate(entries):
+            if (cutoff is not None and modified < cutoff) or \
+                    (self.max_entries and index >= self.max_entries):
+                try:
+                    os.remove(path)
+                    removed += 1
+                except OSError:
+                    pass
+        return removed
+
+    def backtest(self, strategy_class, parameters, data, engine='auto', fingerprint=None):
+        """backtest_strategy through the cache"""
+        if fingerprint is None:
+            fingerprint = slice_fingerprint(data)
+        key = self.key(fingerprint, strategy_class, parameters, engine)
+
+        result = self.get(key)
+        if result is None:
+            result = backtest_strategy(strategy_class(**parameters), data, engine=engine)
+            self.put(key, result)
+        return result
+
+def walk_forward_windows(n_bars, train_bars, test_bars, step_bars=None, anchored=False):
+    """(train_start, train_end, test_start, test_end) row ranges, oldest first
+
+    Windows advance by step_bars (default test_bars, so test windows tile the
+    data without overlapping). A trailing test window shorter than test_bars
+    is dropped.
+    """
+    step_bars = step_bars or test_bars
+    windows = []
+    train_start = 0
+    while train_start + train_bars + test_bars <= n_bars:
+        train_end = train_start + train_bars
+        windows.append((0 if anchored else train_start, train_end, train_end, train_end + test_bars))
+        train_start += step_bars
+    return windows
+
+def evaluate_window(data, window, strategy_class, candidates, objective='total_return',
+                    engine='auto', cache=None):
+    """Optimize on a window's train rows and backtest the winner on its test rows"""
+    train_start, train_end, test_start, test_end = window
+    train = slice_rows(data, train_start, train_end)
+    test = slice_rows(data, test_start, test_end)
+
+    def run(parameters, rows, fingerprint):
+        if cache is None:
+            return backtest_strategy(strategy_class(**parameters), rows, engine=engine)
+        return cache.backtest(strategy_class, parameters, rows, engine, fingerprint)
+
+    def score(result):
+        value = result[objective]
+        return value if value is not None and value == value else -np.inf  # NaN/None rank last
+
+    train_fingerprint = slice_fingerprint(train)
+    train_results = [run(parameters, train, train_fingerprint) for parameters in candidates]
+    best = max(range(len(candidates)), key=lambda i: score(train_results[i]))
+
+    timestamps = column(data, 'timestamp', 'datetime64[ns]')
+    return {
+        'train_start': timestamps[train_start],
+        'train_end': timestamps[train_end - 1],
+        'test_start': timestamps[test_start],
+        'test_end': timestamps[test_end - 1],
+        'best_parameters': candidates[best],
+        'in_sample': train_results[best],
+        'out_of_sample': run(candidates[best], test, slice_fingerprint(test))
+    }
+
+def _run_window(index, window, strategy_class, candidates, objective, engine, cache_dir):
+    cache = ResultCache(cache_dir) if cache_dir else None
+    record = evaluate_window(worker_data(), window, strategy_class, candidates,
+                             objective, engine, cache)
+    return index, record, (cache.hits, cache.misses) if cache else (0, 0)
+
+def summarize_walk_forward(windows):
+    """Out-of-sample totals across windows"""
+    oos_returns = np.array([w['out_of_sample']['total_return'] for w in windows], dtype=float)
+    is_returns = np.array([w['in_sample']['total_return'] for w in windows], dtype=float)
+
+    compounded = (np.prod(1 + oos_returns / 100) - 1) * 100 if len(windows) else 0.0
+    mean_is = is_returns.mean() if len(windows) else 0.0
+    mean_oos = oos_returns.mean() if len(windows) else 0.0
+
+    return {
+        'windows': len(windows),
+        'compounded_oos_return': compounded,
+        'mean_oos_return': mean_oos,
+        'mean_is_return': mean_is,
+        # Share of the in-sample return that survived out of sample
+        'walk_forward_efficiency': mean_oos / mean_is if mean_is else None,
+        'profitable_windows': int(np.sum(oos_returns > 0))
+    }
+
+def walk_forward(strategy_class, space, data, train_bars, test_bars, step_bars=None,
+                 anchored=False, constraint=None, objective='total_return', engine='auto',
+                 cache_dir=DEFAULT_CACHE_DIR, max_workers=None):
+    """Walk-forward grid optimization of strategy_class over `space`
+
+    Returns {'windows': [...], 'summary': {...}, 'cache': {...}} where each
+    window record holds its date ranges, the chosen parameters and the
+    in-sample and out-of-sample results. cache_dir=None disables caching.
+    """
+    windows = walk_forward_windows(row_count(data), train_bars, test_bars, step_bars, anchored)
+    candidates = GridSearch(strategy_class, space, constraint=constraint).all_candidates()
+    print(f"Walk-forward analysis of {strategy_class.__name__}: "
+          f"{len(windows)} windows x {len(candidates)} configurations...")
+
+    records = [None] * len(windows)
+    hits = misses = 0
+
+    if max_workers == 1 or len(windows) <= 1:
+        cache = ResultCache(cache_dir) if cache_dir else None
+        for index, window in enumerate(windows):
+            records[index] = evaluate_window(data, window, strategy_class, candidates,
+                                             objective, engine, cache)
+        if cache:
+            hits, misses = cache.hits, cache.misses
+    else:
+        max_workers = min(max_workers or os.cpu_count() or 1, len(windows))
+        with shared_data_pool(data, max_workers) as pool:
+            futures = [
+                pool.submit(_run_window, index, window, strategy_class, candidates,
+                            objective, engine, cache_dir)
+                for index, window in enumerate(windows)
+            ]
+            for future in as_completed(futures):
+                index, record, (window_hits, window_misses) = future.result()
+                records[index] = record
+                hits += window_hits
+                misses += window_misses
+
+    pruned = ResultCache(cache_dir).prune() if cache_dir else 0
+
+    return {
+        'windows': records,
+        'summary': summarize_walk_forward(records),
+        'cache': {'directory': cache_dir, 'hits': hits, 'misses': misses, 'pruned': pruned}
+    }